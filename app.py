@@ -1,5 +1,6 @@
 import os
 
+from ktem.utils.startup import startup_profiler  # first, to time the imports
 from theflow.settings import settings as flowsettings
 
 KH_APP_DATA_DIR = getattr(flowsettings, "KH_APP_DATA_DIR", ".")
@@ -11,10 +12,15 @@ if GRADIO_TEMP_DIR is None:
     os.environ["GRADIO_TEMP_DIR"] = GRADIO_TEMP_DIR
 
 
-from ktem.main import App  # noqa
+with startup_profiler.phase("import ktem.main"):
+    from ktem.main import App  # noqa
+
+with startup_profiler.phase("App()"):
+    app = App()
+with startup_profiler.phase("App.make()"):
+    demo = app.make()
+startup_profiler.print_report()
 
-app = App()
-demo = app.make()
 demo.queue().launch(
     favicon_path=app._favicon,
     inbrowser=True,
@@ -22,6 +22,12 @@ Attributes:
     KH_SSO_ENABLED (bool): Flag to enable or disable Single Sign-On (SSO).
     KH_FEATURE_CHAT_SUGGESTION (bool): Flag to enable or disable chat suggestions.
     KH_FEATURE_USER_MANAGEMENT (bool): Flag to enable or disable user management.
+    KH_CHAT_STREAM_INTERVAL (int): Minimum milliseconds between the UI updates of a
+        streamed answer.
+    KH_CHUNK_VIEWER_PAGE_SIZE (int): Number of chunks shown per page when browsing
+        an indexed file.
+    KH_FILE_LIST_PAGE_SIZE (int): Number of files shown per page in the file list
+        of an index.
     KH_USER_CAN_SEE_PUBLIC (None): Placeholder for user visibility settings.
     KH_FEATURE_USER_MANAGEMENT_ADMIN (str): Admin username for user management.
     KH_FEATURE_USER_MANAGEMENT_PASSWORD (str): Admin password for user management.
@@ -121,6 +127,9 @@ KH_FEATURE_USER_MANAGEMENT = config(
     "KH_FEATURE_USER_MANAGEMENT", default=True, cast=bool
 )
 KH_USER_CAN_SEE_PUBLIC = None
+KH_CHAT_STREAM_INTERVAL = config("KH_CHAT_STREAM_INTERVAL", default=50, cast=int)
+KH_CHUNK_VIEWER_PAGE_SIZE = config("KH_CHUNK_VIEWER_PAGE_SIZE", default=20, cast=int)
+KH_FILE_LIST_PAGE_SIZE = config("KH_FILE_LIST_PAGE_SIZE", default=50, cast=int)
 KH_FEATURE_USER_MANAGEMENT_ADMIN = str(
     config("KH_FEATURE_USER_MANAGEMENT_ADMIN", default="admin")
 )
@@ -146,6 +155,8 @@ KH_VECTORSTORE = {
     "__type__": "kotaemon.storages.ChromaVectorStore",
     # "__type__": "kotaemon.storages.MilvusVectorStore",
     # "__type__": "kotaemon.storages.QdrantVectorStore",
+    # "__type__": "kotaemon.storages.FlatFileVectorStore",
+    # "__type__": "kotaemon.storages.HNSWVectorStore",
     "path": str(KH_USER_DATA_DIR / "vectorstore"),
 }
 KH_LLMS = {}
@@ -338,6 +349,8 @@ KH_VLM_ENDPOINT = "{0}/openai/deployments/{1}/chat/completions?api-version={2}".
     config("OPENAI_VISION_DEPLOYMENT_NAME", default="gpt-4o"),
     config("OPENAI_API_VERSION", default=""),
 )
+# load the Docling OCR and table-structure models at app startup
+KH_DOCLING_PRELOAD = config("KH_DOCLING_PRELOAD", default=False, cast=bool)
 
 
 SETTINGS_APP: dict[str, dict] = {}
@@ -0,0 +1,85 @@
+"""Recall@k and latency of `HNSWVectorStore` against exact search
+
+The exact top k comes from `FlatFileVectorStore` over the same vectors. The
+HNSW store is queried with several `ef_search` values, to pick the recall /
+latency trade-off.
+
+Usage:
+    python benchmarks/ann_recall.py --n-vectors 200000 --dim 384 --ef 32 64 128
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from kotaemon.storages import FlatFileVectorStore, HNSWVectorStore
+
+
+def make_dataset(n_vectors: int, dim: int, n_queries: int, n_clusters: int = 100):
+    """Clustered vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, n_clusters, n_vectors)
+    vectors = centers[labels] + 0.5 * rng.standard_normal(
+        (n_vectors, dim), dtype=np.float32
+    )
+    queries = centers[rng.integers(0, n_clusters, n_queries)] + 0.5 * (
+        rng.standard_normal((n_queries, dim), dtype=np.float32)
+    )
+    return vectors, queries
+
+
+def query_all(store, queries, top_k):
+    start = time.perf_counter()
+    results = [set(store.query(embedding=q.tolist(), top_k=top_k)[2]) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--n-vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--n-queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    args = parser.parse_args()
+
+    vectors, queries = make_dataset(args.n_vectors, args.dim, args.n_queries)
+    ids = [str(idx) for idx in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as path:
+        flat = FlatFileVectorStore(path=path, collection_name="flat")
+        flat.add(embeddings=vectors.tolist(), ids=ids)
+        expected, exact_latency = query_all(flat, queries, args.top_k)
+        print(f"exact search: {exact_latency * 1000:.2f}ms / query")
+
+        start = time.perf_counter()
+        hnsw = HNSWVectorStore(
+            path=path,
+            collection_name="hnsw",
+            M=args.M,
+            ef_construction=args.ef_construction,
+            exact_search_threshold=0,
+        )
+        for batch_start in range(0, len(vectors), 10000):
+            batch = slice(batch_start, batch_start + 10000)
+            hnsw.add(embeddings=vectors[batch].tolist(), ids=ids[batch])
+        print(f"HNSW build: {time.perf_counter() - start:.1f}s")
+
+        for ef in args.ef:
+            hnsw._ef_search = ef
+            results, latency = query_all(hnsw, queries, args.top_k)
+            recall = np.mean(
+                [len(res & exp) / args.top_k for res, exp in zip(results, expected)]
+            )
+            print(
+                f"ef_search={ef:>4}: recall@{args.top_k} {recall:.3f}, "
+                f"{latency * 1000:.2f}ms / query"
+            )
+
+
+if __name__ == "__main__":
+    main()
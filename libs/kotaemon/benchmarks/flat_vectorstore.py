@@ -0,0 +1,114 @@
+"""Benchmark of `FlatFileVectorStore` against `SimpleFileVectorStore`
+
+Measure the time to add the embeddings (in batches, as the indexing pipeline
+does), to re-open the store and to query it, with and without a `file_id` scope.
+
+Usage:
+    python benchmarks/flat_vectorstore.py --n-vectors 100000 --dim 768
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+
+from kotaemon.storages import FlatFileVectorStore, SimpleFileVectorStore
+
+
+def run(store_class, path, vectors, file_ids, queries, batch_size, top_k):
+    ids = [str(idx) for idx in range(len(vectors))]
+    metadatas = [{"file_id": file_id} for file_id in file_ids]
+
+    store = store_class(path=path, collection_name="bench")
+    start = time.perf_counter()
+    for batch_start in range(0, len(vectors), batch_size):
+        batch = slice(batch_start, batch_start + batch_size)
+        store.add(
+            embeddings=vectors[batch].tolist(),
+            metadatas=metadatas[batch],
+            ids=ids[batch],
+        )
+    add_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = store_class(path=path, collection_name="bench")
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [store.query(embedding=q.tolist(), top_k=top_k)[2] for q in queries]
+    query_time = (time.perf_counter() - start) / len(queries)
+
+    filters = MetadataFilters(
+        filters=[
+            MetadataFilter(
+                key="file_id",
+                value=sorted(set(file_ids))[:2],
+                operator=FilterOperator.IN,
+            )
+        ],
+        condition=FilterCondition.OR,
+    )
+    start = time.perf_counter()
+    for q in queries:
+        store.query(embedding=q.tolist(), top_k=top_k, filters=filters)
+    filter_time = (time.perf_counter() - start) / len(queries)
+
+    print(
+        f"{store_class.__name__:>24}: add {add_time:8.2f}s, load {load_time:6.2f}s, "
+        f"query {query_time * 1000:8.2f}ms, scoped query {filter_time * 1000:8.2f}ms"
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--n-files", type=int, default=100)
+    parser.add_argument("--n-queries", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--skip-simple",
+        action="store_true",
+        help="only run FlatFileVectorStore, SimpleFileVectorStore is slow at scale",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.n_vectors, args.dim), dtype=np.float32)
+    file_ids = [f"file_{idx % args.n_files}" for idx in range(args.n_vectors)]
+    queries = rng.standard_normal((args.n_queries, args.dim), dtype=np.float32)
+
+    store_classes = [FlatFileVectorStore]
+    if not args.skip_simple:
+        store_classes.append(SimpleFileVectorStore)
+
+    all_results = []
+    for store_class in store_classes:
+        with tempfile.TemporaryDirectory() as path:
+            all_results.append(
+                run(
+                    store_class,
+                    path,
+                    vectors,
+                    file_ids,
+                    queries,
+                    args.batch_size,
+                    args.top_k,
+                )
+            )
+
+    if len(all_results) == 2:
+        same = sum(a == b for a, b in zip(*all_results))
+        print(f"Same top {args.top_k} ids for {same}/{len(queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
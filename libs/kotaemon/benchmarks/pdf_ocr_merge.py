@@ -0,0 +1,179 @@
+"""Micro-benchmark of the OCR / PDF box merging over synthetic dense pages
+
+Compare `merge_ocr_and_pdf_texts` and `merge_table_cell_and_ocr` against the
+reference nested-loop matching with `get_rect_iou`, and check that both return
+the same matches.
+
+Usage:
+    python benchmarks/pdf_ocr_merge.py --n-items 3000 --n-cells 500
+"""
+import argparse
+import copy
+import random
+import time
+
+from kotaemon.loaders.utils.box import (
+    bbox_to_points,
+    box_area,
+    box_h,
+    box_w,
+    get_rect_iou,
+    union_points,
+)
+from kotaemon.loaders.utils.pdf_ocr import (
+    IOU_THRES,
+    PADDING_THRES,
+    merge_ocr_and_pdf_texts,
+    merge_table_cell_and_ocr,
+)
+
+
+def random_item(width: int, height: int, max_size: int, item_type: str = "text"):
+    x1, y1 = random.randint(0, width), random.randint(0, height)
+    bbox = [
+        x1,
+        y1,
+        x1 + random.randint(1, max_size),
+        y1 + random.randint(1, max_size),
+    ]
+    return {
+        "type": item_type,
+        "text": f"{item_type} {x1} {y1}",
+        "box": bbox,
+        "bbox": bbox,
+        "location": bbox_to_points(bbox),
+    }
+
+
+def make_dense_page(n_items: int, n_tables: int, n_cells: int, seed: int = 0):
+    random.seed(seed)
+    width, height = 2480, 3508  # A4 at 300 DPI
+    ocr_list = [random_item(width, height, 60) for _ in range(n_items)]
+    pdf_list = [random_item(width, height, 60) for _ in range(n_items)]
+    table_list = [
+        random_item(width, height, 1200, "table") for _ in range(n_tables)
+    ] + [random_item(width, height, 150, "cell") for _ in range(n_cells)]
+    return ocr_list, pdf_list, table_list
+
+
+def reference_merge_ocr_and_pdf_texts(ocr_list, pdf_text_list):
+    not_matched_ocr = []
+    for ocr_item in ocr_list:
+        if not any(
+            get_rect_iou(ocr_item["location"], pdf_item["location"], iou_type=1)
+            > IOU_THRES
+            for pdf_item in pdf_text_list
+        ):
+            ocr_item["matched"] = False
+            not_matched_ocr.append(ocr_item)
+    return pdf_text_list + not_matched_ocr
+
+
+def reference_merge_table_cell_and_ocr(table_list, ocr_list, pdf_list):
+    cell_list = [item for item in table_list if item["type"] == "cell"]
+    table_list = [item for item in table_list if item["type"] == "table"]
+    table_list = sorted(table_list, key=lambda item: box_area(item["bbox"]))
+
+    all_tables = []
+    matched_pdf_ids = []
+    matched_cell_ids = []
+    for table in table_list:
+        cur_table_cells = []
+        for cell_id, cell in enumerate(cell_list):
+            if cell_id in matched_cell_ids:
+                continue
+            if get_rect_iou(
+                table["location"], cell["location"], iou_type=1
+            ) > IOU_THRES and box_area(table["bbox"]) > box_area(cell["bbox"]):
+                for item_list, item_type in [(pdf_list, "pdf"), (ocr_list, "ocr")]:
+                    cell["ocr"] = []
+                    for item_id, item in enumerate(item_list):
+                        if item_type == "pdf" and item_id in matched_pdf_ids:
+                            continue
+                        if (
+                            get_rect_iou(item["location"], cell["location"], iou_type=1)
+                            > IOU_THRES
+                        ):
+                            cell["ocr"].append(item)
+                            if item_type == "pdf":
+                                matched_pdf_ids.append(item_id)
+
+                    if len(cell["ocr"]) > 0:
+                        all_box_points_in_cell = []
+                        for item in cell["ocr"]:
+                            all_box_points_in_cell.extend(item["location"])
+                        union_box = union_points(all_box_points_in_cell)
+                        cell_okay = (
+                            box_h(union_box) <= box_h(cell["bbox"]) * PADDING_THRES
+                            and box_w(union_box) <= box_w(cell["bbox"]) * PADDING_THRES
+                        )
+                    else:
+                        cell_okay = False
+
+                    if cell_okay:
+                        break
+
+                matched_cell_ids.append(cell_id)
+                cur_table_cells.append(cell)
+
+        all_tables.append(cur_table_cells)
+
+    not_matched_items = [
+        item for _id, item in enumerate(pdf_list) if _id not in matched_pdf_ids
+    ]
+    return all_tables, not_matched_items
+
+
+def timeit(func, *args):
+    args = copy.deepcopy(args)
+    start = time.perf_counter()
+    output = func(*args)
+    return output, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--n-items", type=int, default=3000)
+    parser.add_argument("--n-tables", type=int, default=10)
+    parser.add_argument("--n-cells", type=int, default=500)
+    parser.add_argument("--skip-reference", action="store_true")
+    args = parser.parse_args()
+
+    ocr_list, pdf_list, table_list = make_dense_page(
+        args.n_items, args.n_tables, args.n_cells
+    )
+    print(
+        f"Synthetic page: {args.n_items} OCR items, {args.n_items} PDF items, "
+        f"{args.n_tables} tables, {args.n_cells} cells"
+    )
+
+    merged, elapsed = timeit(merge_ocr_and_pdf_texts, ocr_list, pdf_list)
+    print(f"merge_ocr_and_pdf_texts: {elapsed:.3f}s")
+    if not args.skip_reference:
+        ref_merged, ref_elapsed = timeit(
+            reference_merge_ocr_and_pdf_texts, ocr_list, pdf_list
+        )
+        print(f"  reference nested loop: {ref_elapsed:.3f}s")
+        assert merged == ref_merged, "Mismatch with the reference implementation"
+
+    (tables, not_matched), elapsed = timeit(
+        merge_table_cell_and_ocr, table_list, ocr_list, pdf_list
+    )
+    print(
+        f"merge_table_cell_and_ocr: {elapsed:.3f}s "
+        f"({sum(len(cells) for cells in tables)} cells, "
+        f"{len(not_matched)} non-table items)"
+    )
+    if not args.skip_reference:
+        (ref_tables, ref_not_matched), ref_elapsed = timeit(
+            reference_merge_table_cell_and_ocr, table_list, ocr_list, pdf_list
+        )
+        print(f"  reference nested loop: {ref_elapsed:.3f}s")
+        assert (tables, not_matched) == (
+            ref_tables,
+            ref_not_matched,
+        ), "Mismatch with the reference implementation"
+
+
+if __name__ == "__main__":
+    main()
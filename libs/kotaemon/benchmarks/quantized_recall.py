@@ -0,0 +1,87 @@
+"""Memory and recall@k of the quantized `FlatFileVectorStore` against exact search
+
+The vectors kept in RAM by each quantization are compared with the float32
+vectors, and the recall of the top k is measured against the exact search for
+several `rescore_multiplier` values.
+
+Usage:
+    python benchmarks/quantized_recall.py --n-vectors 200000 --dim 768
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from kotaemon.storages import FlatFileVectorStore
+
+
+def make_dataset(n_vectors: int, dim: int, n_queries: int, n_clusters: int = 100):
+    """Clustered vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, n_clusters, n_vectors)
+    vectors = centers[labels] + 0.5 * rng.standard_normal(
+        (n_vectors, dim), dtype=np.float32
+    )
+    queries = centers[rng.integers(0, n_clusters, n_queries)] + 0.5 * (
+        rng.standard_normal((n_queries, dim), dtype=np.float32)
+    )
+    return vectors, queries
+
+
+def query_all(store, queries, top_k):
+    start = time.perf_counter()
+    results = [set(store.query(embedding=q.tolist(), top_k=top_k)[2]) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--n-vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--n-queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+
+    vectors, queries = make_dataset(args.n_vectors, args.dim, args.n_queries)
+    ids = [str(idx) for idx in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as path:
+        exact = FlatFileVectorStore(path=path, collection_name="exact")
+        for batch_start in range(0, len(vectors), 10000):
+            batch = slice(batch_start, batch_start + 10000)
+            exact.add(embeddings=vectors[batch].tolist(), ids=ids[batch])
+        expected, latency = query_all(exact, queries, args.top_k)
+        print(
+            f"{'float32':>7}: {vectors.nbytes / 2**20:8.1f}MB, "
+            f"{latency * 1000:.2f}ms / query"
+        )
+
+        for quantization in ["int8", "binary"]:
+            # the codes are computed from the vectors file when the store is loaded
+            store = FlatFileVectorStore(
+                path=path, collection_name="exact", quantization=quantization
+            )
+            codes_bytes = store._codes.nbytes
+            if store._scales is not None:
+                codes_bytes += store._scales.nbytes
+            print(
+                f"{quantization:>7}: {codes_bytes / 2**20:8.1f}MB "
+                f"({vectors.nbytes / codes_bytes:.1f}x smaller)"
+            )
+            for multiplier in args.rescore:
+                store._rescore_multiplier = multiplier
+                results, latency = query_all(store, queries, args.top_k)
+                recall = np.mean(
+                    [len(res & exp) / args.top_k for res, exp in zip(results, expected)]
+                )
+                print(
+                    f"{'':>9}rescore x{multiplier:<3}: recall@{args.top_k} "
+                    f"{recall:.3f}, {latency * 1000:.2f}ms / query"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import logging
+import os
 import re
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from functools import partial
-from typing import Any
+from typing import Any, Iterator, Optional
 
 import tiktoken
 
@@ -44,6 +48,20 @@ class RewooAgent(BaseAgent):
         help="Max context length for each tool output.",
     )
     trim_func: TokenSplitter | None = None
+    max_concurrency: Optional[int] = Param(
+        default=None,
+        help=(
+            "Max number of tools running at the same time, not counting the tools "
+            "that timed out. Default to min(32, number of CPUs + 4)."
+        ),
+    )
+    tool_timeout: Optional[float] = Param(
+        default=None,
+        help=(
+            "Seconds after which a running tool is abandoned, its evidence is then "
+            "'No evidence found.'. Default to no timeout."
+        ),
+    )
 
     @Node.auto(depends_on=["planner_llm", "plugins", "prompt_template", "examples"])
     def planner(self):
@@ -191,6 +209,112 @@ class RewooAgent(BaseAgent):
                 )
         return result
 
+    def _iter_worker_evidence(
+        self,
+        planner_evidences: dict[str, str],
+        evidences_level: list[list[str]],
+        output=BaseScratchPad(),
+    ) -> Iterator[dict]:
+        """
+        Run the plugins of the evidences, each one as soon as the evidences it
+        depends on are known, rather than level after level.
+
+        Args:
+            planner_evidences: A mapping from #E to tool call.
+            evidences_level: A list of levels of evidences.
+                Calculated from DAG of plugin calls.
+            output: Output object, defaults to BaseScratchPad().
+        Yields:
+            The result of each evidence, in the order they complete, with the
+            trimmed evidence.
+        """
+        level_of = {e: idx for idx, level in enumerate(evidences_level) for e in level}
+        waiting_on: dict[str, set[str]] = {
+            e: {
+                var
+                for var in re.findall(r"#E\d+", planner_evidences[e])
+                if level_of.get(var, idx) < idx
+            }
+            for e, idx in level_of.items()
+        }
+        dependents: dict[str, list[str]] = defaultdict(list)
+        for e, dependencies in waiting_on.items():
+            for dependency in dependencies:
+                dependents[dependency].append(e)
+
+        worker_evidences: dict[str, str] = dict()
+
+        def run_plugin(e: str, future: Future):
+            try:
+                future.set_result(
+                    self._run_plugin(e, planner_evidences, worker_evidences, output)
+                )
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        # each tool runs in its own daemon thread rather than in a pool: a tool
+        # that timed out keeps its thread, which must neither hold a slot of the
+        # concurrency limit nor block the exit of the interpreter
+        max_running = self.max_concurrency or min(32, (os.cpu_count() or 1) + 4)
+        ready: deque[str] = deque()
+        running: dict[Future, str] = dict()
+        started: dict[Future, float] = dict()
+
+        def start_ready():
+            while ready and len(running) < max_running:
+                e = ready.popleft()
+                output.update_status(f"Running task {e}.")
+                future: Future = Future()
+                running[future] = e
+                started[future] = time.monotonic()
+                threading.Thread(
+                    target=run_plugin, args=(e, future), daemon=True
+                ).start()
+
+        ready.extend(e for e, dependencies in waiting_on.items() if not dependencies)
+        start_ready()
+        while running:
+            # wake up at the earliest deadline of the running tools
+            timeout = None
+            if self.tool_timeout is not None:
+                timeout = max(
+                    min(started[future] for future in running)
+                    + self.tool_timeout
+                    - time.monotonic(),
+                    0.0,
+                )
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            results = []
+            for future in done:
+                running.pop(future)
+                results.append(future.result())
+            if self.tool_timeout is not None:
+                now = time.monotonic()
+                for future, e in list(running.items()):
+                    if now - started[future] < self.tool_timeout:
+                        continue
+                    logging.warning(f"Tool of {e} timed out after {self.tool_timeout}s")
+                    running.pop(future)
+                    results.append(
+                        dict(
+                            e=e,
+                            plugin_cost=0,
+                            plugin_token=0,
+                            evidence="No evidence found.",
+                        )
+                    )
+
+            for result in results:
+                e = result["e"]
+                worker_evidences[e] = self._trim_evidence(result["evidence"])
+                yield {**result, "evidence": worker_evidences[e]}
+                for dependent in dependents[e]:
+                    waiting_on[dependent].discard(e)
+                    if not waiting_on[dependent]:
+                        ready.append(dependent)
+            start_ready()
+
     def _get_worker_evidence(
         self,
         planner_evidences: dict[str, str],
@@ -205,35 +329,19 @@ class RewooAgent(BaseAgent):
             planner_evidences: A mapping from #E to tool call.
             evidences_level: A list of levels of evidences.
                 Calculated from DAG of plugin calls.
-            output: Output object, defaults to BaseOutput().
+            output: Output object, defaults to BaseScratchPad().
         Returns:
             A mapping from #E to tool call.
         """
         worker_evidences: dict[str, str] = dict()
         plugin_cost, plugin_token = 0.0, 0.0
-        with ThreadPoolExecutor() as pool:
-            for level in evidences_level:
-                results = []
-                for e in level:
-                    results.append(
-                        pool.submit(
-                            self._run_plugin,
-                            e,
-                            planner_evidences,
-                            worker_evidences,
-                            output,
-                        )
-                    )
-                if len(results) > 1:
-                    output.update_status(f"Running tasks {level} in parallel.")
-                else:
-                    output.update_status(f"Running task {level[0]}.")
-                for r in results:
-                    resp = r.result()
-                    plugin_cost += resp["plugin_cost"]
-                    plugin_token += resp["plugin_token"]
-                    worker_evidences[resp["e"]] = self._trim_evidence(resp["evidence"])
-                output.done()
+        for result in self._iter_worker_evidence(
+            planner_evidences, evidences_level, output
+        ):
+            plugin_cost += result["plugin_cost"]
+            plugin_token += result["plugin_token"]
+            worker_evidences[result["e"]] = result["evidence"]
+        output.done()
 
         return worker_evidences, plugin_cost, plugin_token
 
@@ -334,26 +442,40 @@ class RewooAgent(BaseAgent):
             intermediate_steps=[{"planner_log": planner_text_output}],
         )
 
-        # Work
-        worker_evidences, plugin_cost, plugin_token = self._get_worker_evidence(
-            planner_evidences, evidence_level
-        )
+        # Work, each evidence is streamed as soon as it completes
+        e_to_plan = {e: plan for plan, es in plan_to_es.items() for e in es}
+        worker_evidences: dict[str, str] = dict()
+        plugin_cost, plugin_token = 0.0, 0.0
+        for result in self._iter_worker_evidence(planner_evidences, evidence_level):
+            e = result["e"]
+            plugin_cost += result["plugin_cost"]
+            plugin_token += result["plugin_token"]
+            worker_evidences[e] = result["evidence"]
+
+            plan = e_to_plan.get(e, None)
+            progress = f"{plan}: {plans[plan]}\n" if plan else ""
+            progress += f"#Action: {planner_evidences.get(e, None)}\n"
+            progress += f"{e}: {worker_evidences[e]}\n"
+            yield AgentOutput(
+                text="",
+                agent_type=self.agent_type,
+                status="thinking",
+                intermediate_steps=[{"evidence": e, "worker_log": progress}],
+            )
+
         worker_log = ""
         for plan in plan_to_es:
             worker_log += f"{plan}: {plans[plan]}\n"
-            current_progress = f"{plan}: {plans[plan]}\n"
             for e in plan_to_es[plan]:
                 worker_log += f"#Action: {planner_evidences.get(e, None)}\n"
                 worker_log += f"{e}: {worker_evidences[e]}\n"
-                current_progress += f"#Action: {planner_evidences.get(e, None)}\n"
-                current_progress += f"{e}: {worker_evidences[e]}\n"
-
-            yield AgentOutput(
-                text="",
-                agent_type=self.agent_type,
-                status="thinking",
-                intermediate_steps=[{"worker_log": current_progress}],
-            )
+            if not plan_to_es[plan]:
+                yield AgentOutput(
+                    text="",
+                    agent_type=self.agent_type,
+                    status="thinking",
+                    intermediate_steps=[{"worker_log": f"{plan}: {plans[plan]}\n"}],
+                )
 
         # Solve
         solver_response = ""
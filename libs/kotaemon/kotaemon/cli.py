@@ -139,6 +139,104 @@ def run(run_path, share, username, password, appname, port):
     demo.launch(**params)
 
 
+@promptui.command()
+@click.argument("dataset", required=True)
+@click.option(
+    "--config",
+    "config_path",
+    default="promptui.yml",
+    show_default=True,
+    help="The promptui config file, its `inputs` and `logs` are used",
+)
+@click.option(
+    "--pipeline",
+    required=False,
+    help="The pipeline to run. Required if the config has several pipelines",
+)
+@click.option(
+    "--params",
+    "params_path",
+    required=False,
+    help="YAML file of the params to set on the pipeline",
+)
+@click.option("--output", default="promptui_batch", show_default=True)
+@click.option("--concurrency", default=8, show_default=True)
+@click.option(
+    "--no-resume",
+    is_flag=True,
+    default=False,
+    help="Run every item again, instead of the items without a result",
+)
+@click.option(
+    "--export",
+    "export_path",
+    required=False,
+    help="Excel file to export the results to",
+)
+def batch(
+    dataset,
+    config_path,
+    pipeline,
+    params_path,
+    output,
+    concurrency,
+    no_resume,
+    export_path,
+):
+    """Run a pipeline over a dataset file (.jsonl, .json, .csv or .parquet)
+
+    The results are written as Parquet files in the --output directory. Running
+    the same command again resumes the batch.
+
+    Examples:
+
+        \b
+        $ kh promptui batch questions.jsonl --concurrency 16 --export results.xlsx
+    """
+    import sys
+
+    from kotaemon.contribs.promptui.batch import run_batch
+    from kotaemon.contribs.promptui.export import export_from_dict
+
+    sys.path.append(os.getcwd())
+
+    check_config_format(config_path)
+    with open(config_path) as f:
+        config_dict = yaml.safe_load(f)
+    if pipeline is None:
+        if len(config_dict) != 1:
+            raise click.BadParameter(
+                f"Choose the pipeline among {list(config_dict)}",
+                param_hint="--pipeline",
+            )
+        pipeline = next(iter(config_dict))
+
+    params = {}
+    if params_path is not None:
+        with open(params_path) as f:
+            params = yaml.safe_load(f) or {}
+
+    def callback(n_done, n_total):
+        click.echo(f"\rRunning: {n_done}/{n_total}", nl=n_done == n_total)
+
+    results = run_batch(
+        pipeline,
+        dataset,
+        output,
+        params=params,
+        config=config_dict[pipeline],
+        concurrency=concurrency,
+        resume=not no_resume,
+        callback=callback,
+    )
+
+    n_errors = int(results["error"].notna().sum())
+    print(f"{len(results)} results in {output}, {n_errors} errors")
+    if export_path is not None:
+        export_from_dict(config_dict, pipeline, export_path, results_dir=output)
+        print(f"Results exported to {export_path}")
+
+
 @main.command()
 @click.argument("module", required=True)
 @click.option(
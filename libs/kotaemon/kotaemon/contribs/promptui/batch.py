@@ -0,0 +1,245 @@
+"""Run a pipeline over a dataset, in parallel, and store the results in Parquet"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Type, Union
+
+import pandas as pd
+from theflow.utils.modules import import_dotted_string
+
+from kotaemon.base import BaseComponent, LLMInterface
+
+from .logs import ResultLog
+
+RESULT_COLUMNS = [
+    "id",
+    "error",
+    "latency",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+]
+INPUT_PREFIX = "input/"
+PARAM_PREFIX = "param/"
+
+
+def load_dataset(path: Union[str, Path]) -> List[dict]:
+    """Load the dataset rows from a .jsonl, .json, .csv or .parquet file
+
+    Each row holds the inputs of one run, and optionally its `id`
+    """
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        df = pd.read_json(path, lines=True, dtype=False)
+    elif path.suffix == ".json":
+        df = pd.read_json(path, dtype=False)
+    elif path.suffix == ".csv":
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    elif path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        raise ValueError(
+            f"Unsupported dataset format: {path.suffix}. "
+            "Must be one of .jsonl, .json, .csv, .parquet"
+        )
+    return df.to_dict("records")
+
+
+def load_results(output_dir: Union[str, Path]) -> pd.DataFrame:
+    """Load the results written by `run_batch` in `output_dir`
+
+    When an item was run several times (resumed after an error), its last result
+    is kept.
+    """
+    parts = sorted(Path(output_dir).glob("part-*.parquet"))
+    if not parts:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+    return df.drop_duplicates("id", keep="last").reset_index(drop=True)
+
+
+def _to_cell(value: Any) -> Any:
+    """Convert a logged value to a value that can be stored in a Parquet column"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_cell(each) for each in value]
+    if isinstance(value, dict):
+        return str({key: _to_cell(each) for key, each in value.items()})
+    text = getattr(value, "text", None)
+    if isinstance(text, str):
+        return text
+    return str(value)
+
+
+def _token_usage(run_logs: dict) -> dict:
+    """Sum the token usage of the LLM outputs logged by the steps of a run"""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    seen = set()
+    for step in run_logs.values():
+        output = step.get("output", None) if isinstance(step, dict) else None
+        # the output of a pipeline is often the output of its last step
+        if not isinstance(output, LLMInterface) or id(output) in seen:
+            continue
+        seen.add(id(output))
+        for key in usage:
+            usage[key] += max(getattr(output, key), 0)
+    return usage
+
+
+def _run_one(
+    pipeline_cls: Type[BaseComponent],
+    params: dict,
+    inputs: dict,
+    log_config: dict,
+    resultlog: Type,
+) -> dict:
+    """Run the pipeline on one item, and collect the logged infos of the run"""
+    result: Dict[str, Any] = {"error": None}
+    start = time.perf_counter()
+    try:
+        pipeline = pipeline_cls()
+        pipeline.set(params)
+        pipeline(**inputs)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["latency"] = time.perf_counter() - start
+        return result
+    result["latency"] = time.perf_counter() - start
+
+    run_logs = pipeline.last_run.logs() or {}
+    result.update(_token_usage(run_logs))
+
+    allowed_resultlog_callbacks = {i for i in dir(resultlog) if not i.startswith("__")}
+    for log_name, columns in log_config.items():
+        for name, col_info in columns.items():
+            if not isinstance(col_info, dict) or col_info.get("step") not in run_logs:
+                continue
+            info = run_logs[col_info["step"]]
+            getter = col_info.get("getter", None) or f"get_{name}"
+            if getter in allowed_resultlog_callbacks:
+                info = getattr(resultlog, getter)(info)
+            result[f"{log_name}/{name}"] = _to_cell(info)
+
+    return result
+
+
+def run_batch(
+    pipeline: Union[str, Type[BaseComponent]],
+    dataset: Union[str, Path, List[dict]],
+    output_dir: Union[str, Path],
+    params: Optional[dict] = None,
+    config: Optional[dict] = None,
+    concurrency: int = 8,
+    flush_every: int = 50,
+    resume: bool = True,
+    callback: Optional[Callable[[int, int], None]] = None,
+) -> pd.DataFrame:
+    """Run a pipeline over every item of a dataset
+
+    The items are run in a pool of `concurrency` threads. The results are flushed
+    to `output_dir/part-*.parquet` every `flush_every` items, so an interrupted
+    batch only re-runs the items that were not flushed, and the items that failed.
+
+    Each row of the results holds the `id` of the item, its inputs (prefixed with
+    `input/`), the params (prefixed with `param/`), the error if the run failed,
+    the latency in seconds, the token usage of the LLM calls, and the infos logged
+    in the `logs` section of the promptui `config` (as `<log name>/<column>`).
+
+    Args:
+        pipeline: the pipeline class, or its dotted path
+        dataset: the dataset rows, or a file loaded with `load_dataset`
+        output_dir: the directory of the Parquet files
+        params: the params set on the pipeline before each run
+        config: the promptui config of the pipeline, its `inputs` select the
+            columns of the dataset passed to the pipeline, and its `logs` the infos
+            to collect. By default, every column but `id` is passed as input.
+        concurrency: the number of items run at the same time
+        flush_every: the number of results kept in memory before being written
+        resume: skip the items that already have a result without error
+        callback: called with the number of items done and the number of items to
+            run, after each item
+
+    Returns:
+        all the results in `output_dir`
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Please install pyarrow: 'pip install pyarrow'")
+
+    pipeline_cls: Type[BaseComponent] = (
+        import_dotted_string(pipeline, safe=False)
+        if isinstance(pipeline, str)
+        else pipeline
+    )
+    if not isinstance(dataset, list):
+        dataset = load_dataset(dataset)
+    params = params or {}
+    config = config or {}
+    log_config = config.get("logs", {})
+    resultlog = getattr(pipeline_cls, "_promptui_resultlog", ResultLog)
+    input_names = list(config.get("inputs", {}).keys())
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    existing = load_results(output_dir)
+    if not resume and len(existing):
+        for part in output_dir.glob("part-*.parquet"):
+            part.unlink()
+        existing = load_results(output_dir)
+    done = set(existing.loc[existing["error"].isna(), "id"])
+
+    items: List[tuple] = []
+    for idx, row in enumerate(dataset):
+        item_id = str(row.get("id", idx))
+        if item_id in done:
+            continue
+        inputs = (
+            {name: row[name] for name in input_names if name in row}
+            if input_names
+            else {key: value for key, value in row.items() if key != "id"}
+        )
+        items.append((item_id, inputs))
+
+    n_parts = len(list(output_dir.glob("part-*.parquet")))
+    pending: List[dict] = []
+
+    def flush():
+        nonlocal n_parts
+        if not pending:
+            return
+        df = pd.DataFrame(pending)
+        df.to_parquet(output_dir / f"part-{n_parts:05d}.parquet", index=False)
+        n_parts += 1
+        pending.clear()
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = {
+            executor.submit(
+                _run_one, pipeline_cls, params, inputs, log_config, resultlog
+            ): (item_id, inputs)
+            for item_id, inputs in items
+        }
+        try:
+            for n_done, future in enumerate(as_completed(futures), start=1):
+                item_id, inputs = futures[future]
+                result = {"id": item_id, **future.result()}
+                result.update(
+                    {INPUT_PREFIX + k: _to_cell(v) for k, v in inputs.items()}
+                )
+                result.update(
+                    {PARAM_PREFIX + k: _to_cell(v) for k, v in params.items()}
+                )
+                pending.append(result)
+                if len(pending) >= flush_every:
+                    flush()
+                if callback is not None:
+                    callback(n_done, len(items))
+        finally:
+            # keep the finished results when the batch is interrupted
+            for future in futures:
+                future.cancel()
+            flush()
+
+    return load_results(output_dir)
@@ -2,7 +2,7 @@
 import os
 import pickle
 from pathlib import Path
-from typing import Any, Dict, List, Type, Union
+from typing import Any, Dict, List, Optional, Type, Union
 
 import pandas as pd
 import yaml
@@ -11,6 +11,7 @@ from theflow.utils.modules import import_dotted_string
 
 from kotaemon.base import BaseComponent
 
+from .batch import INPUT_PREFIX, PARAM_PREFIX, RESULT_COLUMNS, load_results
 from .logs import ResultLog
 
 
@@ -77,8 +78,34 @@ def from_log_to_dict(pipeline_cls: Type[BaseComponent], log_config: dict) -> dic
     return {"ids": ids, **params, **logged_infos}
 
 
-def export(config: dict, pipeline_def, output_path):
-    """Export from config to Excel file"""
+def from_batch_to_dict(results: pd.DataFrame, log_name: str) -> dict:
+    """Export the results of `run_batch` to the columns of a log
+
+    Args:
+        results: the results loaded with `load_results`
+        log_name: the name of the log in the config
+
+    Returns:
+        the ids, params and logged infos of each run, with the inputs, the error,
+        the latency and the token usage of the run
+    """
+    data: Dict[str, Any] = {"ids": results["id"].tolist()}
+    for prefix in [PARAM_PREFIX, f"{log_name}/", INPUT_PREFIX]:
+        for column in results.columns:
+            if column.startswith(prefix):
+                data[column[len(prefix) :]] = results[column].tolist()
+    for column in RESULT_COLUMNS[1:]:
+        if column in results.columns:
+            data[column] = results[column].tolist()
+    return data
+
+
+def export(config: dict, pipeline_def, output_path, results_dir: Optional[str] = None):
+    """Export from config to Excel file
+
+    The runs are read from the pipeline's run logs, or from the Parquet files of
+    `run_batch` when `results_dir` is given.
+    """
 
     pipeline_name = f"{pipeline_def.__module__}.{pipeline_def.__name__}"
 
@@ -87,8 +114,13 @@ def export(config: dict, pipeline_def, output_path):
         raise ValueError(f"Pipeline {pipeline_name} has no logs to export")
 
     pds: Dict[str, pd.DataFrame] = {}
-    for log_name, log_def in config["logs"].items():
-        pds[log_name] = pd.DataFrame(from_log_to_dict(pipeline_def, log_def))
+    if results_dir is not None:
+        results = load_results(results_dir)
+        for log_name in config["logs"]:
+            pds[log_name] = pd.DataFrame(from_batch_to_dict(results, log_name))
+    else:
+        for log_name, log_def in config["logs"].items():
+            pds[log_name] = pd.DataFrame(from_log_to_dict(pipeline_def, log_def))
 
     # from the list of pds, export to Excel to output_path
     with pd.ExcelWriter(output_path, engine="openpyxl") as writer:  # type: ignore
@@ -100,6 +132,7 @@ def export_from_dict(
     config: Union[str, dict],
     pipeline: Union[str, Type[BaseComponent]],
     output_path: str,
+    results_dir: Optional[str] = None,
 ):
     """CLI to export the logs of a pipeline into Excel file
 
@@ -107,6 +140,8 @@ def export_from_dict(
         config_path (str): Path to the config file
         pipeline_name (str): Name of the pipeline
         output_path (str): Path to the output Excel file
+        results_dir (str): Directory of the `run_batch` results, to export them
+            instead of the run logs
     """
     # get the pipeline class and the relevant config dict
     config_dict: dict
@@ -138,4 +173,4 @@ def export_from_dict(
             f"`pipeline` must be str or subclass of BaseComponent, not {type(pipeline)}"
         )
 
-    export(pipeline_config, pipeline_cls, output_path)
+    export(pipeline_config, pipeline_cls, output_path, results_dir=results_dir)
@@ -1,3 +1,5 @@
+import asyncio
+from functools import partial
 from typing import TYPE_CHECKING, Optional
 
 from kotaemon.base import Document, DocumentWithEmbedding, Param
@@ -68,5 +70,8 @@ class FastEmbedEmbeddings(BaseEmbeddings):
     async def ainvoke(
         self, text: str | list[str] | Document | list[Document], *args, **kwargs
     ) -> list[DocumentWithEmbedding]:
-        """Fastembed does not support async API."""
-        return self.invoke(text, *args, **kwargs)
+        """Fastembed does not support async API, so the embeddings are computed in
+        a thread, to not block the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.invoke, text, *args, **kwargs)
+        )
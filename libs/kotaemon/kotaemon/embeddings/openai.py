@@ -42,6 +42,8 @@ class BaseOpenAIEmbeddings(BaseEmbeddings):
 
         - Implement the `prepare_client` method to return the OpenAI client
         - Implement the `openai_response` method to return the OpenAI response
+        - Implement the `aopenai_response` method to return the OpenAI response
+          with the async client, to use `ainvoke`
         - Implement the params relate to the OpenAI client
     """
 
@@ -84,12 +86,18 @@ class BaseOpenAIEmbeddings(BaseEmbeddings):
         """Get the openai response"""
         raise NotImplementedError
 
-    def invoke(
-        self, text: str | list[str] | Document | list[Document], *args, **kwargs
-    ) -> list[DocumentWithEmbedding]:
-        input_doc = self.prepare_input(text)
-        client = self.prepare_client(async_version=False)
+    async def aopenai_response(self, client, **kwargs):
+        """Get the openai response, with the async client"""
+        raise NotImplementedError
+
+    def split_input(
+        self, input_doc: list[Document]
+    ) -> tuple[list[str | list[int]], dict[int, tuple[int, int]]]:
+        """Split the documents longer than the context length of the model
 
+        Returns:
+            the inputs of the model, and the range of the inputs of each document
+        """
         input_: list[str | list[int]] = []
         splitted_indices = {}
         for idx, text in enumerate(input_doc):
@@ -100,8 +108,16 @@ class BaseOpenAIEmbeddings(BaseEmbeddings):
             else:
                 splitted_indices[idx] = (len(input_), len(input_) + 1)
                 input_.append(text.text)
-
-        resp = self.openai_response(client, input=input_, **kwargs).dict()
+        return input_, splitted_indices
+
+    def combine_output(
+        self,
+        input_doc: list[Document],
+        input_: list[str | list[int]],
+        splitted_indices: dict[int, tuple[int, int]],
+        resp: dict,
+    ) -> list[DocumentWithEmbedding]:
+        """Average the embeddings of the parts of each split document"""
         output_ = list(sorted(resp["data"], key=lambda x: x["index"]))
 
         output = []
@@ -124,19 +140,25 @@ class BaseOpenAIEmbeddings(BaseEmbeddings):
 
         return output
 
+    def invoke(
+        self, text: str | list[str] | Document | list[Document], *args, **kwargs
+    ) -> list[DocumentWithEmbedding]:
+        input_doc = self.prepare_input(text)
+        client = self.prepare_client(async_version=False)
+
+        input_, splitted_indices = self.split_input(input_doc)
+        resp = self.openai_response(client, input=input_, **kwargs).dict()
+        return self.combine_output(input_doc, input_, splitted_indices, resp)
+
     async def ainvoke(
         self, text: str | list[str] | Document | list[Document], *args, **kwargs
     ) -> list[DocumentWithEmbedding]:
-        input_ = self.prepare_input(text)
+        input_doc = self.prepare_input(text)
         client = self.prepare_client(async_version=True)
-        resp = await self.openai_response(
-            client, input=[_.text if _.text else " " for _ in input_], **kwargs
-        ).dict()
-        output_ = sorted(resp["data"], key=lambda x: x["index"])
-        return [
-            DocumentWithEmbedding(embedding=o["embedding"], content=i)
-            for i, o in zip(input_, output_)
-        ]
+
+        input_, splitted_indices = self.split_input(input_doc)
+        resp = (await self.aopenai_response(client, input=input_, **kwargs)).dict()
+        return self.combine_output(input_doc, input_, splitted_indices, resp)
 
 
 class OpenAIEmbeddings(BaseOpenAIEmbeddings):
@@ -193,6 +215,24 @@ class OpenAIEmbeddings(BaseOpenAIEmbeddings):
 
         return client.embeddings.create(**params)
 
+    @retry(
+        retry=retry_if_not_exception_type(
+            (openai.NotFoundError, openai.BadRequestError)
+        ),
+        wait=wait_random_exponential(min=1, max=40),
+        stop=stop_after_attempt(6),
+    )
+    async def aopenai_response(self, client, **kwargs):
+        """Get the openai response, with the async client"""
+        params: dict = {
+            "model": self.model,
+        }
+        if self.dimensions:
+            params["dimensions"] = self.dimensions
+        params.update(kwargs)
+
+        return await client.embeddings.create(**params)
+
 
 class AzureOpenAIEmbeddings(BaseOpenAIEmbeddings):
     azure_endpoint: str = Param(
@@ -255,3 +295,21 @@ class AzureOpenAIEmbeddings(BaseOpenAIEmbeddings):
         params.update(kwargs)
 
         return client.embeddings.create(**params)
+
+    @retry(
+        retry=retry_if_not_exception_type(
+            (openai.NotFoundError, openai.BadRequestError)
+        ),
+        wait=wait_random_exponential(min=1, max=40),
+        stop=stop_after_attempt(6),
+    )
+    async def aopenai_response(self, client, **kwargs):
+        """Get the openai response, with the async client"""
+        params: dict = {
+            "model": self.azure_deployment,
+        }
+        if self.dimensions:
+            params["dimensions"] = self.dimensions
+        params.update(kwargs)
+
+        return await client.embeddings.create(**params)
@@ -0,0 +1,178 @@
+"""Export the chunks of the indexed files, one append-only file per source file
+
+The chunks of a source are appended as JSON lines to `<source id>.jsonl` in the
+export directory, their file name is kept in each line. Next to it,
+`<source id>.jsonl.idx` holds the byte offset of each line as a fixed-width
+integer, so that the n-th chunk is read without scanning the export. The files
+are written by a single background thread, in the order the chunks are
+submitted, off the indexing path.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import struct
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+from kotaemon.base import Document
+
+EXPORT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+# the offset of a chunk in the export, as an unsigned 64-bit integer
+_OFFSET = struct.Struct("<Q")
+# the metadata exported with the text of the chunks
+EXPORTED_METADATA = ("file_name", "page_label", "section", "type", "image_origin")
+
+
+def source_id_of(doc: Document) -> Optional[str]:
+    """Return the source of a chunk: its file id, otherwise its file name"""
+    source_id = doc.metadata.get("file_id") or doc.metadata.get("file_name")
+    return Path(source_id).name if source_id else None
+
+
+def export_path(export_dir: str | Path, source_id: str) -> Path:
+    """Return the export of the chunks of `source_id`"""
+    return Path(export_dir) / f"{source_id}{EXPORT_SUFFIX}"
+
+
+def index_path(export_dir: str | Path, source_id: str) -> Path:
+    """Return the offset index of the export of `source_id`"""
+    path = export_path(export_dir, source_id)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def to_record(doc: Document) -> dict:
+    record = {"doc_id": doc.doc_id}
+    for key in EXPORTED_METADATA:
+        if key in doc.metadata:
+            record[key] = doc.metadata[key]
+    record["text"] = doc.text
+    return record
+
+
+def iter_exports(export_dir: str | Path) -> Iterator[Path]:
+    """Yield the exports of the chunks in `export_dir`"""
+    if not export_dir or not os.path.isdir(export_dir):
+        return
+    with os.scandir(export_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(EXPORT_SUFFIX):
+                yield Path(entry.path)
+
+
+def count_chunks(export_dir: str | Path, source_id: str) -> int:
+    path = index_path(export_dir, source_id)
+    if not path.exists():
+        return 0
+    return path.stat().st_size // _OFFSET.size
+
+
+def read_chunks(
+    export_dir: str | Path, source_id: str, start: int = 0, stop: Optional[int] = None
+) -> list[dict]:
+    """Read the exported chunks `start` to `stop` (excluded) of `source_id`"""
+    n_chunks = count_chunks(export_dir, source_id)
+    stop = n_chunks if stop is None else min(stop, n_chunks)
+    if start >= stop:
+        return []
+
+    with open(index_path(export_dir, source_id), "rb") as f:
+        f.seek(start * _OFFSET.size)
+        offsets = f.read((stop - start) * _OFFSET.size)
+
+    records = []
+    with open(export_path(export_dir, source_id), "rb") as f:
+        # each line is read at its offset, skipping the lines of an interrupted
+        # write, which are not indexed
+        for (offset,) in _OFFSET.iter_unpack(offsets):
+            f.seek(offset)
+            records.append(json.loads(f.readline()))
+    return records
+
+
+class ChunkExportSink:
+    """Write the exports of the chunks in a background thread
+
+    The thread is started with the first submitted chunks. The exports are
+    complete once `flush` returns.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name="chunk-export", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, export_dir: str | Path, docs: list[Document]):
+        """Append the chunks `docs`, of the same source, to the export of the source
+
+        The source is the `file_id` of the chunks, their `file_name` if they have
+        no id, the chunks without either are not exported.
+        """
+        if not docs:
+            return
+        source_id = source_id_of(docs[0])
+        if not source_id:
+            return
+
+        # the records are taken now, the documents may change once indexed
+        records = [to_record(doc) for doc in docs]
+        self._ensure_thread()
+        self._queue.put(("append", Path(export_dir), source_id, records))
+
+    def remove(self, export_dir: str | Path, source_id: str):
+        """Remove the export of `source_id`, after the chunks already submitted"""
+        self._ensure_thread()
+        self._queue.put(("remove", Path(export_dir), source_id, None))
+
+    def flush(self):
+        """Wait until the submitted chunks are written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _work(self):
+        while True:
+            action, export_dir, source_id, records = self._queue.get()
+            try:
+                if action == "append":
+                    self._append(export_dir, source_id, records)
+                else:
+                    export_path(export_dir, source_id).unlink(missing_ok=True)
+                    index_path(export_dir, source_id).unlink(missing_ok=True)
+            except Exception as e:
+                print(f"Failed to export the chunks of {source_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _append(self, export_dir: Path, source_id: str, records: list[dict]):
+        export_dir.mkdir(parents=True, exist_ok=True)
+        lines = [
+            (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+            for record in records
+        ]
+        with open(export_path(export_dir, source_id), "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            offsets = []
+            for line in lines:
+                offsets.append(_OFFSET.pack(offset))
+                offset += len(line)
+            f.write(b"".join(lines))
+
+        # the offsets are written after their lines, so that the index never
+        # points past the end of the export
+        with open(index_path(export_dir, source_id), "ab") as f:
+            f.write(b"".join(offsets))
+
+
+# shared by the indexing pipelines, so that a single thread writes the exports
+chunk_exports = ChunkExportSink()
@@ -1,64 +1,144 @@
+import threading
+from collections.abc import MutableMapping
 from pathlib import Path
-from typing import Type
+from typing import Iterator, Optional, Type
 
 from decouple import config
 from llama_index.core.readers.base import BaseReader
-from llama_index.readers.file import PDFReader
 from theflow.settings import settings as flowsettings
+from theflow.utils.modules import import_dotted_string
 
 from kotaemon.base import BaseComponent, Document, Param
 from kotaemon.indices.extractors import BaseDocParser
 from kotaemon.indices.splitters import BaseSplitter, TokenSplitter
-from kotaemon.loaders import (
-    AdobeReader,
-    AzureAIDocumentIntelligenceLoader,
-    DirectoryReader,
-    DoclingReader,
-    HtmlReader,
-    MathpixPDFReader,
-    MhtmlReader,
-    OCRReader,
-    PandasExcelReader,
-    PDFThumbnailReader,
-    TxtReader,
-    UnstructuredReader,
-    WebReader,
-)
 
-web_reader = WebReader()
-unstructured = UnstructuredReader()
-adobe_reader = AdobeReader()
-azure_reader = AzureAIDocumentIntelligenceLoader(
-    endpoint=str(config("AZURE_DI_ENDPOINT", default="")),
-    credential=str(config("AZURE_DI_CREDENTIAL", default="")),
-    cache_dir=getattr(flowsettings, "KH_MARKDOWN_OUTPUT_DIR", None),
+# name -> dotted path of the reader class, imported on first use
+KH_READERS: dict[str, str] = {
+    "web": "kotaemon.loaders.WebReader",
+    "unstructured": "kotaemon.loaders.UnstructuredReader",
+    "adobe": "kotaemon.loaders.AdobeReader",
+    "azure-di": "kotaemon.loaders.AzureAIDocumentIntelligenceLoader",
+    "docling": "kotaemon.loaders.DoclingReader",
+    "docling-vlm": "kotaemon.loaders.DoclingReader",
+    "excel": "kotaemon.loaders.PandasExcelReader",
+    "html": "kotaemon.loaders.HtmlReader",
+    "mhtml": "kotaemon.loaders.MhtmlReader",
+    "txt": "kotaemon.loaders.TxtReader",
+    "pdf-thumbnail": "kotaemon.loaders.PDFThumbnailReader",
+    "pdf": "llama_index.readers.file.PDFReader",
+    "ocr": "kotaemon.loaders.OCRReader",
+    "mathpix": "kotaemon.loaders.MathpixPDFReader",
+}
+# the readers captioning the figures with the VLM endpoint
+_VLM_READERS = ("adobe", "azure-di", "docling-vlm")
+
+_readers: dict[str, BaseReader] = {}
+_readers_lock = threading.Lock()
+
+
+def _create_reader(name: str) -> BaseReader:
+    reader_cls = import_dotted_string(KH_READERS.get(name, name), safe=False)
+    if name == "azure-di":
+        reader = reader_cls(
+            endpoint=str(config("AZURE_DI_ENDPOINT", default="")),
+            credential=str(config("AZURE_DI_CREDENTIAL", default="")),
+            cache_dir=getattr(flowsettings, "KH_MARKDOWN_OUTPUT_DIR", None),
+        )
+    else:
+        reader = reader_cls()
+    if name in _VLM_READERS:
+        reader.vlm_endpoint = getattr(flowsettings, "KH_VLM_ENDPOINT", "")
+    return reader
+
+
+def get_reader(name: str) -> BaseReader:
+    """Get the shared reader instance, importing and creating it on first use
+
+    Args:
+        name: a name in `KH_READERS`, or the dotted path of a reader class
+    """
+    reader = _readers.get(name)
+    if reader is None:
+        with _readers_lock:
+            reader = _readers.get(name)
+            if reader is None:
+                reader = _readers[name] = _create_reader(name)
+    return reader
+
+
+class LazyReaders(MutableMapping):
+    """Mapping of file extension to reader
+
+    A reader can be given by name or dotted path (see `get_reader`), in which
+    case it is only imported and created when its extension is looked up.
+    Copies share the reader instances.
+    """
+
+    def __init__(self, readers: Optional[dict[str, "BaseReader | str"]] = None):
+        self._readers: dict[str, BaseReader | str] = dict(readers or {})
+
+    def __getitem__(self, ext: str) -> BaseReader:
+        reader = self._readers[ext]
+        if isinstance(reader, str):
+            return get_reader(reader)
+        return reader
+
+    def __setitem__(self, ext: str, reader: "BaseReader | str"):
+        self._readers[ext] = reader
+
+    def __delitem__(self, ext: str):
+        del self._readers[ext]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._readers)
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    def copy(self) -> "LazyReaders":
+        return LazyReaders(self._readers)
+
+    def __deepcopy__(self, memo) -> "LazyReaders":
+        return self.copy()
+
+
+KH_DEFAULT_FILE_EXTRACTORS = LazyReaders(
+    {
+        ".xlsx": "excel",
+        ".docx": "unstructured",
+        ".pptx": "unstructured",
+        ".xls": "unstructured",
+        ".doc": "unstructured",
+        ".html": "html",
+        ".mhtml": "mhtml",
+        ".png": "unstructured",
+        ".jpeg": "unstructured",
+        ".jpg": "unstructured",
+        ".tiff": "unstructured",
+        ".tif": "unstructured",
+        # ".pdf": "pdf-thumbnail",
+        ".pdf": "docling",
+        ".txt": "txt",
+        ".md": "txt",
+    }
 )
-docling_reader = DoclingReader()
-adobe_reader.vlm_endpoint = (
-    azure_reader.vlm_endpoint
-) = docling_reader.vlm_endpoint = getattr(flowsettings, "KH_VLM_ENDPOINT", "")
-
-
-KH_DEFAULT_FILE_EXTRACTORS: dict[str, BaseReader] = {
-    ".xlsx": PandasExcelReader(),
-    ".docx": unstructured,
-    ".pptx": unstructured,
-    ".xls": unstructured,
-    ".doc": unstructured,
-    ".html": HtmlReader(),
-    ".mhtml": MhtmlReader(),
-    ".png": unstructured,
-    ".jpeg": unstructured,
-    ".jpg": unstructured,
-    ".tiff": unstructured,
-    ".tif": unstructured,
-    # ".pdf": PDFThumbnailReader(),
-    ".pdf": DoclingReader(),
-    ".txt": TxtReader(),
-    ".md": TxtReader(),
+
+_LEGACY_READERS = {
+    "web_reader": "web",
+    "unstructured": "unstructured",
+    "adobe_reader": "adobe",
+    "azure_reader": "azure-di",
+    "docling_reader": "docling-vlm",
 }
 
 
+def __getattr__(name: str) -> BaseReader:
+    # the module-level reader instances that used to be created at import time
+    if name in _LEGACY_READERS:
+        return get_reader(_LEGACY_READERS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 class DocumentIngestor(BaseComponent):
     """Ingest common office document types into Document for indexing
 
@@ -91,21 +171,27 @@ class DocumentIngestor(BaseComponent):
 
     def _get_reader(self, input_files: list[str | Path]):
         """Get appropriate readers for the input files based on file extension"""
-        file_extractors: dict[str, BaseReader] = {
-            ext: reader for ext, reader in KH_DEFAULT_FILE_EXTRACTORS.items()
-        }
+        from kotaemon.loaders import DirectoryReader
+
+        readers = KH_DEFAULT_FILE_EXTRACTORS.copy()
         for ext, cls in self.override_file_extractors.items():
-            file_extractors[ext] = cls()
+            readers[ext] = cls()
 
         if self.pdf_mode == "normal":
-            file_extractors[".pdf"] = PDFReader()
+            readers[".pdf"] = "pdf"
         elif self.pdf_mode == "ocr":
-            file_extractors[".pdf"] = OCRReader()
+            readers[".pdf"] = "ocr"
         elif self.pdf_mode == "multimodal":
-            # file_extractors[".pdf"] = AdobeReader()
-            file_extractors[".pdf"] = DoclingReader()
+            # readers[".pdf"] = "adobe"
+            readers[".pdf"] = "docling"
         else:
-            file_extractors[".pdf"] = MathpixPDFReader()
+            readers[".pdf"] = "mathpix"
+
+        # only create the readers of the extensions to read
+        extensions = {Path(file_path).suffix.lower() for file_path in input_files}
+        file_extractors: dict[str, BaseReader] = {
+            ext: readers[ext] for ext in extensions if ext in readers
+        }
 
         main_reader = DirectoryReader(
             input_files=input_files,
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import threading
 import uuid
-from pathlib import Path
 from typing import Optional, Sequence, cast
 
 from theflow.settings import settings as flowsettings
@@ -12,6 +11,7 @@ from kotaemon.embeddings import BaseEmbeddings
 from kotaemon.storages import BaseDocumentStore, BaseVectorStore
 
 from .base import BaseIndexing, BaseRetrieval
+from .chunk_export import chunk_exports
 from .rankings import BaseReranking, LLMReranking
 
 VECTOR_STORE_FNAME = "vectorstore"
@@ -31,7 +31,6 @@ class VectorIndexing(BaseIndexing):
     vector_store: BaseVectorStore
     doc_store: Optional[BaseDocumentStore] = None
     embedding: BaseEmbeddings
-    count_: int = 0
 
     def to_retrieval_pipeline(self, *args, **kwargs):
         """Convert the indexing pipeline to a retrieval pipeline"""
@@ -43,38 +42,17 @@ class VectorIndexing(BaseIndexing):
         )
 
     def write_chunk_to_file(self, docs: list[Document]):
-        # save the chunks content into markdown format
+        """Append the chunks to the export of their file, in the background
+
+        See `kotaemon.indices.chunk_export` for the format of the export.
+        """
+        if self.cache_dir:
+            chunk_exports.submit(self.cache_dir, docs)
+
+    def remove_chunk_file(self, source_id: str):
+        """Remove the export of the chunks of `source_id`, see `write_chunk_to_file`"""
         if self.cache_dir:
-            file_name = docs[0].metadata.get("file_name")
-            if not file_name:
-                return
-
-            file_name = Path(file_name)
-            for i in range(len(docs)):
-                markdown_content = ""
-                if "page_label" in docs[i].metadata:
-                    page_label = str(docs[i].metadata["page_label"])
-                    markdown_content += f"Page label: {page_label}"
-                if "file_name" in docs[i].metadata:
-                    filename = docs[i].metadata["file_name"]
-                    markdown_content += f"\nFile name: {filename}"
-                if "section" in docs[i].metadata:
-                    section = docs[i].metadata["section"]
-                    markdown_content += f"\nSection: {section}"
-                if "type" in docs[i].metadata:
-                    if docs[i].metadata["type"] == "image":
-                        image_origin = docs[i].metadata["image_origin"]
-                        image_origin = f'<p><img src="{image_origin}"></p>'
-                        markdown_content += f"\nImage origin: {image_origin}"
-                if docs[i].text:
-                    markdown_content += f"\ntext:\n{docs[i].text}"
-
-                with open(
-                    Path(self.cache_dir) / f"{file_name.stem}_{self.count_+i}.md",
-                    "w",
-                    encoding="utf-8",
-                ) as f:
-                    f.write(markdown_content)
+            chunk_exports.remove(self.cache_dir, source_id)
 
     def add_to_docstore(self, docs: list[Document]):
         if self.doc_store:
@@ -110,7 +88,6 @@ class VectorIndexing(BaseIndexing):
         self.add_to_vectorstore(input_)
         self.add_to_docstore(input_)
         self.write_chunk_to_file(input_)
-        self.count_ += len(input_)
 
 
 class VectorRetrieval(BaseRetrieval):
@@ -256,6 +233,8 @@ class VectorRetrieval(BaseRetrieval):
         non_thumbnail_docs = []
         raw_thumbnail_docs = []
         for doc in result:
+            # the thumbnails are no longer in the vector store, but they can still
+            # be returned by the full-text search of the docstore
             if doc.metadata.get("type") == "thumbnail":
                 # change type to image to display on UI
                 doc.metadata["type"] = "image"
@@ -1,4 +1,5 @@
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List, Optional
 
 from kotaemon.base import BaseComponent, Document, Param
 
@@ -11,6 +12,9 @@ class SimpleBranchingPipeline(BaseComponent):
 
     Attributes:
         branches (List[BaseComponent]): The list of branches to be executed.
+        concurrent (bool): Run the branches at the same time, in threads. The
+            outputs keep the order of the branches. The branches should then be
+            different component instances. Default to False.
 
     Example:
         ```python
@@ -50,6 +54,7 @@ class SimpleBranchingPipeline(BaseComponent):
     """
 
     branches: List[BaseComponent] = Param(default_callback=lambda *_: [])
+    concurrent: bool = False
 
     def add_branch(self, component: BaseComponent):
         """
@@ -60,6 +65,28 @@ class SimpleBranchingPipeline(BaseComponent):
         """
         self.branches.append(component)
 
+    def _run_branches(self, **kwargs) -> Iterator[Any]:
+        """Yield the output of each branch, in the order of the branches
+
+        In concurrent mode, when the caller closes the iterator early, the branches
+        that have not started are cancelled, and the running ones are not waited for.
+        """
+        for i, branch in enumerate(self.branches):
+            self._prepare_child(branch, name=f"branch-{i}")
+
+        if not self.concurrent or len(self.branches) < 2:
+            for branch in self.branches:
+                yield branch(**kwargs)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=len(self.branches))
+        try:
+            futures = [executor.submit(branch, **kwargs) for branch in self.branches]
+            for future in futures:
+                yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def run(self, **prompt_kwargs):
         """
         Execute the pipeline by running each branch and return the outputs as a list.
@@ -70,12 +97,7 @@ class SimpleBranchingPipeline(BaseComponent):
         Returns:
             List: The outputs of each branch as a list.
         """
-        output = []
-        for i, branch in enumerate(self.branches):
-            self._prepare_child(branch, name=f"branch-{i}")
-            output.append(branch(**prompt_kwargs))
-
-        return output
+        return list(self._run_branches(**prompt_kwargs))
 
 
 class GatedBranchingPipeline(SimpleBranchingPipeline):
@@ -88,6 +110,9 @@ class GatedBranchingPipeline(SimpleBranchingPipeline):
 
     Attributes:
         branches (List[BaseComponent]): The list of branches to be executed.
+        concurrent (bool): Run the branches at the same time, in threads. The output
+            is still the one of the first passing branch in order, and the branches
+            after it are cancelled if they have not started. Default to False.
 
     Example:
         ```python
@@ -145,11 +170,13 @@ class GatedBranchingPipeline(SimpleBranchingPipeline):
         if condition_text is None:
             raise ValueError("`condition_text` must be provided.")
 
-        for i, branch in enumerate(self.branches):
-            self._prepare_child(branch, name=f"branch-{i}")
-            output = branch(condition_text=condition_text, **prompt_kwargs)
-            if output:
-                return output
+        outputs = self._run_branches(condition_text=condition_text, **prompt_kwargs)
+        try:
+            for output in outputs:
+                if output:
+                    return output
+        finally:
+            outputs.close()
 
         return Document(None)
 
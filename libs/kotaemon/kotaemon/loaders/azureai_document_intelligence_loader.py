@@ -1,59 +1,13 @@
-import base64
 import os
-from io import BytesIO
 from pathlib import Path
 from typing import Optional
 
-from PIL import Image
-
 from kotaemon.base import Document, Param
 
 from .base import BaseReader
-from .utils.adobe import generate_single_figure_caption
-
-
-def crop_image(file_path: Path, bbox: list[float], page_number: int = 0) -> Image.Image:
-    """Crop the image based on the bounding box
-
-    Args:
-        file_path (Path): path to the image file
-        bbox (list[float]): bounding box of the image (in percentage [x0, y0, x1, y1])
-        page_number (int, optional): page number of the image. Defaults to 0.
-
-    Returns:
-        Image.Image: cropped image
-    """
-    left, upper, right, lower = bbox
-
-    left, right = min(left, right), max(left, right)
-    upper, lower = min(upper, lower), max(upper, lower)
-
-    img: Image.Image
-    suffix = file_path.suffix.lower()
-    if suffix == ".pdf":
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("Please install PyMuPDF: 'pip install PyMuPDF'")
-
-        doc = fitz.open(file_path)
-        page = doc.load_page(page_number)
-        pm = page.get_pixmap(dpi=150)
-        img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-    elif suffix in [".tif", ".tiff"]:
-        img = Image.open(file_path)
-        img.seek(page_number)
-    else:
-        img = Image.open(file_path)
-
-    return img.crop(
-        (
-            int(left * img.width),
-            int(upper * img.height),
-            int(right * img.width),
-            int(lower * img.height),
-        )
-    )
+from .pdf_loader import convert_image_to_base64
+from .utils.captioning import crop_image  # noqa: F401
+from .utils.captioning import crop_images, get_figure_captioner
 
 
 class AzureAIDocumentIntelligenceLoader(BaseReader):
@@ -144,14 +98,15 @@ class AzureAIDocumentIntelligenceLoader(BaseReader):
         removed_spans: list[dict] = []
 
         # extract the figures
-        figures = []
+        figure_descs = []
+        figure_crops = []
         for figure_desc in result.get("figures", []):
             if not self.vlm_endpoint:
                 continue
             if file_path.suffix.lower() not in self.figure_friendly_filetypes:
                 continue
 
-            # read & crop the image
+            # locate the image
             page_number = figure_desc["boundingRegions"][0]["pageNumber"]
             page_width = result.pages[page_number - 1]["width"]
             page_height = result.pages[page_number - 1]["height"]
@@ -164,24 +119,27 @@ class AzureAIDocumentIntelligenceLoader(BaseReader):
                 max(xs) / page_width,
                 max(ys) / page_height,
             ]
-            img = crop_image(file_path, bbox, page_number - 1)
-
-            # convert the image into base64
-            img_bytes = BytesIO()
-            img.save(img_bytes, format="PNG")
-            img_base64 = base64.b64encode(img_bytes.getvalue()).decode("utf-8")
-            img_base64 = f"data:image/png;base64,{img_base64}"
-
-            # caption the image
-            caption = generate_single_figure_caption(
-                figure=img_base64, vlm_endpoint=self.vlm_endpoint
-            )
+            figure_descs.append(figure_desc)
+            figure_crops.append((bbox, page_number - 1))
+
+        # read & crop the images, then caption them concurrently
+        imgs = crop_images(file_path, figure_crops) if figure_crops else []
+        imgs_base64 = [convert_image_to_base64(img) for img in imgs]
+        captions = (
+            get_figure_captioner(self.vlm_endpoint).caption_many(imgs_base64)
+            if imgs_base64
+            else []
+        )
 
+        figures = []
+        for figure_desc, (_, page_idx), img_base64, caption in zip(
+            figure_descs, figure_crops, imgs_base64, captions
+        ):
             # store the image into document
             figure_metadata = {
                 "image_origin": img_base64,
                 "type": "image",
-                "page_label": page_number,
+                "page_label": page_idx + 1,
             }
             figure_metadata.update(metadata)
 
@@ -1,14 +1,171 @@
-import base64
+import json
+import multiprocessing
+import threading
 from collections import defaultdict
-from io import BytesIO
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional
+
+from decouple import config
 
 from kotaemon.base import Document, Param
 
-from .azureai_document_intelligence_loader import crop_image
 from .base import BaseReader
-from .utils.adobe import generate_single_figure_caption, make_markdown_table
+from .pdf_loader import convert_image_to_base64
+from .utils.adobe import make_markdown_table
+from .utils.captioning import crop_images, get_figure_captioner
+
+DOCLING_NUM_WORKERS = config("DOCLING_NUM_WORKERS", default=0, cast=int)
+
+
+_converter_pool: dict[str, Any] = {}
+# one lock per options key, so that loading a converter does not block the others
+_converter_locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+_converter_locks_lock = threading.Lock()
+
+# per worker process converter, see `_init_converter_worker`
+_worker_converter: Any = None
+_process_pools: dict[tuple[str, int], ProcessPoolExecutor] = {}
+_process_pools_lock = threading.Lock()
+# pending conversions of the multi-process mode, by (options key, file key)
+_prefetched: dict[tuple[str, tuple], Future] = {}
+
+
+def _options_key(docling_options: Optional[dict]) -> str:
+    return json.dumps(docling_options or {}, sort_keys=True, default=str)
+
+
+def _file_key(file_path: str | Path) -> tuple[str, int, int]:
+    """Identify a file version by its resolved path, modified time and size"""
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def build_docling_converter(docling_options: Optional[dict] = None):
+    """Build a Docling `DocumentConverter` from the options dict
+
+    This loads the OCR and table-structure models, prefer
+    `get_docling_converter` to reuse the converters.
+    """
+    try:
+        from docling.datamodel.base_models import InputFormat
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling.datamodel.pipeline_options import (
+            PdfPipelineOptions,
+            RapidOcrOptions,
+        )
+    except ImportError:
+        raise ImportError("Please install docling: 'pip install docling'")
+
+    # 从配置获取 OCR 和 PDF 设置
+    docling_options = docling_options or {}
+    ocr_config = docling_options.get("ocr", {})
+    pdf_config = docling_options.get("pdf", {})
+    pipeline_config = docling_options.get("pipeline_options", {})
+
+    # 创建 PDF 管道选项
+    pipeline_options = PdfPipelineOptions()
+
+    # 应用管道选项配置
+    if pipeline_config:
+        pipeline_options.do_ocr = pipeline_config.get("do_ocr", True)
+        pipeline_options.do_table_structure = pipeline_config.get(
+            "do_table_structure", True
+        )
+
+        # 表格结构选项
+        if "table_structure_options" in pipeline_config:
+            ts_options = pipeline_config["table_structure_options"]
+            pipeline_options.table_structure_options.do_cell_matching = ts_options.get(
+                "do_cell_matching", True
+            )
+    else:
+        # 默认配置
+        pipeline_options.do_ocr = True
+        pipeline_options.do_table_structure = True
+        pipeline_options.table_structure_options.do_cell_matching = True
+
+    # 配置 RapidOCR 选项
+    try:
+        ocr_options = RapidOcrOptions(force_full_page_ocr=True, **ocr_config)
+        pipeline_options.ocr_options = ocr_options
+
+        # 应用 OCR 模型参数
+        if "ocr_model_params" in pipeline_config:
+            model_params = pipeline_config["ocr_model_params"]
+            for key, value in model_params.items():
+                if hasattr(ocr_options, key):
+                    setattr(ocr_options, key, value)
+    except Exception as e:
+        print(f"Error configuring OCR options: {e}, using default settings")
+        pipeline_options.ocr_options = RapidOcrOptions(force_full_page_ocr=True)
+
+    # 创建文档转换器
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(
+                pipeline_options=pipeline_options, **pdf_config
+            )
+        }
+    )
+
+    return converter
+
+
+def get_docling_converter(docling_options: Optional[dict] = None):
+    """Get the process-wide warm converter of the options dict
+
+    The converters are built once per distinct options and reused across files,
+    readers and users.
+    """
+    key = _options_key(docling_options)
+    with _converter_locks_lock:
+        lock = _converter_locks[key]
+    with lock:
+        if key not in _converter_pool:
+            _converter_pool[key] = build_docling_converter(docling_options)
+        return _converter_pool[key]
+
+
+def preload_docling_converters(options_list: Optional[list[dict]] = None):
+    """Load the converters ahead of time, e.g. at app startup
+
+    Args:
+        options_list: list of options dicts to preload. Default to the
+            default options.
+    """
+    for docling_options in options_list or [{}]:
+        get_docling_converter(docling_options)
+
+
+def _init_converter_worker(docling_options: Optional[dict]):
+    global _worker_converter
+    _worker_converter = build_docling_converter(docling_options)
+
+
+def _convert_in_worker(file_path: str) -> dict:
+    return _worker_converter.convert(file_path).document.export_to_dict()
+
+
+def get_converter_process_pool(
+    docling_options: Optional[dict], num_workers: int
+) -> ProcessPoolExecutor:
+    """Get the process pool whose workers each hold a warm converter
+
+    The workers are spawned rather than forked: the app process is
+    multi-threaded and may already hold initialized torch / onnx runtimes.
+    """
+    key = (_options_key(docling_options), num_workers)
+    with _process_pools_lock:
+        if key not in _process_pools:
+            _process_pools[key] = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_converter_worker,
+                initargs=(docling_options,),
+            )
+        return _process_pools[key]
 
 
 class DoclingReader(BaseReader):
@@ -41,71 +198,75 @@ class DoclingReader(BaseReader):
         ),
     )
 
-    @Param.auto(cache=True)
+    docling_options: dict = Param(
+        {},
+        help=(
+            "Docling converter options, with the `ocr`, `pdf` and "
+            "`pipeline_options` keys. Readers with the same options share the "
+            "same warm converter."
+        ),
+    )
+
+    num_workers: int = Param(
+        DOCLING_NUM_WORKERS,
+        help=(
+            "Number of worker processes used by `prefetch` to convert several "
+            "files in parallel. Set to 0 or 1 to disable."
+        ),
+    )
+
+    @Param.auto(cache=True, depends_on=["docling_options"])
     def converter_(self):
-        try:
-            from docling.datamodel.base_models import InputFormat
-            from docling.document_converter import DocumentConverter, PdfFormatOption
-            from docling.datamodel.pipeline_options import (
-                PdfPipelineOptions,
-                RapidOcrOptions,
-            )
-        except ImportError:
-            raise ImportError("Please install docling: 'pip install docling'")
-
-        # 从配置获取 OCR 和 PDF 设置
-        docling_options = getattr(self, 'options', {}).get('docling_options', {})
-        ocr_config = docling_options.get('ocr', {})
-        pdf_config = docling_options.get('pdf', {})
-        pipeline_config = docling_options.get('pipeline_options', {})
-
-        # 创建 PDF 管道选项
-        pipeline_options = PdfPipelineOptions()
-        
-        # 应用管道选项配置
-        if pipeline_config:
-            pipeline_options.do_ocr = pipeline_config.get('do_ocr', True)
-            pipeline_options.do_table_structure = pipeline_config.get('do_table_structure', True)
-            
-            # 表格结构选项
-            if 'table_structure_options' in pipeline_config:
-                ts_options = pipeline_config['table_structure_options']
-                pipeline_options.table_structure_options.do_cell_matching = ts_options.get('do_cell_matching', True)
-        else:
-            # 默认配置
-            pipeline_options.do_ocr = True
-            pipeline_options.do_table_structure = True
-            pipeline_options.table_structure_options.do_cell_matching = True
-
-        # 配置 RapidOCR 选项
-        try:
-            ocr_options = RapidOcrOptions(
-                force_full_page_ocr=True,
-                **ocr_config
-            )
-            pipeline_options.ocr_options = ocr_options
-            
-            # 应用 OCR 模型参数
-            if 'ocr_model_params' in pipeline_config:
-                model_params = pipeline_config['ocr_model_params']
-                for key, value in model_params.items():
-                    if hasattr(ocr_options, key):
-                        setattr(ocr_options, key, value)
-        except Exception as e:
-            print(f"Error configuring OCR options: {e}, using default settings")
-            pipeline_options.ocr_options = RapidOcrOptions(force_full_page_ocr=True)
-
-        # 创建文档转换器
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_options=pipeline_options,
-                    **pdf_config
-                )
-            }
-        )
-        
-        return converter
+        return get_docling_converter(self.docling_options)
+
+    def prefetch(self, file_paths: List[str | Path]):
+        """Convert several files in parallel with the multi-process mode
+
+        The results are kept until `load_data` is called with the same, unchanged
+        file, or until `discard_prefetched` is called. Do nothing when
+        `num_workers` is smaller than 2.
+        """
+        if self.num_workers < 2:
+            return
+
+        pool = get_converter_process_pool(self.docling_options, self.num_workers)
+        options_key = _options_key(self.docling_options)
+        with _process_pools_lock:
+            for file_path in file_paths:
+                file_key = _file_key(file_path)
+                key = (options_key, file_key)
+                if key not in _prefetched:
+                    _prefetched[key] = pool.submit(_convert_in_worker, file_key[0])
+
+    def discard_prefetched(self, file_paths: List[str | Path]):
+        """Drop the prefetched results of the files that were not loaded
+
+        E.g. the files skipped because they are already indexed. The pending
+        conversions are cancelled.
+        """
+        options_key = _options_key(self.docling_options)
+        paths = {str(Path(file_path).resolve()) for file_path in file_paths}
+        with _process_pools_lock:
+            # any version of the files, they may have changed since the prefetch
+            keys = [
+                key
+                for key in _prefetched
+                if key[0] == options_key and key[1][0] in paths
+            ]
+            for key in keys:
+                _prefetched.pop(key).cancel()
+
+    def _convert(self, file_path: str | Path) -> dict:
+        key = (_options_key(self.docling_options), _file_key(file_path))
+        with _process_pools_lock:
+            future = _prefetched.pop(key, None)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"Error converting {file_path} in worker process: {e}")
+
+        return self.converter_.convert(file_path).document.export_to_dict()
 
     def run(
         self, file_path: str | Path, extra_info: Optional[dict] = None, **kwargs
@@ -119,15 +280,14 @@ class DoclingReader(BaseReader):
 
         metadata = extra_info or {}
 
-        result = self.converter_.convert(file_path)
-        result_dict = result.document.export_to_dict()
+        result_dict = self._convert(file_path)
 
         file_path = Path(file_path)
         file_name = file_path.name
 
         # extract the figures
-        figures = []
-        gen_caption_count = 0
+        figure_entries = []
+        figure_crops = []
         for figure_obj in result_dict.get("pictures", []):
             if not self.vlm_endpoint:
                 continue
@@ -146,7 +306,7 @@ class DoclingReader(BaseReader):
                     print(e)
                     continue
 
-            # read & crop image
+            # locate the image
             page_number = figure_obj["prov"][0]["page_no"]
 
             try:
@@ -163,27 +323,29 @@ class DoclingReader(BaseReader):
                 ]
                 if bbox_obj["coord_origin"] == "BOTTOMLEFT":
                     bbox = self._convert_bbox_bl_tl(bbox, page_width, page_height)
-
-                img = crop_image(file_path, bbox, page_number - 1)
             except KeyError as e:
                 print(e, list(result_dict["pages"].keys()))
                 continue
 
-            # convert img to base64
-            img_bytes = BytesIO()
-            img.save(img_bytes, format="PNG")
-            img_base64 = base64.b64encode(img_bytes.getvalue()).decode("utf-8")
-            img_base64 = f"data:image/png;base64,{img_base64}"
-
-            # generate the generative caption
-            if gen_caption_count >= self.max_figure_to_caption:
-                gen_caption = ""
-            else:
-                gen_caption_count += 1
-                gen_caption = generate_single_figure_caption(
-                    img_base64, self.vlm_endpoint
-                )
+            figure_entries.append((page_number, extractive_captions))
+            figure_crops.append((bbox, page_number - 1))
+
+        # read & crop the images from a single open of the document, then
+        # generate the generative captions concurrently
+        imgs = crop_images(file_path, figure_crops) if figure_crops else []
+        imgs_base64 = [convert_image_to_base64(img) for img in imgs]
+        gen_captions = (
+            get_figure_captioner(self.vlm_endpoint).caption_many(
+                imgs_base64, max_figures=self.max_figure_to_caption
+            )
+            if imgs_base64
+            else []
+        )
 
+        figures = []
+        for (page_number, extractive_captions), img_base64, gen_caption in zip(
+            figure_entries, imgs_base64, gen_captions
+        ):
             # join the extractive and generative captions
             caption = "\n".join(extractive_captions + [gen_caption])
 
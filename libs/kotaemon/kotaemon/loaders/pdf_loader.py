@@ -1,4 +1,7 @@
 import base64
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -11,16 +14,31 @@ from PIL import Image
 from kotaemon.base import Document
 
 PDF_LOADER_DPI = config("PDF_LOADER_DPI", default=40, cast=int)
+PDF_LOADER_NUM_WORKERS = config("PDF_LOADER_NUM_WORKERS", default=0, cast=int)
+PDF_LOADER_PAGES_PER_WORKER_TASK = config(
+    "PDF_LOADER_PAGES_PER_WORKER_TASK", default=16, cast=int
+)
+PDF_LOADER_THUMBNAIL_FORMAT = config("PDF_LOADER_THUMBNAIL_FORMAT", default="PNG")
+PDF_LOADER_THUMBNAIL_QUALITY = config(
+    "PDF_LOADER_THUMBNAIL_QUALITY", default=75, cast=int
+)
 
 
 def get_page_thumbnails(
-    file_path: Path, pages: list[int], dpi: int = PDF_LOADER_DPI
+    file_path: Path,
+    pages: list[int],
+    dpi: int = PDF_LOADER_DPI,
+    img_format: str = PDF_LOADER_THUMBNAIL_FORMAT,
+    quality: int = PDF_LOADER_THUMBNAIL_QUALITY,
 ) -> List[Image.Image]:
     """Get image thumbnails of the pages in the PDF file.
 
     Args:
         file_path (Path): path to the image file
         page_number (list[int]): list of page numbers to extract
+        dpi (int): resolution of the thumbnails
+        img_format (str): image format of the thumbnails (PNG, JPEG, WEBP)
+        quality (int): encoding quality, only used by lossy formats
 
     Returns:
         list[Image.Image]: list of page thumbnails
@@ -41,29 +59,206 @@ def get_page_thumbnails(
         page = doc.load_page(page_number)
         pm = page.get_pixmap(dpi=dpi)
         img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
-        output_imgs.append(convert_image_to_base64(img))
+        output_imgs.append(convert_image_to_base64(img, img_format, quality))
 
     return output_imgs
 
 
-def convert_image_to_base64(img: Image.Image) -> str:
+def convert_image_to_base64(
+    img: Image.Image, img_format: str = "PNG", quality: int | None = None
+) -> str:
     # convert the image into base64
+    img_format = img_format.upper()
+    if img_format == "JPG":
+        img_format = "JPEG"
+
+    save_kwargs = {}
+    if quality is not None and img_format in ("JPEG", "WEBP"):
+        save_kwargs["quality"] = quality
+
     img_bytes = BytesIO()
-    img.save(img_bytes, format="PNG")
+    img.save(img_bytes, format=img_format, **save_kwargs)
     img_base64 = base64.b64encode(img_bytes.getvalue()).decode("utf-8")
-    img_base64 = f"data:image/png;base64,{img_base64}"
+    img_base64 = f"data:image/{img_format.lower()};base64,{img_base64}"
 
     return img_base64
 
 
+def load_page_range(
+    file_path: str,
+    start: int,
+    end: int,
+    dpi: int = PDF_LOADER_DPI,
+    img_format: str = PDF_LOADER_THUMBNAIL_FORMAT,
+    quality: int = PDF_LOADER_THUMBNAIL_QUALITY,
+) -> list[tuple[int, str, str, str]]:
+    """Extract the text and render the thumbnail of the pages [start, end)
+
+    Both are done from a single open of the document, so that each page is only
+    loaded once. This function is meant to be run inside a worker process.
+
+    Returns:
+        list of (page index, page label, page text, base64 thumbnail)
+    """
+    try:
+        import fitz
+    except ImportError:
+        raise ImportError("Please install PyMuPDF: 'pip install PyMuPDF'")
+
+    output = []
+    with fitz.open(file_path) as doc:
+        for page_idx in range(start, min(end, doc.page_count)):
+            page = doc.load_page(page_idx)
+            page_label = page.get_label() or str(page_idx + 1)
+            text = page.get_text()
+            pm = page.get_pixmap(dpi=dpi)
+            img = Image.frombytes("RGB", [pm.width, pm.height], pm.samples)
+            thumbnail = convert_image_to_base64(img, img_format, quality)
+            output.append((page_idx, page_label, text, thumbnail))
+
+    return output
+
+
+_page_pools: dict[int, ProcessPoolExecutor] = {}
+_page_pools_lock = threading.Lock()
+
+
+def get_page_process_pool(num_workers: int) -> ProcessPoolExecutor:
+    """Get the process pool shared by all the PDF loads with `num_workers`
+
+    Use the spawn start method, forking the multi-threaded app server can
+    deadlock the workers.
+    """
+    with _page_pools_lock:
+        if num_workers not in _page_pools:
+            _page_pools[num_workers] = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _page_pools[num_workers]
+
+
+def load_pages_parallel(
+    file_path: Path,
+    num_workers: int,
+    pages_per_task: int = PDF_LOADER_PAGES_PER_WORKER_TASK,
+    dpi: int = PDF_LOADER_DPI,
+    img_format: str = PDF_LOADER_THUMBNAIL_FORMAT,
+    quality: int = PDF_LOADER_THUMBNAIL_QUALITY,
+) -> list[tuple[int, str, str, str]]:
+    """Split the PDF into page ranges and load them in a process pool
+
+    Returns:
+        list of (page index, page label, page text, base64 thumbnail), in page order
+    """
+    try:
+        import fitz
+    except ImportError:
+        raise ImportError("Please install PyMuPDF: 'pip install PyMuPDF'")
+
+    with fitz.open(file_path) as doc:
+        n_pages = doc.page_count
+
+    pages_per_task = max(1, pages_per_task)
+    ranges = [
+        (start, start + pages_per_task) for start in range(0, n_pages, pages_per_task)
+    ]
+    if num_workers <= 1 or len(ranges) <= 1:
+        return load_page_range(str(file_path), 0, n_pages, dpi, img_format, quality)
+
+    executor = get_page_process_pool(num_workers)
+    futures = [
+        executor.submit(
+            load_page_range,
+            str(file_path),
+            start,
+            end,
+            dpi,
+            img_format,
+            quality,
+        )
+        for start, end in ranges
+    ]
+    output = []
+    # the futures are kept in submission order, so pages come back in order
+    for future in futures:
+        output.extend(future.result())
+
+    return output
+
+
 class PDFThumbnailReader(PDFReader):
-    """PDF parser with thumbnail for each page."""
+    """PDF parser with thumbnail for each page.
+
+    Args:
+        num_workers: when larger than 1, the pages are split into ranges that are
+            loaded by a pool of worker processes. Each worker extracts the text and
+            renders the thumbnail of a page in the same pass. Otherwise, the text is
+            parsed by `PDFReader` and the thumbnails are rendered afterward.
+        pages_per_task: number of pages handled by a worker task
+        dpi: resolution of the thumbnails
+        thumbnail_format: image format of the thumbnails (PNG, JPEG, WEBP)
+        thumbnail_quality: encoding quality of the lossy thumbnail formats
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        num_workers: int = PDF_LOADER_NUM_WORKERS,
+        pages_per_task: int = PDF_LOADER_PAGES_PER_WORKER_TASK,
+        dpi: int = PDF_LOADER_DPI,
+        thumbnail_format: str = PDF_LOADER_THUMBNAIL_FORMAT,
+        thumbnail_quality: int = PDF_LOADER_THUMBNAIL_QUALITY,
+    ) -> None:
         """
         Initialize PDFReader.
         """
         super().__init__(return_full_document=False)
+        self.num_workers = num_workers
+        self.pages_per_task = pages_per_task
+        self.dpi = dpi
+        self.thumbnail_format = thumbnail_format
+        self.thumbnail_quality = thumbnail_quality
+
+    def load_data_parallel(
+        self,
+        file: Path,
+        extra_info: Optional[Dict] = None,
+    ) -> List[Document]:
+        """Parse file with the page-parallel mode."""
+        pages = load_pages_parallel(
+            file,
+            num_workers=self.num_workers,
+            pages_per_task=self.pages_per_task,
+            dpi=self.dpi,
+            img_format=self.thumbnail_format,
+            quality=self.thumbnail_quality,
+        )
+
+        documents = []
+        thumbnail_docs = []
+        for _, page_label, text, thumbnail in pages:
+            try:
+                _ = int(page_label)
+            except ValueError:
+                continue
+
+            metadata = {"page_label": page_label, "file_name": file.name}
+            if extra_info is not None:
+                metadata.update(extra_info)
+            documents.append(Document(text=text, metadata=metadata))
+            thumbnail_docs.append(
+                Document(
+                    text="Page thumbnail",
+                    metadata={
+                        "image_origin": thumbnail,
+                        "type": "thumbnail",
+                        "page_label": page_label,
+                        **(extra_info if extra_info is not None else {}),
+                    },
+                )
+            )
+
+        return documents + thumbnail_docs
 
     def load_data(
         self,
@@ -72,6 +267,10 @@ class PDFThumbnailReader(PDFReader):
         fs: Optional[AbstractFileSystem] = None,
     ) -> List[Document]:
         """Parse file."""
+        file = Path(file)
+        if self.num_workers > 1 and fs is None:
+            return self.load_data_parallel(file, extra_info)
+
         documents = super().load_data(file, extra_info, fs)
 
         page_numbers_str = []
@@ -94,7 +293,13 @@ class PDFThumbnailReader(PDFReader):
         page_numbers = list(range(len(page_numbers_str)))
 
         print("Page numbers:", len(page_numbers))
-        page_thumbnails = get_page_thumbnails(file, page_numbers)
+        page_thumbnails = get_page_thumbnails(
+            file,
+            page_numbers,
+            dpi=self.dpi,
+            img_format=self.thumbnail_format,
+            quality=self.thumbnail_quality,
+        )
 
         documents.extend(
             [
@@ -1,4 +1,7 @@
-from typing import List, Tuple
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 
 def bbox_to_points(box: List[int]):
@@ -103,6 +106,134 @@ def get_rect_iou(gt_box: List[tuple], pd_box: List[tuple], iou_type=0) -> int:
     return iou
 
 
+def locations_to_array(locations: List[List[tuple]]) -> np.ndarray:
+    """Convert a list of locations to an (N, 4) array of [x1, y1, x2, y2]
+
+    Only the top-left and bottom-right points are used, as in `get_rect_iou`.
+    """
+    if len(locations) == 0:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.array(
+        [[loc[0][0], loc[0][1], loc[2][0], loc[2][1]] for loc in locations],
+        dtype=np.float64,
+    )
+
+
+def get_rect_iou_matrix(
+    gt_boxes: np.ndarray, pd_boxes: np.ndarray, iou_type=0
+) -> np.ndarray:
+    """Vectorized version of `get_rect_iou` over two sets of boxes
+
+    Args:
+        gt_boxes: (N, 4) array of [x1, y1, x2, y2], see `locations_to_array`
+        pd_boxes: (M, 4) array of [x1, y1, x2, y2]
+        iou_type: same as `get_rect_iou`
+
+    Returns:
+        (N, M) array, element [i, j] is the IOU between gt_boxes[i] and pd_boxes[j]
+    """
+    assert iou_type in [0, 1], "Only support 0: origin iou, 1: intersection / min(area)"
+
+    gt = gt_boxes[:, None, :]
+    pd = pd_boxes[None, :, :]
+    x_left = np.maximum(gt[..., 0], pd[..., 0])
+    y_top = np.maximum(gt[..., 1], pd[..., 1])
+    x_right = np.minimum(gt[..., 2], pd[..., 2])
+    y_bottom = np.minimum(gt[..., 3], pd[..., 3])
+    inter_area = np.maximum(0, x_right - x_left) * np.maximum(0, y_bottom - y_top)
+
+    gt_area = (gt[..., 2] - gt[..., 0]) * (gt[..., 3] - gt[..., 1])
+    pd_area = (pd[..., 2] - pd[..., 0]) * (pd[..., 3] - pd[..., 1])
+
+    if iou_type == 0:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return inter_area / (gt_area + pd_area - inter_area)
+    return inter_area / np.maximum(np.minimum(gt_area, pd_area), 1)
+
+
+class BoxGridIndex:
+    """Grid-bucketed spatial index of boxes
+
+    Each box is registered in every grid cell it covers, so that the boxes that
+    can intersect a query box are found by looking at the few cells it covers
+    instead of comparing against every box.
+
+    Args:
+        boxes: (N, 4) array of [x1, y1, x2, y2], see `locations_to_array`
+        cell_size: size of the grid cell. Default to twice the median box size.
+    """
+
+    def __init__(self, boxes: np.ndarray, cell_size: Optional[float] = None):
+        self.boxes = boxes
+        if cell_size is None:
+            if len(boxes):
+                extents = np.concatenate(
+                    [boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]]
+                )
+                cell_size = float(np.median(extents)) * 2
+            cell_size = max(cell_size or 0.0, 1.0)
+        self.cell_size = cell_size
+
+        self._buckets: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for box_id, box in enumerate(boxes):
+            for cell in self._cells(*self._cell_range(box)):
+                self._buckets[cell].append(box_id)
+
+        # bounds of the occupied cells, to clip the query ranges
+        if self._buckets:
+            cells = np.array(list(self._buckets.keys()))
+            self._grid_min = cells.min(axis=0)
+            self._grid_max = cells.max(axis=0)
+
+    def _cell_range(self, box) -> tuple[int, int, int, int]:
+        x1, y1, x2, y2 = (int(pos // self.cell_size) for pos in box)
+        return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+    @staticmethod
+    def _cells(gx1: int, gy1: int, gx2: int, gy2: int):
+        for gx in range(gx1, gx2 + 1):
+            for gy in range(gy1, gy2 + 1):
+                yield gx, gy
+
+    def query(self, box) -> np.ndarray:
+        """Return the sorted ids of the boxes sharing a grid cell with `box`"""
+        if len(self.boxes) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        gx1, gy1, gx2, gy2 = self._cell_range(box)
+        gx1, gy1 = max(gx1, self._grid_min[0]), max(gy1, self._grid_min[1])
+        gx2, gy2 = min(gx2, self._grid_max[0]), min(gy2, self._grid_max[1])
+        if gx1 > gx2 or gy1 > gy2:
+            return np.zeros(0, dtype=np.int64)
+
+        candidates: set[int] = set()
+        if (gx2 - gx1 + 1) * (gy2 - gy1 + 1) > len(self._buckets):
+            # the query covers more cells than are occupied
+            for (gx, gy), box_ids in self._buckets.items():
+                if gx1 <= gx <= gx2 and gy1 <= gy <= gy2:
+                    candidates.update(box_ids)
+        else:
+            for cell in self._cells(gx1, gy1, gx2, gy2):
+                candidates.update(self._buckets.get(cell, ()))
+        return np.array(sorted(candidates), dtype=np.int64)
+
+    def match(self, box, iou_thres: float, iou_type=0) -> np.ndarray:
+        """Return the sorted ids of the boxes whose IOU with `box` > `iou_thres`
+
+        Only valid for non-negative thresholds: boxes that do not intersect have
+        zero IOU and are never returned.
+        """
+        candidates = self.query(box)
+        if candidates.size == 0:
+            return candidates
+        ious = get_rect_iou_matrix(
+            np.asarray(box, dtype=np.float64)[None, :],
+            self.boxes[candidates],
+            iou_type=iou_type,
+        )[0]
+        return candidates[ious > iou_thres]
+
+
 def sort_funsd_reading_order(lines: List[dict], box_key_name: str = "box"):
     """Sort cell list to create the right reading order using their locations
 
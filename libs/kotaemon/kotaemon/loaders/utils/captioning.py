@@ -0,0 +1,264 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+from decouple import config
+from PIL import Image
+from tenacity import (
+    after_log,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from .gpt4v import generate_gpt4v
+
+logger = logging.getLogger(__name__)
+
+KH_VLM_MAX_WORKERS = config("KH_VLM_MAX_WORKERS", default=4, cast=int)
+KH_VLM_TIMEOUT = config("KH_VLM_TIMEOUT", default=60, cast=float)
+KH_VLM_MAX_RETRIES = config("KH_VLM_MAX_RETRIES", default=3, cast=int)
+KH_VLM_CAPTION_CACHE_SIZE = config("KH_VLM_CAPTION_CACHE_SIZE", default=1024, cast=int)
+
+DEFAULT_CAPTION_PROMPT = "Provide a short 2 sentence summary of this image?"
+
+
+def crop_images(
+    file_path: Path, crops: list[tuple[list[float], int]], dpi: int = 150
+) -> List[Image.Image]:
+    """Crop several images from a file, opening it only once
+
+    Each page is rendered at most once, however many figures it contains.
+
+    Args:
+        file_path (Path): path to the image file
+        crops (list[tuple[list[float], int]]): list of (bbox, page_number), where
+            bbox is in percentage [x0, y0, x1, y1] and page_number starts from 0
+        dpi (int): resolution used to render the PDF pages
+
+    Returns:
+        list[Image.Image]: cropped images, in the same order as `crops`
+    """
+    file_path = Path(file_path)
+    suffix = file_path.suffix.lower()
+    pages: dict[int, Image.Image] = {}
+    output = []
+
+    doc = None
+    if suffix == ".pdf":
+        try:
+            import fitz
+        except ImportError:
+            raise ImportError("Please install PyMuPDF: 'pip install PyMuPDF'")
+        doc = fitz.open(file_path)
+    else:
+        source_img = Image.open(file_path)
+
+    try:
+        for bbox, page_number in crops:
+            if page_number not in pages:
+                if doc is not None:
+                    pm = doc.load_page(page_number).get_pixmap(dpi=dpi)
+                    pages[page_number] = Image.frombytes(
+                        "RGB", [pm.width, pm.height], pm.samples
+                    )
+                elif suffix in [".tif", ".tiff"]:
+                    source_img.seek(page_number)
+                    pages[page_number] = source_img.copy()
+                else:
+                    pages[page_number] = source_img
+
+            img = pages[page_number]
+            left, upper, right, lower = bbox
+            left, right = min(left, right), max(left, right)
+            upper, lower = min(upper, lower), max(upper, lower)
+            output.append(
+                img.crop(
+                    (
+                        int(left * img.width),
+                        int(upper * img.height),
+                        int(right * img.width),
+                        int(lower * img.height),
+                    )
+                )
+            )
+    finally:
+        if doc is not None:
+            doc.close()
+
+    return output
+
+
+def crop_image(file_path: Path, bbox: list[float], page_number: int = 0) -> Image.Image:
+    """Crop the image based on the bounding box
+
+    Args:
+        file_path (Path): path to the image file
+        bbox (list[float]): bounding box of the image (in percentage [x0, y0, x1, y1])
+        page_number (int, optional): page number of the image. Defaults to 0.
+
+    Returns:
+        Image.Image: cropped image
+    """
+    return crop_images(file_path, [(bbox, page_number)])[0]
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether a failed VLM request is worth retrying
+
+    Timeouts, connection errors, rate limiting (429) and server errors (5xx) are
+    transient. Other client errors (bad request, authentication, content filter)
+    will fail the same way again.
+    """
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return False
+
+
+class FigureCaptioner:
+    """Caption figures with a VLM endpoint
+
+    At most `max_workers` requests are in flight at once, across all the calls
+    sharing this captioner. Each request has a timeout, and transient failures are
+    retried with exponential backoff. The captions are cached by image hash, so
+    the same figure is only captioned once per process.
+
+    Args:
+        vlm_endpoint: the VLM endpoint
+        max_workers: maximum number of concurrent requests to the endpoint
+        timeout: timeout in seconds of each request
+        max_retries: maximum number of attempts of each request
+        cache_size: maximum number of captions kept in the cache
+        prompt: the captioning prompt
+    """
+
+    def __init__(
+        self,
+        vlm_endpoint: str,
+        max_workers: int = KH_VLM_MAX_WORKERS,
+        timeout: Optional[float] = KH_VLM_TIMEOUT,
+        max_retries: int = KH_VLM_MAX_RETRIES,
+        cache_size: int = KH_VLM_CAPTION_CACHE_SIZE,
+        prompt: str = DEFAULT_CAPTION_PROMPT,
+    ):
+        self.vlm_endpoint = vlm_endpoint
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_retries = max(1, max_retries)
+        self.cache_size = cache_size
+        self.prompt = prompt
+
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(self.max_workers)
+
+    def _cache_key(self, figure: str) -> str:
+        return sha256(f"{self.prompt}\n{figure}".encode()).hexdigest()
+
+    def _request(self, figure: str) -> str:
+        @retry(
+            retry=retry_if_exception(is_retryable_error),
+            stop=stop_after_attempt(self.max_retries),
+            wait=wait_exponential(multiplier=1, min=1, max=30),
+            after=after_log(logger, logging.WARNING),
+            reraise=True,
+        )
+        def _generate():
+            # the slot is released during the backoff between attempts
+            with self._semaphore:
+                return generate_gpt4v(
+                    endpoint=self.vlm_endpoint,
+                    prompt=self.prompt,
+                    images=figure,
+                    timeout=self.timeout,
+                    raise_on_error=True,
+                )
+
+        return _generate()
+
+    def caption(self, figure: str) -> str:
+        """Caption a single figure
+
+        Args:
+            figure: the base64 image
+
+        Returns:
+            the caption, or an empty string if the figure cannot be captioned
+        """
+        if not figure or not self.vlm_endpoint:
+            return ""
+
+        key = self._cache_key(figure)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        try:
+            output = self._request(figure)
+        except Exception as e:
+            print(f"Error generating caption: {e}")
+            return ""
+
+        if "sorry" in output.lower():
+            output = ""
+
+        with self._lock:
+            self._cache[key] = output
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return output
+
+    def caption_many(
+        self, figures: List[str], max_figures: Optional[int] = None
+    ) -> List[str]:
+        """Caption several figures concurrently
+
+        Args:
+            figures: list of base64 images
+            max_figures: the maximum number of figures to caption, the rest get an
+                empty caption. Caption all figures if None.
+
+        Returns:
+            the captions, in the same order as `figures`
+        """
+        if max_figures is None:
+            max_figures = len(figures)
+        to_gen_figures = figures[:max_figures]
+        other_figures = figures[max_figures:]
+
+        if len(to_gen_figures) <= 1 or self.max_workers == 1:
+            results = [self.caption(figure) for figure in to_gen_figures]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(to_gen_figures))
+            ) as executor:
+                results = list(executor.map(self.caption, to_gen_figures))
+
+        return results + [""] * len(other_figures)
+
+
+_captioners: dict[str, FigureCaptioner] = {}
+_captioners_lock = threading.Lock()
+
+
+def get_figure_captioner(vlm_endpoint: str) -> FigureCaptioner:
+    """Get the process-wide captioner of a VLM endpoint
+
+    The captioner is shared by all the multimodal loaders, so that the
+    concurrency limit and the caption cache apply across them.
+    """
+    with _captioners_lock:
+        if vlm_endpoint not in _captioners:
+            _captioners[vlm_endpoint] = FigureCaptioner(vlm_endpoint)
+        return _captioners[vlm_endpoint]
@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import Any, List
+from typing import Any, List, Optional
 
 import requests
 from decouple import config
@@ -14,6 +14,8 @@ def generate_gpt4v(
     prompt: str,
     max_tokens: int = 512,
     max_images: int = 10,
+    timeout: Optional[float] = None,
+    raise_on_error: bool = False,
 ) -> str:
     # OpenAI API Key
     api_key = config("AZURE_OPENAI_API_KEY", default="")
@@ -45,12 +47,14 @@ def generate_gpt4v(
     if len(images) > max_images:
         print(f"Truncated to {max_images} images (original {len(images)} images")
 
-    response = requests.post(endpoint, headers=headers, json=payload)
+    response = requests.post(endpoint, headers=headers, json=payload, timeout=timeout)
 
     try:
         response.raise_for_status()
     except Exception as e:
         logger.exception(f"Error generating gpt4v: {response.text}; error {e}")
+        if raise_on_error:
+            raise
         return ""
 
     output = response.json()
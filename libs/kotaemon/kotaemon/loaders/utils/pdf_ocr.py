@@ -2,12 +2,16 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
+import numpy as np
+
 from .box import (
+    BoxGridIndex,
     bbox_to_points,
     box_area,
     box_h,
     box_w,
-    get_rect_iou,
+    get_rect_iou_matrix,
+    locations_to_array,
     points_to_bbox,
     scale_box,
     scale_points,
@@ -74,15 +78,13 @@ def merge_ocr_and_pdf_texts(
     if debug_info is not None:
         cv2, debug_im = debug_info
 
-    for ocr_item in ocr_list:
-        matched = False
-        for pdf_item in pdf_text_list:
-            if (
-                get_rect_iou(ocr_item["location"], pdf_item["location"], iou_type=1)
-                > IOU_THRES
-            ):
-                matched = True
-                break
+    pdf_index = BoxGridIndex(
+        locations_to_array([pdf_item["location"] for pdf_item in pdf_text_list])
+    )
+    ocr_boxes = locations_to_array([ocr_item["location"] for ocr_item in ocr_list])
+
+    for ocr_item, ocr_box in zip(ocr_list, ocr_boxes):
+        matched = pdf_index.match(ocr_box, IOU_THRES, iou_type=1).size > 0
 
         color = (255, 0, 0)
         if not matched:
@@ -138,8 +140,17 @@ def merge_table_cell_and_ocr(
     table_list = sorted(table_list, key=lambda item: box_area(item["bbox"]))
 
     all_tables = []
-    matched_pdf_ids = []
-    matched_cell_ids = []
+    matched_pdf = np.zeros(len(pdf_list), dtype=bool)
+    matched_cell = np.zeros(len(cell_list), dtype=bool)
+
+    cell_boxes = locations_to_array([cell["location"] for cell in cell_list])
+    cell_areas = np.array([box_area(cell["bbox"]) for cell in cell_list])
+    item_indices = {
+        item_type: BoxGridIndex(
+            locations_to_array([item["location"] for item in item_list])
+        )
+        for item_list, item_type in [(pdf_list, "pdf"), (ocr_list, "ocr")]
+    }
 
     for table in table_list:
         if debug_info is not None:
@@ -152,64 +163,67 @@ def merge_table_cell_and_ocr(
             )
 
         cur_table_cells = []
-        for cell_id, cell in enumerate(cell_list):
-            if cell_id in matched_cell_ids:
-                continue
-
-            if get_rect_iou(
-                table["location"], cell["location"], iou_type=1
-            ) > IOU_THRES and box_area(table["bbox"]) > box_area(cell["bbox"]):
-                color = [128, 0, 128]
-                # cell matched to table
-                for item_list, item_type in [(pdf_list, "pdf"), (ocr_list, "ocr")]:
-                    cell["ocr"] = []
-                    for item_id, item in enumerate(item_list):
-                        if item_type == "pdf" and item_id in matched_pdf_ids:
-                            continue
-                        if (
-                            get_rect_iou(item["location"], cell["location"], iou_type=1)
-                            > IOU_THRES
-                        ):
-                            cell["ocr"].append(item)
-                            if item_type == "pdf":
-                                matched_pdf_ids.append(item_id)
-
-                    if len(cell["ocr"]) > 0:
-                        # check if union of matched ocr does
-                        # not extend over cell boundary,
-                        # if True, continue to use OCR_list to match
-                        all_box_points_in_cell = []
-                        for item in cell["ocr"]:
-                            all_box_points_in_cell.extend(item["location"])
-                        union_box = union_points(all_box_points_in_cell)
-                        cell_okay = (
-                            box_h(union_box) <= box_h(cell["bbox"]) * PADDING_THRES
-                            and box_w(union_box) <= box_w(cell["bbox"]) * PADDING_THRES
-                        )
-                    else:
-                        cell_okay = False
-
-                    if cell_okay:
-                        if item_type == "pdf":
-                            color = [255, 0, 255]
-                        break
-
-                if debug_info is not None:
-                    cv2.rectangle(
-                        debug_im,
-                        cell["location"][0],
-                        cell["location"][2],
-                        color=color,
-                        thickness=3,
+        if len(cell_list) == 0:
+            all_tables.append(cur_table_cells)
+            continue
+
+        table_box = locations_to_array([table["location"]])
+        table_cell_ious = get_rect_iou_matrix(table_box, cell_boxes, iou_type=1)[0]
+        table_cell_ids = np.flatnonzero(
+            ~matched_cell
+            & (table_cell_ious > IOU_THRES)
+            & (box_area(table["bbox"]) > cell_areas)
+        )
+
+        for cell_id in table_cell_ids:
+            cell = cell_list[cell_id]
+            color = [128, 0, 128]
+            # cell matched to table
+            for item_list, item_type in [(pdf_list, "pdf"), (ocr_list, "ocr")]:
+                item_ids = item_indices[item_type].match(
+                    cell_boxes[cell_id], IOU_THRES, iou_type=1
+                )
+                if item_type == "pdf":
+                    item_ids = item_ids[~matched_pdf[item_ids]]
+                    matched_pdf[item_ids] = True
+                cell["ocr"] = [item_list[item_id] for item_id in item_ids]
+
+                if len(cell["ocr"]) > 0:
+                    # check if union of matched ocr does
+                    # not extend over cell boundary,
+                    # if True, continue to use OCR_list to match
+                    all_box_points_in_cell = []
+                    for item in cell["ocr"]:
+                        all_box_points_in_cell.extend(item["location"])
+                    union_box = union_points(all_box_points_in_cell)
+                    cell_okay = (
+                        box_h(union_box) <= box_h(cell["bbox"]) * PADDING_THRES
+                        and box_w(union_box) <= box_w(cell["bbox"]) * PADDING_THRES
                     )
+                else:
+                    cell_okay = False
+
+                if cell_okay:
+                    if item_type == "pdf":
+                        color = [255, 0, 255]
+                    break
+
+            if debug_info is not None:
+                cv2.rectangle(
+                    debug_im,
+                    cell["location"][0],
+                    cell["location"][2],
+                    color=color,
+                    thickness=3,
+                )
 
-                matched_cell_ids.append(cell_id)
-                cur_table_cells.append(cell)
+            matched_cell[cell_id] = True
+            cur_table_cells.append(cell)
 
         all_tables.append(cur_table_cells)
 
     not_matched_items = [
-        item for _id, item in enumerate(pdf_list) if _id not in matched_pdf_ids
+        item for _id, item in enumerate(pdf_list) if not matched_pdf[_id]
     ]
     if debug_info is not None:
         for item in not_matched_items:
@@ -8,6 +8,8 @@ from .docstores import (
 from .vectorstores import (
     BaseVectorStore,
     ChromaVectorStore,
+    FlatFileVectorStore,
+    HNSWVectorStore,
     InMemoryVectorStore,
     LanceDBVectorStore,
     MilvusVectorStore,
@@ -27,6 +29,8 @@ __all__ = [
     "ChromaVectorStore",
     "InMemoryVectorStore",
     "SimpleFileVectorStore",
+    "FlatFileVectorStore",
+    "HNSWVectorStore",
     "LanceDBVectorStore",
     "MilvusVectorStore",
     "QdrantVectorStore",
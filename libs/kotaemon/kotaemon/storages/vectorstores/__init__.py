@@ -1,5 +1,7 @@
 from .base import BaseVectorStore
 from .chroma import ChromaVectorStore
+from .flat_file import FlatFileVectorStore
+from .hnsw import HNSWVectorStore
 from .in_memory import InMemoryVectorStore
 from .lancedb import LanceDBVectorStore
 from .milvus import MilvusVectorStore
@@ -11,6 +13,8 @@ __all__ = [
     "ChromaVectorStore",
     "InMemoryVectorStore",
     "SimpleFileVectorStore",
+    "FlatFileVectorStore",
+    "HNSWVectorStore",
     "LanceDBVectorStore",
     "MilvusVectorStore",
     "QdrantVectorStore",
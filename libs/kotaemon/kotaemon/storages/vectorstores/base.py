@@ -40,6 +40,10 @@ class BaseVectorStore(ABC):
     def delete(self, ids: list[str], **kwargs):
         """Delete vector embeddings from vector stores
 
+        The ids are deleted in bulk, with as few operations on the backend as it
+        allows, so callers should pass all the ids to delete at once, e.g. all the
+        chunks of a file.
+
         Args:
             ids: List of ids of the embeddings to be deleted
             kwargs: meant for vectorstore-specific parameters
@@ -135,8 +139,16 @@ class LlamaIndexVectorStore(BaseVectorStore):
         return self._client.add(nodes=nodes)
 
     def delete(self, ids: list[str], **kwargs):
-        for id_ in ids:
-            self._client.delete(ref_doc_id=id_, **kwargs)
+        if not ids:
+            return
+
+        # `add` sets the ref doc id of each node to its id, so deleting the nodes
+        # is the same as deleting the ref docs, in a single call
+        try:
+            self._client.delete_nodes(node_ids=ids, **kwargs)
+        except NotImplementedError:
+            for id_ in ids:
+                self._client.delete(ref_doc_id=id_, **kwargs)
 
     def query(
         self,
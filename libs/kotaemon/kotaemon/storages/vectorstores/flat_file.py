@@ -0,0 +1,652 @@
+"""Flat file vector store, backed by a memory-mapped float32 matrix."""
+import json
+import shutil
+import threading
+import uuid
+from functools import reduce
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+)
+
+from kotaemon.base import DocumentWithEmbedding
+
+from .base import BaseVectorStore
+
+VECTORS_FNAME = "vectors.f32"
+NORMS_FNAME = "norms.f32"
+LOG_FNAME = "log.jsonl"
+META_FNAME = "meta.json"
+QUANTIZATIONS = ("int8", "binary")
+
+# number of set bits of each byte value
+_POPCOUNT = (
+    np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)
+    .sum(axis=1)
+    .astype(np.int32)
+)
+
+
+def int8_scales(vectors: np.ndarray) -> np.ndarray:
+    """Scale of each vector for the int8 quantization, its max absolute value"""
+    return np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+
+
+def int8_codes(vectors: np.ndarray) -> np.ndarray:
+    """Quantize each vector to int8, relatively to its own scale"""
+    return np.round(vectors / int8_scales(vectors)[:, None]).astype(np.int8)
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    """Quantize each vector to the packed bits of the signs of its components"""
+    return np.packbits(vectors > 0, axis=1)
+
+
+def _posting_key(value: Any) -> Any:
+    """Key of a metadata value in the posting lists"""
+    try:
+        hash(value)
+    except TypeError:
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def _append_rows(array: Optional[np.ndarray], rows: np.ndarray) -> np.ndarray:
+    return rows if array is None else np.concatenate([array, rows])
+
+
+class _Snapshot(NamedTuple):
+    """The arrays of the store at a point in time, searched without the lock"""
+
+    vectors: np.ndarray
+    norms: np.ndarray
+    deleted: np.ndarray
+    ids: list[str]
+    codes: Optional[np.ndarray]
+    scales: Optional[np.ndarray]
+
+
+class FlatFileVectorStore(BaseVectorStore):
+    """Exact vector store keeping the embeddings in a memory-mapped file
+
+    The embeddings are stored as a contiguous float32 matrix in `vectors.f32`,
+    which is memory-mapped instead of being loaded in RAM. The id of each row and
+    the deletions are recorded in the append-only `log.jsonl`: adding and deleting
+    only append to the files, they never rewrite the store. Deleted rows are kept
+    as tombstones until `compact` is called (automatically when more than
+    `compact_ratio` of the rows are deleted).
+
+    The similarity is the cosine similarity, a query is scored with a single
+    matrix-vector product and the top k is selected with `np.argpartition`.
+
+    With `quantization`, compact codes of the vectors are kept in RAM: "int8"
+    (4x smaller than float32) or "binary" (the signs, 32x smaller). A query is
+    first scored against the codes, then the `top_k * rescore_multiplier` best
+    candidates are re-scored against the full-precision vectors on disk.
+
+    Args:
+        path: the directory containing the collections
+        collection_name: the name of the collection
+        metadata_keys: the metadata keys kept for filtering with `filters`. The
+            other metadata are not stored.
+        compact_ratio: compact the files when the ratio of deleted rows is higher
+        quantization: None for exact search, or "int8" or "binary"
+        rescore_multiplier: number of candidates re-scored in full precision per
+            requested result, when using quantization
+    """
+
+    def __init__(
+        self,
+        path: str | Path = "./flat_vectorstore",
+        collection_name: str = "default",
+        metadata_keys: Optional[list[str]] = None,
+        compact_ratio: float = 0.5,
+        quantization: Optional[str] = None,
+        rescore_multiplier: int = 4,
+        **kwargs: Any,
+    ):
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown quantization {quantization}, expected one of "
+                f"{QUANTIZATIONS}"
+            )
+
+        self._path = path
+        self._collection_name = collection_name
+        self._metadata_keys = (
+            ["file_id"] if metadata_keys is None else list(metadata_keys)
+        )
+        self._compact_ratio = compact_ratio
+        self._quantization = quantization
+        self._rescore_multiplier = max(1, rescore_multiplier)
+        self._kwargs = kwargs
+
+        self._dir = Path(path) / collection_name
+        self._lock = threading.RLock()
+        self._load()
+
+    # ------------------------------------------------------------------ storage
+    def _load(self):
+        """Load the id table and memory-map the vectors from the files"""
+        self._dim: Optional[int] = None
+        self._ids: list[str] = []
+        self._metadatas: list[dict] = []
+        # metadata key -> metadata value -> rows having this value, in order
+        self._postings: dict[str, dict[Any, list[int]]] = {
+            key: {} for key in self._metadata_keys
+        }
+        self._id_to_row: dict[str, int] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+
+        meta_path = self._dir / META_FNAME
+        if not meta_path.is_file():
+            return
+
+        with meta_path.open() as fi:
+            self._dim = json.load(fi)["dim"]
+
+        deleted_rows: list[int] = []
+        log_path = self._dir / LOG_FNAME
+        if log_path.is_file():
+            with log_path.open(encoding="utf-8") as fi:
+                for line in fi:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # partially written last line
+                        break
+                    if record["op"] == "add":
+                        for id_, metadata in zip(record["ids"], record["metadatas"]):
+                            if id_ in self._id_to_row:
+                                deleted_rows.append(self._id_to_row[id_])
+                            self._index_metadata(len(self._ids), metadata)
+                            self._id_to_row[id_] = len(self._ids)
+                            self._ids.append(id_)
+                            self._metadatas.append(metadata)
+                    elif record["op"] == "delete":
+                        for id_ in record["ids"]:
+                            row = self._id_to_row.pop(id_, None)
+                            if row is not None:
+                                deleted_rows.append(row)
+
+        n_rows = len(self._ids)
+        vectors_path = self._dir / VECTORS_FNAME
+        row_bytes = self._dim * np.dtype(np.float32).itemsize
+        if vectors_path.is_file() and vectors_path.stat().st_size > n_rows * row_bytes:
+            # vectors written without their log record, e.g. after a crash
+            with vectors_path.open("r+b") as fo:
+                fo.truncate(n_rows * row_bytes)
+
+        self._deleted = np.zeros(n_rows, dtype=bool)
+        self._deleted[deleted_rows] = True
+        self._remap()
+
+        derived = {
+            name: self._load_derived(name, dtype, width, compute)
+            for name, (dtype, width, compute) in self._derived_arrays().items()
+        }
+        self._norms = derived[NORMS_FNAME][:, 0]
+        if self._quantization == "int8":
+            self._codes = derived["codes.i8"]
+            self._scales = derived["scales.f32"][:, 0]
+        elif self._quantization == "binary":
+            self._codes = derived["codes.bin"]
+
+    def _derived_arrays(self) -> dict[str, tuple[type, int, Callable]]:
+        """The arrays computed from the vectors and kept in RAM, by file name
+
+        Each value is (dtype, number of columns, function computing the rows from
+        the vectors).
+        """
+        assert self._dim is not None
+        arrays: dict[str, tuple[type, int, Callable]] = {
+            NORMS_FNAME: (np.float32, 1, lambda v: np.linalg.norm(v, axis=1)),
+        }
+        if self._quantization == "int8":
+            arrays["codes.i8"] = (np.int8, self._dim, int8_codes)
+            arrays["scales.f32"] = (np.float32, 1, int8_scales)
+        elif self._quantization == "binary":
+            arrays["codes.bin"] = (np.uint8, (self._dim + 7) // 8, binary_codes)
+        return arrays
+
+    def _load_derived(
+        self, fname: str, dtype: type, width: int, compute: Callable
+    ) -> np.ndarray:
+        """Load a derived array, computing and saving the rows missing from its
+        file, e.g. when the option was just turned on"""
+        n_rows = len(self._ids)
+        path = self._dir / fname
+        row_bytes = width * np.dtype(dtype).itemsize
+        if path.is_file() and path.stat().st_size > n_rows * row_bytes:
+            with path.open("r+b") as fo:
+                fo.truncate(n_rows * row_bytes)
+
+        array = (
+            np.fromfile(path, dtype=dtype).reshape(-1, width)
+            if path.is_file()
+            else np.zeros((0, width), dtype=dtype)
+        )
+        if len(array) < n_rows:
+            missing = [array]
+            with path.open("ab") as fo:
+                for start in range(len(array), n_rows, 65536):
+                    rows = compute(np.asarray(self._vectors[start : start + 65536]))
+                    rows = np.asarray(rows, dtype=dtype).reshape(-1, width)
+                    fo.write(rows.tobytes())
+                    missing.append(rows)
+            array = np.concatenate(missing)
+        return array
+
+    def _remap(self):
+        """Memory-map the vectors file with its current number of rows"""
+        n_rows = len(self._ids)
+        if n_rows == 0 or self._dim is None:
+            self._vectors = np.zeros((0, self._dim or 0), dtype=np.float32)
+            return
+        self._vectors = np.memmap(
+            self._dir / VECTORS_FNAME,
+            dtype=np.float32,
+            mode="r",
+            shape=(n_rows, self._dim),
+        )
+
+    def _on_rows_added(self, start_row: int, vectors: np.ndarray):
+        """Called with the lock held after rows are appended, for subclasses"""
+
+    def _on_rows_deleted(self, rows: list[int]):
+        """Called with the lock held after rows are deleted, for subclasses"""
+
+    def _append_log(self, record: dict):
+        with (self._dir / LOG_FNAME).open("a", encoding="utf-8") as fo:
+            fo.write(json.dumps(record) + "\n")
+
+    def compact(self):
+        """Rewrite the files without the deleted rows"""
+        with self._lock:
+            if self._dim is None or not self._deleted.any():
+                return
+
+            alive_rows = np.flatnonzero(~self._deleted)
+            tmp_vectors = self._dir / f"{VECTORS_FNAME}.tmp"
+            tmp_log = self._dir / f"{LOG_FNAME}.tmp"
+
+            with tmp_vectors.open("wb") as fo:
+                for start in range(0, len(alive_rows), 65536):
+                    rows = alive_rows[start : start + 65536]
+                    fo.write(np.ascontiguousarray(self._vectors[rows]).tobytes())
+            with tmp_log.open("w", encoding="utf-8") as fo:
+                record = {
+                    "op": "add",
+                    "ids": [self._ids[row] for row in alive_rows],
+                    "metadatas": [self._metadatas[row] for row in alive_rows],
+                }
+                fo.write(json.dumps(record) + "\n")
+
+            # release the memory map before replacing the file
+            self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+            tmp_vectors.replace(self._dir / VECTORS_FNAME)
+            tmp_log.replace(self._dir / LOG_FNAME)
+            # the derived arrays are recomputed by `_load`
+            for fname in self._derived_arrays():
+                (self._dir / fname).unlink(missing_ok=True)
+            self._load()
+
+    # ------------------------------------------------------------------ filters
+    def _index_metadata(self, row: int, metadata: dict):
+        """Add the row to the posting lists of its metadata values"""
+        for key in self._metadata_keys:
+            self._postings[key].setdefault(_posting_key(metadata.get(key)), []).append(
+                row
+            )
+
+    def _filter_rows(self, filters: MetadataFilters) -> np.ndarray:
+        """Return the sorted rows matching the metadata filters
+
+        The rows are read from the posting lists, so the cost depends on the number
+        of matching rows rather than the size of the collection.
+        """
+        matches = []
+        for filter_ in filters.filters:
+            if isinstance(filter_, MetadataFilters):
+                matches.append(self._filter_rows(filter_))
+                continue
+            if filter_.key not in self._metadata_keys:
+                raise ValueError(
+                    f"Cannot filter on {filter_.key}, only {self._metadata_keys} "
+                    "metadata keys are stored"
+                )
+
+            if filter_.operator in (FilterOperator.EQ, FilterOperator.NE):
+                values = [filter_.value]
+            elif filter_.operator in (FilterOperator.IN, FilterOperator.NIN):
+                values = filter_.value
+            else:
+                raise NotImplementedError(
+                    f"Unsupported filter operator {filter_.operator}"
+                )
+
+            postings = self._postings[filter_.key]
+            rows = [
+                np.asarray(postings[key], dtype=np.int64)
+                for key in {_posting_key(value) for value in values}
+                if key in postings
+            ]
+            if not rows:
+                matched = np.zeros(0, dtype=np.int64)
+            elif len(rows) == 1:
+                matched = rows[0]
+            else:
+                matched = np.sort(np.concatenate(rows))
+
+            if filter_.operator in (FilterOperator.NE, FilterOperator.NIN):
+                matched = np.setdiff1d(
+                    np.arange(len(self._ids)), matched, assume_unique=True
+                )
+            matches.append(matched)
+
+        if not matches:
+            return np.arange(len(self._ids))
+        if filters.condition == FilterCondition.OR:
+            return reduce(np.union1d, matches)
+        return reduce(
+            lambda left, right: np.intersect1d(left, right, assume_unique=True),
+            matches,
+        )
+
+    def _candidate_rows(
+        self, ids: Optional[list[str]], filters: Optional[MetadataFilters]
+    ) -> Optional[np.ndarray]:
+        """Return the rows to score, or None to score all the rows"""
+        rows = None
+        if ids is not None:
+            rows = np.array(
+                sorted({self._id_to_row[id_] for id_ in ids if id_ in self._id_to_row}),
+                dtype=np.int64,
+            )
+        if filters is not None and filters.filters:
+            filter_rows = self._filter_rows(filters)
+            rows = (
+                filter_rows
+                if rows is None
+                else np.intersect1d(rows, filter_rows, assume_unique=True)
+            )
+        return rows
+
+    # ------------------------------------------------------------------ interface
+    def add(
+        self,
+        embeddings: list[list[float]] | list[DocumentWithEmbedding],
+        metadatas: Optional[list[dict]] = None,
+        ids: Optional[list[str]] = None,
+    ) -> list[str]:
+        if not embeddings:
+            return []
+
+        if isinstance(embeddings[0], list):
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            doc_metadatas: list[dict] = [{} for _ in embeddings]
+            # same id generation as the documents created by LlamaIndexVectorStore
+            doc_ids = [str(uuid.uuid4()) for _ in embeddings]
+        else:
+            docs: list[DocumentWithEmbedding] = embeddings  # type: ignore
+            vectors = np.asarray([doc.embedding for doc in docs], dtype=np.float32)
+            doc_metadatas = [doc.metadata for doc in docs]
+            doc_ids = [doc.doc_id for doc in docs]
+
+        if metadatas is None:
+            metadatas = doc_metadatas
+        if ids is None:
+            ids = doc_ids
+
+        if len(vectors) != len(ids):
+            raise ValueError("The number of embeddings and ids must be the same")
+
+        metadatas = [
+            {key: metadata[key] for key in self._metadata_keys if key in metadata}
+            for metadata in metadatas
+        ]
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._dir.mkdir(parents=True, exist_ok=True)
+                with (self._dir / META_FNAME).open("w") as fo:
+                    json.dump({"dim": self._dim}, fo)
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(
+                    f"Expected embeddings of dimension {self._dim}, "
+                    f"got {vectors.shape[1]}"
+                )
+
+            # the vectors are written before the log, so that a record in the log
+            # always has its vectors
+            with (self._dir / VECTORS_FNAME).open("ab") as fo:
+                fo.write(vectors.tobytes())
+            derived = {}
+            for fname, (dtype, width, compute) in self._derived_arrays().items():
+                derived[fname] = np.asarray(compute(vectors), dtype=dtype).reshape(
+                    -1, width
+                )
+                with (self._dir / fname).open("ab") as fo:
+                    fo.write(derived[fname].tobytes())
+            self._append_log({"op": "add", "ids": ids, "metadatas": metadatas})
+
+            start_row = len(self._ids)
+            deleted = np.zeros(len(ids), dtype=bool)
+            replaced_rows = []
+            for idx, id_ in enumerate(ids):
+                if id_ in self._id_to_row:
+                    replaced_rows.append(self._id_to_row[id_])
+                self._id_to_row[id_] = start_row + idx
+            for idx, metadata in enumerate(metadatas):
+                self._index_metadata(start_row + idx, metadata)
+            self._ids.extend(ids)
+            self._metadatas.extend(metadatas)
+
+            self._deleted = np.concatenate([self._deleted, deleted])
+            self._deleted[replaced_rows] = True
+            self._norms = np.concatenate([self._norms, derived[NORMS_FNAME][:, 0]])
+            if self._quantization == "int8":
+                self._codes = _append_rows(self._codes, derived["codes.i8"])
+                self._scales = _append_rows(self._scales, derived["scales.f32"][:, 0])
+            elif self._quantization == "binary":
+                self._codes = _append_rows(self._codes, derived["codes.bin"])
+            self._remap()
+
+            self._on_rows_added(start_row, vectors)
+            if replaced_rows:
+                self._on_rows_deleted(replaced_rows)
+
+        return ids
+
+    def delete(self, ids: list[str], **kwargs):
+        """Delete vector embeddings from vector stores
+
+        The rows are marked as deleted and only removed from the files by
+        `compact`.
+
+        Args:
+            ids: List of ids of the embeddings to be deleted
+            kwargs: meant for vectorstore-specific parameters
+        """
+        with self._lock:
+            rows = [self._id_to_row.pop(id_) for id_ in ids if id_ in self._id_to_row]
+            if not rows:
+                return
+
+            self._append_log({"op": "delete", "ids": [self._ids[r] for r in rows]})
+            self._deleted[rows] = True
+            self._on_rows_deleted(rows)
+
+            if self._deleted.mean() > self._compact_ratio:
+                self.compact()
+
+    def query(
+        self,
+        embedding: list[float],
+        top_k: int = 1,
+        ids: Optional[list[str]] = None,
+        **kwargs,
+    ) -> tuple[list[list[float]], list[float], list[str]]:
+        """Return the top k most similar vector embeddings
+
+        Args:
+            embedding: List of embeddings
+            top_k: Number of most similar embeddings to return
+            ids: List of ids of the embeddings to be queried
+            kwargs: `filters` (llama-index MetadataFilters) restrict the search to
+                the embeddings whose metadata match. The other kwargs are ignored.
+
+        Returns:
+            the matched embeddings, the similarity scores, and the ids
+        """
+        with self._lock:
+            # the files are only replaced by `compact`, which creates new arrays, so
+            # the snapshot stays consistent without holding the lock
+            snapshot = _Snapshot(
+                self._vectors,
+                self._norms,
+                self._deleted,
+                self._ids,
+                self._codes,
+                self._scales,
+            )
+            rows = self._candidate_rows(ids, kwargs.get("filters"))
+
+        vectors, row_ids = snapshot.vectors, snapshot.ids
+        if len(row_ids) == 0 or top_k <= 0:
+            return [], [], []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        top_rows, scores = self._search(query, top_k, rows, snapshot)
+        return (
+            vectors[top_rows].tolist(),
+            scores.tolist(),
+            [row_ids[row] for row in top_rows],
+        )
+
+    def _search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        rows: Optional[np.ndarray],
+        snapshot: _Snapshot,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the top k rows and their scores, searching `rows` or all rows"""
+        if snapshot.codes is None:
+            return self._exact_search(query, top_k, rows, snapshot)
+
+        n_candidates = top_k * self._rescore_multiplier
+        if rows is not None:
+            rows = rows[~snapshot.deleted[rows]]
+            if len(rows) > n_candidates:
+                scores = self._approximate_scores(query, rows, snapshot)
+                rows = rows[np.argpartition(-scores, n_candidates - 1)[:n_candidates]]
+        elif len(snapshot.vectors) > n_candidates:
+            scores = self._approximate_scores(query, None, snapshot)
+            scores[snapshot.deleted] = -np.inf
+            rows = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+
+        return self._exact_search(query, top_k, rows, snapshot)
+
+    def _approximate_scores(
+        self, query: np.ndarray, rows: Optional[np.ndarray], snapshot: _Snapshot
+    ) -> np.ndarray:
+        """Score the rows against the query with the quantized codes
+
+        The scores are only comparable between rows, to select the candidates.
+        """
+        assert snapshot.codes is not None
+        n_rows = len(snapshot.vectors) if rows is None else len(rows)
+        scores = np.empty(n_rows, dtype=np.float32)
+        if self._quantization == "int8":
+            query_codes = int8_codes(query[None, :])[0].astype(np.float32)
+        else:
+            query_codes = binary_codes(query[None, :])[0]
+
+        # small batches, so that the decoded codes stay in the CPU cache
+        batch_size = 4096
+        for start in range(0, n_rows, batch_size):
+            end = start + batch_size
+            batch = slice(start, end) if rows is None else rows[start:end]
+            codes = snapshot.codes[batch]
+            if self._quantization == "int8":
+                assert snapshot.scales is not None
+                scores[start:end] = (
+                    (codes.astype(np.float32) @ query_codes)
+                    * snapshot.scales[batch]
+                    / np.maximum(snapshot.norms[batch], 1e-12)
+                )
+            else:
+                # negated Hamming distance between the signs
+                scores[start:end] = -_POPCOUNT[np.bitwise_xor(codes, query_codes)].sum(
+                    axis=1
+                )
+        return scores
+
+    def _exact_search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        rows: Optional[np.ndarray],
+        snapshot: _Snapshot,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Score every candidate row against the query in full precision"""
+        vectors, norms, deleted = snapshot.vectors, snapshot.norms, snapshot.deleted
+
+        query_norm = max(float(np.linalg.norm(query)), 1e-12)
+        if rows is None:
+            scores = vectors @ query
+            scores /= np.maximum(norms, 1e-12) * query_norm
+            scores[deleted] = -np.inf
+            rows = np.arange(len(vectors))
+        else:
+            rows = rows[~deleted[rows]]
+            if len(rows) == 0:
+                return rows, np.zeros(0, dtype=np.float32)
+            scores = vectors[rows] @ query
+            scores /= np.maximum(norms[rows], 1e-12) * query_norm
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+        return rows[top], scores[top]
+
+    def get(self, ids: list[str]) -> list[list[float]]:
+        """Get the embeddings of the ids"""
+        with self._lock:
+            rows = [self._id_to_row[id_] for id_ in ids]
+            return self._vectors[rows].tolist()
+
+    def count(self) -> int:
+        return len(self._id_to_row)
+
+    def drop(self):
+        """Delete entire collection from vector stores"""
+        with self._lock:
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._load()
+
+    def __persist_flow__(self):
+        return {
+            "path": str(self._path),
+            "collection_name": self._collection_name,
+            "metadata_keys": self._metadata_keys,
+            "compact_ratio": self._compact_ratio,
+            "quantization": self._quantization,
+            "rescore_multiplier": self._rescore_multiplier,
+            **self._kwargs,
+        }
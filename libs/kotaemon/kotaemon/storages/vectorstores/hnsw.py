@@ -0,0 +1,230 @@
+"""Approximate nearest-neighbour vector store, using a HNSW graph."""
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from .flat_file import FlatFileVectorStore
+
+INDEX_FNAME = "hnsw.bin"
+INDEX_META_FNAME = "hnsw.json"
+
+
+class HNSWVectorStore(FlatFileVectorStore):
+    """Vector store searching a HNSW graph (hnswlib) instead of every vector
+
+    The embeddings, ids and metadata are stored as in `FlatFileVectorStore`, the
+    HNSW graph is an index on top of them, persisted in `hnsw.bin`. It is updated
+    incrementally on add and delete, and saved every `save_every` changes: the
+    rows added after the last save are re-inserted when the store is loaded.
+
+    Small scopes (when the `ids` or `filters` select at most
+    `exact_search_threshold` vectors, or when the collection is that small) are
+    searched exactly.
+
+    Args:
+        path: the directory containing the collections
+        collection_name: the name of the collection
+        metadata_keys: the metadata keys kept for filtering with `filters`
+        M: number of neighbours of each node in the graph. Higher is more accurate
+            and uses more memory.
+        ef_construction: size of the candidate list when building the graph.
+            Higher is more accurate and slower to insert.
+        ef_search: size of the candidate list when searching (at least top_k).
+            Higher is more accurate and slower to query.
+        exact_search_threshold: search exactly when the scope has at most this
+            number of vectors
+        save_every: save the graph after this number of added or deleted vectors
+    """
+
+    def __init__(
+        self,
+        path: str | Path = "./hnsw_vectorstore",
+        collection_name: str = "default",
+        metadata_keys: Optional[list[str]] = None,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        exact_search_threshold: int = 10000,
+        save_every: int = 10000,
+        **kwargs: Any,
+    ):
+        try:
+            # provided by chroma-hnswlib, installed with chromadb
+            import hnswlib  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Please install chroma-hnswlib: 'pip install chroma-hnswlib'"
+            )
+
+        self._M = M
+        self._ef_construction = ef_construction
+        self._ef_search = ef_search
+        self._exact_search_threshold = exact_search_threshold
+        self._save_every = save_every
+        super().__init__(
+            path=path,
+            collection_name=collection_name,
+            metadata_keys=metadata_keys,
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------ storage
+    def _load(self):
+        super()._load()
+        self._index = None
+        self._n_unsaved = 0
+        if self._dim is None:
+            return
+
+        import hnswlib
+
+        self._index = hnswlib.Index(space="cosine", dim=self._dim)
+        index_path = self._dir / INDEX_FNAME
+        meta_path = self._dir / INDEX_META_FNAME
+
+        n_indexed = 0
+        if index_path.is_file() and meta_path.is_file():
+            with meta_path.open() as fi:
+                n_indexed = json.load(fi)["n_rows"]
+            if n_indexed <= len(self._ids):
+                self._index.load_index(
+                    str(index_path), max_elements=max(len(self._ids), 1)
+                )
+            else:
+                # the graph is newer than the log, rebuild it
+                n_indexed = 0
+
+        if n_indexed == 0:
+            self._init_index(max(len(self._ids), 1024))
+
+        # catch up with the rows added since the graph was saved
+        for start in range(n_indexed, len(self._ids), 65536):
+            end = min(start + 65536, len(self._ids))
+            self._add_to_index(start, np.asarray(self._vectors[start:end]))
+        self._n_unsaved = len(self._ids) - n_indexed
+
+        for row in np.flatnonzero(self._deleted):
+            self._mark_deleted(int(row))
+
+        if self._n_unsaved >= self._save_every:
+            self.save_index()
+
+    def _init_index(self, max_elements: int):
+        self._index.init_index(
+            max_elements=max_elements,
+            M=self._M,
+            ef_construction=self._ef_construction,
+        )
+
+    def _add_to_index(self, start_row: int, vectors: np.ndarray):
+        n_rows = start_row + len(vectors)
+        capacity = self._index.get_max_elements()
+        if n_rows > capacity:
+            self._index.resize_index(max(n_rows, capacity * 2))
+        self._index.add_items(vectors, np.arange(start_row, n_rows))
+
+    def _mark_deleted(self, row: int):
+        try:
+            self._index.mark_deleted(row)
+        except RuntimeError:
+            # already deleted, or deleted before being indexed
+            pass
+
+    def _on_rows_added(self, start_row: int, vectors: np.ndarray):
+        if self._index is None:
+            # first vectors of the collection, the dimension is now known
+            import hnswlib
+
+            self._index = hnswlib.Index(space="cosine", dim=self._dim)
+            self._init_index(max(len(vectors), 1024))
+        self._add_to_index(start_row, vectors)
+        self._n_unsaved += len(vectors)
+        if self._n_unsaved >= self._save_every:
+            self.save_index()
+
+    def _on_rows_deleted(self, rows: list[int]):
+        if self._index is None:
+            return
+        for row in rows:
+            self._mark_deleted(row)
+        self._n_unsaved += len(rows)
+        if self._n_unsaved >= self._save_every:
+            self.save_index()
+
+    def save_index(self):
+        """Save the HNSW graph, so that it is not rebuilt when loading the store"""
+        with self._lock:
+            if self._index is None:
+                return
+            self._index.save_index(str(self._dir / INDEX_FNAME))
+            with (self._dir / INDEX_META_FNAME).open("w") as fo:
+                json.dump({"n_rows": len(self._ids)}, fo)
+            self._n_unsaved = 0
+
+    def compact(self):
+        """Rewrite the files without the deleted rows, and rebuild the graph"""
+        with self._lock:
+            if self._dim is None or not self._deleted.any():
+                return
+            (self._dir / INDEX_META_FNAME).unlink(missing_ok=True)
+            super().compact()
+            self.save_index()
+
+    # ------------------------------------------------------------------ search
+    def _search(
+        self, query: np.ndarray, top_k: int, rows: Optional[np.ndarray], snapshot
+    ) -> tuple[np.ndarray, np.ndarray]:
+        vectors, deleted = snapshot.vectors, snapshot.deleted
+        n_scope = len(vectors) - int(deleted.sum()) if rows is None else len(rows)
+        index = self._index
+        if (
+            index is None
+            or n_scope <= self._exact_search_threshold
+            or index.get_current_count() < len(vectors)
+        ):
+            return super()._search(query, top_k, rows, snapshot)
+
+        k = min(top_k, n_scope)
+        if rows is not None:
+            allowed = np.zeros(len(vectors), dtype=bool)
+            allowed[rows] = True
+        try:
+            # hnswlib cannot query while the graph is resized by `add`, and `ef`
+            # is shared by the queries
+            with self._lock:
+                index.set_ef(max(self._ef_search, k))
+                if rows is None:
+                    labels, distances = index.knn_query(query, k=k)
+                else:
+                    labels, distances = index.knn_query(
+                        query,
+                        k=k,
+                        num_threads=1,
+                        filter=lambda label: allowed[label],
+                    )
+        except RuntimeError:
+            # the graph search did not reach k vectors of the scope
+            return super()._search(query, top_k, rows, snapshot)
+
+        top_rows, scores = labels[0].astype(np.int64), 1 - distances[0]
+        # ignore the rows added after the snapshot
+        keep = top_rows < len(vectors)
+        return top_rows[keep], scores[keep]
+
+    def drop(self):
+        """Delete entire collection from vector stores"""
+        with self._lock:
+            self._index = None
+            super().drop()
+
+    def __persist_flow__(self):
+        return {
+            **super().__persist_flow__(),
+            "M": self._M,
+            "ef_construction": self._ef_construction,
+            "ef_search": self._ef_search,
+            "exact_search_threshold": self._exact_search_threshold,
+            "save_every": self._save_every,
+        }
@@ -1,25 +1,74 @@
 from typing import Any, List, Type, cast
 
-from llama_index.core.vector_stores.types import MetadataFilters
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+)
 from llama_index.vector_stores.lancedb import LanceDBVectorStore as LILanceDBVectorStore
 from llama_index.vector_stores.lancedb import base as base_lancedb
 
 from .base import LlamaIndexVectorStore
 
-# custom monkey patch for LanceDB
-original_to_lance_filter = base_lancedb._to_lance_filter
+_SQL_OPERATORS = {
+    FilterOperator.EQ: "=",
+    FilterOperator.NE: "!=",
+    FilterOperator.GT: ">",
+    FilterOperator.GTE: ">=",
+    FilterOperator.LT: "<",
+    FilterOperator.LTE: "<=",
+}
+
 
+def _to_lance_literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    # single quotes are escaped by doubling them in SQL
+    return "'" + str(value).replace("'", "''") + "'"
 
+
+# custom monkey patch for LanceDB
 def custom_to_lance_filter(
     standard_filters: MetadataFilters, metadata_keys: list
-) -> Any:
-    for filter in standard_filters.filters:
-        if isinstance(filter.value, list):
-            # quote string values if filter are list of strings
-            if filter.value and isinstance(filter.value[0], str):
-                filter.value = [f"'{v}'" for v in filter.value]
+) -> str:
+    """Translate the metadata filters to a LanceDB SQL filter
+
+    Unlike the LlamaIndex translation, the string values are quoted and escaped
+    (without modifying the filters, which are reused between queries), NE is a
+    plain comparison, and nested filters are supported.
+    """
+    clauses = []
+    for filter_ in standard_filters.filters:
+        if isinstance(filter_, MetadataFilters):
+            clauses.append(f"({custom_to_lance_filter(filter_, metadata_keys)})")
+            continue
+
+        key = filter_.key
+        if key in metadata_keys:
+            key = f"metadata.{key}"
+
+        operator = filter_.operator
+        if operator in (FilterOperator.IN, FilterOperator.NIN):
+            if not filter_.value:
+                clauses.append("FALSE" if operator == FilterOperator.IN else "TRUE")
+                continue
+            values = ", ".join(_to_lance_literal(value) for value in filter_.value)
+            sql_operator = "IN" if operator == FilterOperator.IN else "NOT IN"
+            clauses.append(f"{key} {sql_operator} ({values})")
+        elif operator == FilterOperator.TEXT_MATCH:
+            clauses.append(f"{key} LIKE {_to_lance_literal(f'%{filter_.value}%')}")
+        elif operator in _SQL_OPERATORS:
+            clauses.append(
+                f"{key} {_SQL_OPERATORS[operator]} {_to_lance_literal(filter_.value)}"
+            )
+        else:
+            raise NotImplementedError(f"Unsupported filter operator {operator}")
 
-    return original_to_lance_filter(standard_filters, metadata_keys)
+    if standard_filters.condition == FilterCondition.OR:
+        return " OR ".join(clauses)
+    return " AND ".join(clauses)
 
 
 # skip table existence check
@@ -71,7 +120,15 @@ class LanceDBVectorStore(LlamaIndexVectorStore):
             ids: List of ids of the embeddings to be deleted
             kwargs: meant for vectorstore-specific parameters
         """
-        self._client.delete_nodes(ids)
+        if not ids or self._client._table is None:
+            return
+
+        # one predicate per batch, to keep the SQL filter of a reasonable size
+        for start in range(0, len(ids), 1000):
+            values = ", ".join(
+                _to_lance_literal(id_) for id_ in ids[start : start + 1000]
+            )
+            self._client._table.delete(f"id IN ({values})")
 
     def drop(self):
         """Delete entire collection from vector stores"""
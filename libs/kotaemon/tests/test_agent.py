@@ -1,3 +1,4 @@
+import time
 from unittest.mock import patch
 
 import pytest
@@ -240,3 +241,106 @@ def test_react_agent_with_langchain_tools(openai_completion, llm):
     response = agent("Tell me about Cinnamon AI company")
     openai_completion.assert_called()
     assert response.text == FINAL_RESPONSE_TEXT
+
+
+_tool_calls: list = []
+
+
+class SleepTool(BaseTool):
+    name: str = "sleep"
+    description: str = "Wait for a while, then echo the input."
+    delay: float = 0.0
+
+    def _run_tool(self, query: str) -> str:
+        _tool_calls.append(("start", query))
+        time.sleep(self.delay)
+        _tool_calls.append(("end", query))
+        return f"slept {query}"
+
+
+def _rewoo_worker_agent(llm, **kwargs):
+    plugins = [
+        SleepTool(name="slow", delay=0.5),
+        SleepTool(name="fast", delay=0.05),
+    ]
+    return RewooAgent(planner_llm=llm, solver_llm=llm, plugins=plugins, **kwargs)
+
+
+def test_rewoo_agent_eager_scheduling(llm):
+    _tool_calls.clear()
+    agent = _rewoo_worker_agent(llm)
+    evidences, levels = agent._parse_planner_evidences(
+        "#Plan1: Slow search\n"
+        "#E1: slow[a]\n"
+        "#Plan2: Fast search\n"
+        "#E2: fast[b]\n"
+        "#Plan3: Search on the result of the fast search\n"
+        "#E3: fast[#E2]\n"
+    )
+    assert levels == [["#E1", "#E2"], ["#E3"]]
+
+    results = list(agent._iter_worker_evidence(evidences, levels))
+
+    # the 2nd level task starts as soon as its dependency is done
+    assert [result["e"] for result in results] == ["#E2", "#E3", "#E1"]
+    assert _tool_calls.index(("start", "slept b")) < _tool_calls.index(("end", "a"))
+    assert {result["evidence"] for result in results} == {
+        "slept a",
+        "slept b",
+        "slept slept b",
+    }
+
+
+def test_rewoo_agent_tool_timeout(llm):
+    agent = _rewoo_worker_agent(llm, tool_timeout=0.2)
+    evidences, levels = agent._parse_planner_evidences(
+        "#Plan1: Slow search\n#E1: slow[a]\n#Plan2: Fast search\n#E2: fast[b]\n"
+    )
+
+    start = time.monotonic()
+    worker_evidences, _, _ = agent._get_worker_evidence(evidences, levels)
+    assert time.monotonic() - start < 0.45
+    assert sorted(worker_evidences.values()) == ["No evidence found.", "slept b"]
+
+
+def test_rewoo_agent_max_concurrency(llm):
+    _tool_calls.clear()
+    agent = _rewoo_worker_agent(llm, max_concurrency=1)
+    evidences, levels = agent._parse_planner_evidences(
+        "#Plan1: Search x\n#E1: fast[x]\n"
+        "#Plan2: Search y\n#E2: fast[y]\n"
+        "#Plan3: Search z\n#E3: fast[z]\n"
+    )
+
+    worker_evidences, _, _ = agent._get_worker_evidence(evidences, levels)
+    assert len(worker_evidences) == 3
+    # the tools never overlap, ignoring the tools abandoned by the other tests
+    events = [event for event, query in _tool_calls if query in ("x", "y", "z")]
+    assert events == ["start", "end"] * 3
+
+
+def test_rewoo_agent_tool_timeout_max_concurrency(llm):
+    plugins = [
+        SleepTool(name="hung", delay=3.0),
+        SleepTool(name="fast", delay=0.05),
+    ]
+    agent = RewooAgent(
+        planner_llm=llm,
+        solver_llm=llm,
+        plugins=plugins,
+        max_concurrency=1,
+        tool_timeout=0.2,
+    )
+    evidences, levels = agent._parse_planner_evidences(
+        "#Plan1: Hung search\n#E1: hung[a]\n"
+        "#Plan2: Fast search\n#E2: fast[b]\n"
+        "#Plan3: Search on the hung search\n#E3: fast[#E1]\n"
+    )
+
+    # the timed out tool does not hold the only slot
+    start = time.monotonic()
+    worker_evidences, _, _ = agent._get_worker_evidence(evidences, levels)
+    assert time.monotonic() - start < 1.0
+    assert worker_evidences["#E1"] == "No evidence found."
+    assert worker_evidences["#E2"] == "slept b"
+    assert worker_evidences["#E3"] == "slept No evidence found."
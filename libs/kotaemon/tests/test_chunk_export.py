@@ -0,0 +1,70 @@
+from kotaemon.base import Document
+from kotaemon.indices.chunk_export import (
+    ChunkExportSink,
+    count_chunks,
+    export_path,
+    index_path,
+    iter_exports,
+    read_chunks,
+)
+
+
+def make_docs(file_id, file_name, texts, start=0):
+    return [
+        Document(
+            text=text,
+            metadata={
+                "file_id": file_id,
+                "file_name": file_name,
+                "page_label": start + idx + 1,
+            },
+        )
+        for idx, text in enumerate(texts)
+    ]
+
+
+def test_chunk_export(tmp_path):
+    sink = ChunkExportSink()
+    sink.submit(tmp_path, make_docs("id-1", "report.pdf", ["first", "second"]))
+    sink.submit(tmp_path, make_docs("id-1", "report.pdf", ["third, été"], start=2))
+    # another source of the same name
+    sink.submit(tmp_path, make_docs("id-2", "report.pdf", ["other report"]))
+    # without id, the chunks are exported by file name
+    sink.submit(tmp_path, [Document(text="a note", metadata={"file_name": "a.txt"})])
+    # without id nor file name, the chunks are not exported
+    sink.submit(tmp_path, [Document(text="anonymous")])
+    sink.flush()
+
+    # the batches are appended to a single export per source
+    assert sorted(path.name for path in iter_exports(tmp_path)) == [
+        "a.txt.jsonl",
+        "id-1.jsonl",
+        "id-2.jsonl",
+    ]
+    assert count_chunks(tmp_path, "id-1") == 3
+    assert [record["text"] for record in read_chunks(tmp_path, "id-1")] == [
+        "first",
+        "second",
+        "third, été",
+    ]
+    records = read_chunks(tmp_path, "id-1", start=1, stop=2)
+    assert len(records) == 1
+    assert records[0]["text"] == "second"
+    assert records[0]["page_label"] == 2
+    assert records[0]["file_name"] == "report.pdf"
+    assert read_chunks(tmp_path, "id-1", start=3) == []
+
+    # the chunks of an interrupted write are not indexed, thus skipped
+    with open(export_path(tmp_path, "id-1"), "ab") as f:
+        f.write(b'{"text": "lost"}\n')
+    sink.submit(tmp_path, make_docs("id-1", "report.pdf", ["fourth"], start=3))
+    sink.remove(tmp_path, "id-2")
+    sink.flush()
+    assert [record["text"] for record in read_chunks(tmp_path, "id-1", 2)] == [
+        "third, été",
+        "fourth",
+    ]
+    # only the removed source is removed, not the other of the same name
+    assert not export_path(tmp_path, "id-2").exists()
+    assert not index_path(tmp_path, "id-2").exists()
+    assert count_chunks(tmp_path, "id-1") == 4
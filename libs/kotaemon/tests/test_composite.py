@@ -1,8 +1,10 @@
+import time
 from copy import deepcopy
 
 import pytest
 from openai.types.chat.chat_completion import ChatCompletion
 
+from kotaemon.base import BaseComponent, Document
 from kotaemon.llms import (
     AzureChatOpenAI,
     BasePromptComponent,
@@ -170,3 +172,41 @@ def test_simple_gated_branching_pipeline_run(
 
     assert result.text == ""
     assert openai_mocker.call_count == 2
+
+
+class SlowBranch(BaseComponent):
+    delay: float = 0.0
+    answer: str = ""
+
+    def run(self, **kwargs) -> Document:
+        time.sleep(self.delay)
+        return Document(self.answer)
+
+
+def test_simple_branching_pipeline_concurrent():
+    pipeline = SimpleBranchingPipeline(concurrent=True)
+    for delay, answer in [(0.3, "slow"), (0.1, "fast"), (0.2, "medium")]:
+        pipeline.add_branch(SlowBranch(delay=delay, answer=answer))
+
+    start = time.perf_counter()
+    result = pipeline.run(value="abc")
+    elapsed = time.perf_counter() - start
+
+    assert [each.text for each in result] == ["slow", "fast", "medium"]
+    assert elapsed < 0.5
+
+
+def test_gated_branching_pipeline_concurrent():
+    pipeline = GatedBranchingPipeline(concurrent=True)
+    pipeline.add_branch(SlowBranch(delay=0.1, answer=""))
+    pipeline.add_branch(SlowBranch(delay=0.2, answer="first passing"))
+    pipeline.add_branch(SlowBranch(delay=0.1, answer="second passing"))
+    pipeline.add_branch(SlowBranch(delay=2, answer="too slow"))
+
+    start = time.perf_counter()
+    result = pipeline.run(condition_text="abc")
+    elapsed = time.perf_counter() - start
+
+    # the first passing branch in order wins, the slow branch is not waited for
+    assert result.text == "first passing"
+    assert elapsed < 1
@@ -1,7 +1,9 @@
+import asyncio
 import json
 from pathlib import Path
 from unittest.mock import patch
 
+import numpy as np
 from openai.types.create_embedding_response import CreateEmbeddingResponse
 
 from kotaemon.base import Document
@@ -95,6 +97,37 @@ def test_openai_embeddings_raw(openai_embedding_call):
     openai_embedding_call.assert_called()
 
 
+async def _aopenai_embedding_batch(*args, **kwargs):
+    return openai_embedding_batch
+
+
+@patch(
+    "kotaemon.embeddings.openai.split_text_by_chunk_size",
+    side_effect=lambda text, chunk_size: [[1, 2, 3], [4]],
+)
+@patch(
+    "openai.resources.embeddings.AsyncEmbeddings.create",
+    side_effect=_aopenai_embedding_batch,
+)
+def test_openai_embeddings_async_split(openai_embedding_call, split_call):
+    model = OpenAIEmbeddings(
+        api_key="some-key",
+        model="text-embedding-ada-002",
+        context_length=3,
+    )
+    output = asyncio.run(model.ainvoke("A text longer than the context"))
+    # the parts of the text are embedded together, then averaged
+    assert len(output) == 1
+    assert_embedding_result(output)
+    assert openai_embedding_call.call_args.kwargs["input"] == [[1, 2, 3], [4]]
+    expected = np.average(
+        [item.embedding for item in openai_embedding_batch.data],
+        axis=0,
+        weights=[3, 1],
+    )
+    assert np.allclose(output[0].embedding, expected / np.linalg.norm(expected))
+
+
 @patch(
     "openai.resources.embeddings.Embeddings.create",
     side_effect=lambda *args, **kwargs: openai_embedding_batch,
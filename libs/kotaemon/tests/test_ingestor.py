@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from pathlib import Path
 
 from kotaemon.indices.ingests import DocumentIngestor
@@ -13,3 +15,37 @@ def test_ingestor_include_src():
     nodes = ingestor(dirpath / "resources" / "table.pdf")
     assert type(nodes) is list
     assert nodes[0].relationships
+
+
+def test_file_readers_import_budget():
+    """Importing the default file readers must not import nor create any reader,
+    as it is on the startup path of the app"""
+    code = (
+        "import sys, time\n"
+        "import kotaemon.indices\n"
+        "start = time.perf_counter()\n"
+        "import kotaemon.indices.ingests.files\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    import_time, modules = float(output[-2]), output[-1].split()
+
+    heavy = ("kotaemon.loaders", "docling", "unstructured", "azure")
+    assert not [module for module in modules if module.startswith(heavy)]
+    assert import_time < 0.5, f"Importing the file readers took {import_time:.2f}s"
+
+
+def test_lazy_readers():
+    from kotaemon.indices.ingests.files import KH_DEFAULT_FILE_EXTRACTORS, get_reader
+    from kotaemon.loaders import TxtReader
+
+    readers = KH_DEFAULT_FILE_EXTRACTORS.copy()
+    readers[".log"] = "kotaemon.loaders.TxtReader"
+    assert ".log" not in KH_DEFAULT_FILE_EXTRACTORS
+    assert isinstance(readers[".log"], TxtReader)
+    # the readers are created once and shared
+    assert readers[".log"] is get_reader("kotaemon.loaders.TxtReader")
+    assert readers[".txt"] is KH_DEFAULT_FILE_EXTRACTORS[".txt"] is get_reader("txt")
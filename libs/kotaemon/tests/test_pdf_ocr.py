@@ -0,0 +1,167 @@
+import copy
+import random
+
+import numpy as np
+
+from kotaemon.loaders.utils.box import (
+    BoxGridIndex,
+    bbox_to_points,
+    box_area,
+    box_h,
+    box_w,
+    get_rect_iou,
+    get_rect_iou_matrix,
+    locations_to_array,
+    union_points,
+)
+from kotaemon.loaders.utils.pdf_ocr import (
+    IOU_THRES,
+    PADDING_THRES,
+    merge_ocr_and_pdf_texts,
+    merge_table_cell_and_ocr,
+)
+
+
+def _random_locations(n: int, seed: int = 0, max_size: int = 40):
+    random.seed(seed)
+    locations = []
+    for _ in range(n):
+        x1, y1 = random.randint(0, 500), random.randint(0, 500)
+        locations.append(
+            bbox_to_points(
+                [
+                    x1,
+                    y1,
+                    x1 + random.randint(1, max_size),
+                    y1 + random.randint(1, max_size),
+                ]
+            )
+        )
+    return locations
+
+
+def _random_items(n: int, seed: int, max_size: int, item_type: str = "text"):
+    return [
+        {
+            "type": item_type,
+            "text": f"{item_type} {idx}",
+            "bbox": [*location[0], *location[2]],
+            "location": location,
+        }
+        for idx, location in enumerate(_random_locations(n, seed, max_size))
+    ]
+
+
+def _reference_merge_table_cell_and_ocr(table_list, ocr_list, pdf_list):
+    """The nested-loop matching used before the grid index"""
+    cell_list = [item for item in table_list if item["type"] == "cell"]
+    table_list = sorted(
+        [item for item in table_list if item["type"] == "table"],
+        key=lambda item: box_area(item["bbox"]),
+    )
+
+    all_tables, matched_pdf_ids, matched_cell_ids = [], [], []
+    for table in table_list:
+        cur_table_cells = []
+        for cell_id, cell in enumerate(cell_list):
+            if cell_id in matched_cell_ids:
+                continue
+            if get_rect_iou(
+                table["location"], cell["location"], iou_type=1
+            ) > IOU_THRES and box_area(table["bbox"]) > box_area(cell["bbox"]):
+                for item_list, item_type in [(pdf_list, "pdf"), (ocr_list, "ocr")]:
+                    cell["ocr"] = []
+                    for item_id, item in enumerate(item_list):
+                        if item_type == "pdf" and item_id in matched_pdf_ids:
+                            continue
+                        if (
+                            get_rect_iou(item["location"], cell["location"], iou_type=1)
+                            > IOU_THRES
+                        ):
+                            cell["ocr"].append(item)
+                            if item_type == "pdf":
+                                matched_pdf_ids.append(item_id)
+
+                    cell_okay = False
+                    if cell["ocr"]:
+                        points = [pt for item in cell["ocr"] for pt in item["location"]]
+                        union_box = union_points(points)
+                        cell_okay = (
+                            box_h(union_box) <= box_h(cell["bbox"]) * PADDING_THRES
+                            and box_w(union_box) <= box_w(cell["bbox"]) * PADDING_THRES
+                        )
+                    if cell_okay:
+                        break
+
+                matched_cell_ids.append(cell_id)
+                cur_table_cells.append(cell)
+        all_tables.append(cur_table_cells)
+
+    not_matched_items = [
+        item for _id, item in enumerate(pdf_list) if _id not in matched_pdf_ids
+    ]
+    return all_tables, not_matched_items
+
+
+def test_rect_iou_matrix_same_as_rect_iou():
+    gt_locations = _random_locations(30, seed=0)
+    pd_locations = _random_locations(40, seed=1)
+    for iou_type in [0, 1]:
+        ious = get_rect_iou_matrix(
+            locations_to_array(gt_locations),
+            locations_to_array(pd_locations),
+            iou_type=iou_type,
+        )
+        for i, gt in enumerate(gt_locations):
+            for j, pd in enumerate(pd_locations):
+                assert ious[i, j] == get_rect_iou(gt, pd, iou_type=iou_type)
+
+
+def test_box_grid_index_match():
+    locations = _random_locations(300)
+    index = BoxGridIndex(locations_to_array(locations))
+    for query in _random_locations(50, seed=2):
+        expected = [
+            idx
+            for idx, location in enumerate(locations)
+            if get_rect_iou(query, location, iou_type=1) > 0.5
+        ]
+        matched = index.match(locations_to_array([query])[0], 0.5, iou_type=1)
+        assert matched.tolist() == expected
+
+
+def test_box_grid_index_empty_and_large_query():
+    empty_index = BoxGridIndex(np.zeros((0, 4)))
+    assert empty_index.query([0, 0, 1e6, 1e6]).size == 0
+
+    locations = _random_locations(50, max_size=5)
+    index = BoxGridIndex(locations_to_array(locations))
+    assert index.query([-1e6, -1e6, 1e6, 1e6]).tolist() == list(range(50))
+    assert index.query([1e5, 1e5, 2e5, 2e5]).size == 0
+
+
+def test_merge_table_cell_and_ocr_same_as_reference():
+    for seed in range(5):
+        table_list = _random_items(3, seed, 400, "table") + _random_items(
+            60, seed + 10, 80, "cell"
+        )
+        ocr_list = _random_items(200, seed + 20, 30)
+        pdf_list = _random_items(200, seed + 30, 30)
+
+        expected = _reference_merge_table_cell_and_ocr(
+            *copy.deepcopy((table_list, ocr_list, pdf_list))
+        )
+        output = merge_table_cell_and_ocr(
+            *copy.deepcopy((table_list, ocr_list, pdf_list))
+        )
+        assert output == expected
+
+
+def test_merge_ocr_and_pdf_texts():
+    pdf_list = [{"text": "pdf", "location": bbox_to_points([0, 0, 10, 10])}]
+    ocr_list = [
+        {"text": "overlap", "location": bbox_to_points([1, 1, 9, 9])},
+        {"text": "outside", "location": bbox_to_points([50, 50, 60, 60])},
+    ]
+    merged = merge_ocr_and_pdf_texts(ocr_list, pdf_list)
+    assert [item["text"] for item in merged] == ["pdf", "outside"]
@@ -1,5 +1,7 @@
+from kotaemon.base import BaseComponent, LLMInterface
+from kotaemon.contribs.promptui.batch import load_results, run_batch
 from kotaemon.contribs.promptui.config import export_pipeline_to_config
-from kotaemon.contribs.promptui.export import export_from_dict
+from kotaemon.contribs.promptui.export import export_from_dict, from_batch_to_dict
 from kotaemon.contribs.promptui.ui import build_from_dict
 
 from .simple_pipeline import Pipeline
@@ -64,3 +66,69 @@ class TestExport:
             pipeline=pipeline_name,
             output_path=str(tmp_path / "exported.xlsx"),
         )
+
+
+class EchoPipeline(BaseComponent):
+    prefix: str = "echo"
+
+    def run(self, text: str) -> LLMInterface:
+        if text == "fail":
+            raise ValueError("cannot answer")
+        return LLMInterface(
+            content=f"{self.prefix}: {text}",
+            prompt_tokens=3,
+            completion_tokens=2,
+            total_tokens=5,
+        )
+
+
+class TestBatch:
+    config = {
+        "inputs": {"text": {"component": "text"}},
+        "logs": {
+            "full_pipeline": {
+                "input": {"step": ".", "getter": "_get_input"},
+                "output": {"step": ".", "getter": "_get_output"},
+            }
+        },
+    }
+
+    def test_run_batch(self, tmp_path):
+        dataset = [{"id": f"q{idx}", "text": f"question {idx}"} for idx in range(8)]
+        dataset.append({"id": "q8", "text": "fail"})
+
+        results = run_batch(
+            EchoPipeline,
+            dataset,
+            tmp_path,
+            params={"prefix": "answer"},
+            config=self.config,
+            concurrency=4,
+            flush_every=3,
+        )
+        assert len(list(tmp_path.glob("part-*.parquet"))) == 3
+        results = results.set_index("id")
+        assert len(results) == 9
+        assert results.loc["q1", "full_pipeline/output"] == "answer: question 1"
+        assert results.loc["q1", "total_tokens"] == 5
+        assert results.loc["q1", "latency"] > 0
+        assert results.loc["q8", "error"] == "ValueError: cannot answer"
+
+        # resume: only the failed and the new items are run
+        dataset.append({"id": "q9", "text": "question 9"})
+        calls = []
+        results = run_batch(
+            EchoPipeline,
+            dataset,
+            tmp_path,
+            config=self.config,
+            callback=lambda n_done, n_total: calls.append(n_total),
+        )
+        assert calls == [2, 2]
+        assert len(results) == 10
+        assert results.set_index("id").loc["q1", "param/prefix"] == "answer"
+
+        data = from_batch_to_dict(load_results(tmp_path), "full_pipeline")
+        assert data["output"][data["ids"].index("q9")] == "echo: question 9"
+        assert data["text"][data["ids"].index("q9")] == "question 9"
+        assert {"prefix", "input", "error", "latency", "total_tokens"} <= set(data)
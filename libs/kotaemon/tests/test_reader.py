@@ -11,6 +11,7 @@ from kotaemon.loaders import (
     DocxReader,
     HtmlReader,
     MhtmlReader,
+    PDFThumbnailReader,
     UnstructuredReader,
 )
 
@@ -54,6 +55,24 @@ def test_pdf_reader():
     assert len(nodes) > 0
 
 
+def test_pdf_thumbnail_reader_page_parallel():
+    input_path = Path(__file__).parent / "resources" / "multimodal.pdf"
+    serial_docs = PDFThumbnailReader().load_data(input_path)
+    parallel_docs = PDFThumbnailReader(
+        num_workers=2, pages_per_task=1, thumbnail_format="JPEG"
+    ).load_data(input_path)
+
+    assert len(parallel_docs) == len(serial_docs)
+
+    thumbnails = [
+        doc for doc in parallel_docs if doc.metadata.get("type") == "thumbnail"
+    ]
+    assert [doc.metadata["page_label"] for doc in thumbnails] == [
+        str(idx + 1) for idx in range(len(thumbnails))
+    ]
+    assert thumbnails[0].metadata["image_origin"].startswith("data:image/jpeg")
+
+
 @skip_when_unstructured_pdf_not_installed
 def test_unstructured_pdf_reader():
     reader = UnstructuredReader()
@@ -93,3 +112,107 @@ def test_azureai_document_intelligence_reader(mock_client):
 
     assert len(docs) == 1
     mock_client.assert_called_once()
+
+
+@patch("kotaemon.loaders.utils.captioning.generate_gpt4v")
+def test_figure_captioner(mock_generate):
+    from kotaemon.loaders.utils.captioning import FigureCaptioner
+
+    mock_generate.side_effect = lambda images, **kwargs: f"caption of {images}"
+    captioner = FigureCaptioner("https://endpoint.com", max_workers=2)
+
+    figures = ["a", "b", "a", "c"]
+    captions = captioner.caption_many(figures, max_figures=3)
+    assert captions == ["caption of a", "caption of b", "caption of a", ""]
+
+    # the duplicated figure is served from the cache
+    captioner.caption_many(figures, max_figures=3)
+    assert mock_generate.call_count <= 3
+
+
+@patch("kotaemon.loaders.utils.captioning.generate_gpt4v")
+def test_figure_captioner_bounds_and_retries(mock_generate):
+    import threading
+    import time
+
+    import requests
+
+    from kotaemon.loaders.utils.captioning import FigureCaptioner
+
+    in_flight, max_in_flight = [0], [0]
+    lock = threading.Lock()
+
+    def generate(images, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return f"caption of {images}"
+
+    mock_generate.side_effect = generate
+    captioner = FigureCaptioner("https://endpoint.com", max_workers=2)
+    threads = [
+        threading.Thread(
+            target=captioner.caption_many, args=([f"{i}-{j}" for j in range(4)],)
+        )
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # the limit holds across concurrent calls, e.g. files indexed in parallel
+    assert max_in_flight[0] <= 2
+
+    def http_error(status_code):
+        response = requests.Response()
+        response.status_code = status_code
+        return requests.HTTPError(response=response)
+
+    # client errors are not retried
+    mock_generate.reset_mock(side_effect=True)
+    mock_generate.side_effect = http_error(400)
+    assert captioner.caption("bad") == ""
+    assert mock_generate.call_count == 1
+
+    # server errors are
+    mock_generate.reset_mock(side_effect=True)
+    mock_generate.side_effect = [http_error(503), "caption"]
+    assert captioner.caption("flaky") == "caption"
+    assert mock_generate.call_count == 2
+
+
+def test_docling_reader_prefetch_is_keyed_and_discarded(tmp_path):
+    import os
+    from concurrent.futures import Future
+
+    from kotaemon.loaders import docling_loader
+
+    file_path = tmp_path / "dummy.pdf"
+    file_path.write_bytes(b"first version")
+
+    class FakePool:
+        def submit(self, fn, path):
+            future: Future = Future()
+            future.set_result({"content": Path(path).read_bytes()})
+            return future
+
+    reader = docling_loader.DoclingReader(num_workers=2)
+    with patch.object(
+        docling_loader, "get_converter_process_pool", return_value=FakePool()
+    ):
+        n_prefetched = len(docling_loader._prefetched)
+        reader.prefetch([file_path])
+        assert len(docling_loader._prefetched) == n_prefetched + 1
+
+        # a new upload reusing the same path is not served the stale result
+        file_path.write_bytes(b"second version, longer")
+        os.utime(file_path, ns=(0, 0))
+        reader.prefetch([file_path])
+        assert reader._convert(file_path) == {"content": b"second version, longer"}
+
+        # the results that are never loaded are dropped
+        reader.discard_prefetched([file_path])
+        assert len(docling_loader._prefetched) == n_prefetched
@@ -6,6 +6,8 @@ import pytest
 from kotaemon.base import DocumentWithEmbedding
 from kotaemon.storages import (
     ChromaVectorStore,
+    FlatFileVectorStore,
+    HNSWVectorStore,
     InMemoryVectorStore,
     MilvusVectorStore,
     QdrantVectorStore,
@@ -130,6 +132,18 @@ class TestInMemoryVectorStore:
             0.6,
         ], "load function does not load data completely"
 
+    def test_bulk_delete(self):
+        from unittest.mock import patch
+
+        ids = [str(idx) for idx in range(1000)]
+        db = InMemoryVectorStore()
+        db.add(embeddings=[[0.1, 0.2, 0.3 * idx] for idx in range(1000)], ids=ids)
+
+        with patch.object(type(db._client), "delete") as mock_delete:
+            db.delete(ids[:600])
+        assert not mock_delete.called, "Expected a single bulk delete"
+        assert sorted(db._client.data.embedding_dict) == sorted(ids[600:])
+
 
 class TestSimpleFileVectorStore:
     def test_add_delete(self, tmp_path):
@@ -159,6 +173,264 @@ class TestSimpleFileVectorStore:
         os.remove(tmp_path / collection_name)
 
 
+class TestFlatFileVectorStore:
+    def test_add_query(self, tmp_path):
+        db = FlatFileVectorStore(path=tmp_path)
+        embeddings = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0]]
+        ids = ["1", "2", "3"]
+        output = db.add(embeddings=embeddings, ids=ids)
+        assert output == ids
+        assert db.count() == 3
+
+        _, scores, out_ids = db.query(embedding=[1.0, 0.1, 0.0], top_k=2)
+        assert out_ids == ["1", "3"]
+        assert scores[0] > scores[1]
+
+        _, _, out_ids = db.query(embedding=[1.0, 0.1, 0.0], top_k=5, ids=["2", "3"])
+        assert out_ids == ["3", "2"]
+
+        generated_ids = db.add(embeddings=[[0.0, 0.0, 1.0]])
+        assert len(generated_ids) == 1 and generated_ids[0] not in ids
+        assert db.count() == 4
+
+    def test_add_from_docs(self, tmp_path):
+        db = FlatFileVectorStore(path=tmp_path)
+        documents = [
+            DocumentWithEmbedding(
+                embedding=[0.1, 0.2, 0.3], metadata={"file_id": "a"}, id_="1"
+            ),
+            DocumentWithEmbedding(
+                embedding=[0.3, 0.2, 0.1], metadata={"file_id": "b"}, id_="2"
+            ),
+        ]
+        output = db.add(documents)
+        assert output == ["1", "2"]
+        assert db.get(["2"]) == [pytest.approx([0.3, 0.2, 0.1])]
+
+    def test_filters(self, tmp_path):
+        from llama_index.core.vector_stores.types import (
+            FilterCondition,
+            FilterOperator,
+            MetadataFilter,
+            MetadataFilters,
+        )
+
+        db = FlatFileVectorStore(path=tmp_path)
+        db.add(
+            embeddings=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+            metadatas=[{"file_id": "a"}, {"file_id": "b"}, {"file_id": "c"}],
+            ids=["1", "2", "3"],
+        )
+        filters = MetadataFilters(
+            filters=[
+                MetadataFilter(
+                    key="file_id", value=["b", "c"], operator=FilterOperator.IN
+                )
+            ],
+            condition=FilterCondition.OR,
+        )
+        _, _, out_ids = db.query(embedding=[1.0, 0.0], top_k=5, filters=filters)
+        assert out_ids == ["2", "3"]
+
+    def test_filters_same_as_scan(self, tmp_path):
+        import random
+
+        from llama_index.core.vector_stores.types import (
+            FilterCondition,
+            FilterOperator,
+            MetadataFilter,
+            MetadataFilters,
+        )
+
+        rng = random.Random(0)
+        file_ids = [f"file_{idx}" for idx in range(20)]
+        db = FlatFileVectorStore(path=tmp_path, metadata_keys=["file_id", "page"])
+        expected: dict[str, dict] = {}
+        for _ in range(10):
+            # the ids are drawn from a small range, so that some are updated
+            added = {
+                str(rng.randrange(300)): {
+                    "file_id": rng.choice(file_ids),
+                    "page": rng.randrange(3),
+                }
+                for _ in range(30)
+            }
+            db.add(
+                embeddings=[[1.0, rng.random()] for _ in added],
+                metadatas=list(added.values()),
+                ids=list(added),
+            )
+            expected.update(added)
+            deleted = rng.sample(sorted(expected), 5)
+            db.delete(deleted)
+            for id_ in deleted:
+                expected.pop(id_)
+
+        def check(db, filters, match):
+            _, _, out_ids = db.query(embedding=[1.0, 0.5], top_k=1000, filters=filters)
+            assert sorted(out_ids) == sorted(
+                id_ for id_, metadata in expected.items() if match(metadata)
+            )
+
+        for reload in [False, True]:
+            if reload:
+                db = FlatFileVectorStore(
+                    path=tmp_path, metadata_keys=["file_id", "page"]
+                )
+            selected = rng.sample(file_ids, 3)
+            check(
+                db,
+                MetadataFilters(
+                    filters=[
+                        MetadataFilter(
+                            key="file_id", value=selected, operator=FilterOperator.IN
+                        ),
+                        MetadataFilter(key="page", value=1, operator=FilterOperator.NE),
+                    ]
+                ),
+                lambda m: m["file_id"] in selected and m["page"] != 1,
+            )
+            check(
+                db,
+                MetadataFilters(
+                    filters=[
+                        MetadataFilter(
+                            key="file_id", value=selected, operator=FilterOperator.NIN
+                        ),
+                        MetadataFilters(
+                            filters=[
+                                MetadataFilter(key="page", value=0),
+                                MetadataFilter(key="page", value=2),
+                            ],
+                            condition=FilterCondition.OR,
+                        ),
+                    ]
+                ),
+                lambda m: m["file_id"] not in selected and m["page"] in (0, 2),
+            )
+
+    def test_delete_upsert_reload(self, tmp_path):
+        db = FlatFileVectorStore(path=tmp_path, compact_ratio=1.0)
+        db.add(
+            embeddings=[[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]],
+            ids=["1", "2", "3"],
+        )
+        db.delete(["3"])
+        db.add(embeddings=[[-1.0, 0.0]], ids=["1"])
+        assert db.count() == 2
+
+        db2 = FlatFileVectorStore(path=tmp_path)
+        assert db2.count() == 2
+        _, _, out_ids = db2.query(embedding=[1.0, 0.0], top_k=3)
+        assert out_ids == ["2", "1"]
+        assert db2.get(["1"]) == [[-1.0, 0.0]]
+
+        db2.compact()
+        db3 = FlatFileVectorStore(path=tmp_path)
+        assert len(db3._ids) == 2
+        _, _, out_ids = db3.query(embedding=[1.0, 0.0], top_k=3)
+        assert out_ids == ["2", "1"]
+
+        db3.drop()
+        assert db3.count() == 0
+        assert not (tmp_path / "default").exists()
+
+    @pytest.mark.parametrize(
+        "quantization, min_recall", [("int8", 0.95), ("binary", 0.5)]
+    )
+    def test_quantized_query(self, tmp_path, quantization, min_recall):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((2000, 64)).astype(np.float32)
+        ids = [str(idx) for idx in range(len(embeddings))]
+        metadatas = [{"file_id": f"file_{idx % 10}"} for idx in range(len(ids))]
+
+        db = FlatFileVectorStore(path=tmp_path, quantization=quantization)
+        exact_db = FlatFileVectorStore(path=tmp_path / "exact")
+        for store in [db, exact_db]:
+            for batch in [slice(0, 1500), slice(1500, None)]:
+                store.add(
+                    embeddings=embeddings[batch].tolist(),
+                    metadatas=metadatas[batch],
+                    ids=ids[batch],
+                )
+
+        # the codes are persisted and reloaded with the vectors
+        db = FlatFileVectorStore(
+            path=tmp_path, quantization=quantization, rescore_multiplier=10
+        )
+        assert db._codes is not None and len(db._codes) == 2000
+
+        hits = 0
+        for query in rng.standard_normal((20, 64)).astype(np.float32):
+            _, scores, out_ids = db.query(embedding=query.tolist(), top_k=10)
+            _, _, expected_ids = exact_db.query(embedding=query.tolist(), top_k=10)
+            hits += len(set(out_ids) & set(expected_ids))
+
+            # the candidates are re-scored in full precision
+            vectors = embeddings[[int(id_) for id_ in out_ids]]
+            cosine = vectors @ query / np.linalg.norm(vectors, axis=1)
+            cosine /= np.linalg.norm(query)
+            assert scores == pytest.approx(cosine.tolist(), abs=1e-5)
+        assert hits / 200 >= min_recall
+
+        db.delete(ids[1500:1600])
+        _, _, out_ids = db.query(embedding=embeddings[1550].tolist(), top_k=5)
+        assert ids[1550] not in out_ids
+        _, _, out_ids = db.query(
+            embedding=embeddings[1700].tolist(), top_k=1, ids=ids[1650:]
+        )
+        assert out_ids == [ids[1700]]
+
+
+class TestHNSWVectorStore:
+    def test_query_recall(self, tmp_path):
+        pytest.importorskip("hnswlib")
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((2000, 16)).tolist()
+        ids = [str(idx) for idx in range(len(embeddings))]
+        metadatas = [{"file_id": f"file_{idx % 10}"} for idx in range(len(ids))]
+
+        db = HNSWVectorStore(path=tmp_path, exact_search_threshold=100)
+        flat_db = FlatFileVectorStore(path=tmp_path / "flat")
+        for store in [db, flat_db]:
+            store.add(embeddings=embeddings, metadatas=metadatas, ids=ids)
+
+        hits = 0
+        for query in rng.standard_normal((20, 16)).tolist():
+            _, _, out_ids = db.query(embedding=query, top_k=10)
+            _, _, expected_ids = flat_db.query(embedding=query, top_k=10)
+            hits += len(set(out_ids) & set(expected_ids))
+        assert hits / 200 > 0.9
+
+        # small scopes are searched exactly
+        query = embeddings[0]
+        _, _, out_ids = db.query(embedding=query, top_k=3, ids=ids[:50])
+        assert out_ids == flat_db.query(embedding=query, top_k=3, ids=ids[:50])[2]
+
+    def test_delete_save_load(self, tmp_path):
+        pytest.importorskip("hnswlib")
+
+        db = HNSWVectorStore(path=tmp_path, exact_search_threshold=0, save_every=2)
+        db.add(
+            embeddings=[[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]],
+            ids=["1", "2", "3"],
+        )
+        db.delete(["1"])
+        assert db.query(embedding=[1.0, 0.0], top_k=1)[2] == ["3"]
+
+        # the last row is added after the graph was saved
+        db.add(embeddings=[[0.9, 0.1]], ids=["4"])
+        db2 = HNSWVectorStore(path=tmp_path, exact_search_threshold=0)
+        assert db2.query(embedding=[1.0, 0.0], top_k=2)[2] == ["4", "3"]
+
+        db2.drop()
+        assert db2.count() == 0
+
+
 class TestMilvusVectorStore:
     def test_add(self, tmp_path):
         """Test that the DB add correctly"""
@@ -366,3 +638,32 @@ class TestQdrantVectorStore:
             # Since no docs were added, the collection should not exist yet
             # and thus the count function should raise an exception
             db2.count()
+
+
+def test_lancedb_filter_quoting():
+    lancedb = pytest.importorskip("kotaemon.storages.vectorstores.lancedb")
+    from llama_index.core.vector_stores.types import (
+        FilterCondition,
+        FilterOperator,
+        MetadataFilter,
+        MetadataFilters,
+    )
+
+    filters = MetadataFilters(
+        filters=[
+            MetadataFilter(
+                key="file_id", value=["a", "it's"], operator=FilterOperator.IN
+            ),
+            MetadataFilters(
+                filters=[
+                    MetadataFilter(key="page", value=1, operator=FilterOperator.NE),
+                    MetadataFilter(key="name", value="x"),
+                ],
+                condition=FilterCondition.OR,
+            ),
+        ]
+    )
+    expected = "metadata.file_id IN ('a', 'it''s') AND (page != 1 OR name = 'x')"
+    assert lancedb.custom_to_lance_filter(filters, ["file_id"]) == expected
+    # the filters are not modified, so they can be reused
+    assert lancedb.custom_to_lance_filter(filters, ["file_id"]) == expected
@@ -10,6 +10,7 @@ from ktem.components import reasonings
 from ktem.exceptions import HookAlreadyDeclared, HookNotDeclared
 from ktem.index import IndexManager
 from ktem.settings import BaseSettingGroup, SettingGroup, SettingReasoningGroup
+from ktem.utils.startup import startup_profiler
 from theflow.settings import settings
 from theflow.utils.modules import import_dotted_string
 
@@ -71,9 +72,12 @@ class BaseApp:
         self._callbacks: dict[str, list] = {}
         self._events: dict[str, list] = {}
 
-        self.register_extensions()
-        self.register_reasonings()
-        self.initialize_indices()
+        with startup_profiler.phase("register extensions"):
+            self.register_extensions()
+        with startup_profiler.phase("register reasonings"):
+            self.register_reasonings()
+        with startup_profiler.phase("initialize indices"):
+            self.initialize_indices()
 
         self.default_settings.reasoning.finalize()
         self.default_settings.index.finalize()
@@ -208,12 +212,14 @@ class BaseApp:
             self.settings_state.render()
             self.user_id.render()
 
-            self.ui()
+            with startup_profiler.phase("render UI"):
+                self.ui()
 
-            self.declare_public_events()
-            self.subscribe_public_events()
-            self.register_events()
-            self.on_app_created()
+            with startup_profiler.phase("register events"):
+                self.declare_public_events()
+                self.subscribe_public_events()
+                self.register_events()
+                self.on_app_created()
 
             demo.load(None, None, None, js=self._pdf_view_js)
 
@@ -2,7 +2,7 @@ import datetime
 import uuid
 from typing import Optional
 
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Text
 from sqlmodel import Field, SQLModel
 from tzlocal import get_localzone
 
@@ -33,7 +33,8 @@ class BaseConversation(SQLModel):
 
     is_public: bool = Field(default=False)
 
-    # contains messages + current files + chat_suggestions
+    # contains current files + chat_suggestions + state + likes + the number of
+    # messages, the messages are stored in the ConversationMessage table
     data_source: dict = Field(default={}, sa_column=Column(JSON))
 
     date_created: datetime.datetime = Field(
@@ -44,6 +45,35 @@ class BaseConversation(SQLModel):
     )
 
 
+class BaseConversationMessage(SQLModel):
+    """Store a turn of a conversation, a row is appended when a turn is answered
+
+    A regenerated answer is appended as a new row of the same turn, the current
+    version of a turn is its latest row.
+
+    Attributes:
+        id: canonical id, increasing in the order the rows are written
+        conversation_id: the id of the conversation
+        turn: the position of the turn in the conversation
+        message: the user message and the bot answer
+        retrieval: the rendered retrieval panel of the answer
+        plot: the plot of the answer
+        date_created: the date the row was written
+    """
+
+    __table_args__ = {"extend_existing": True}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    conversation_id: str = Field(index=True)
+    turn: int
+    message: list = Field(default=[], sa_column=Column(JSON))
+    retrieval: str = Field(default="", sa_column=Column(Text))
+    plot: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    date_created: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(get_localzone())
+    )
+
+
 class BaseUser(SQLModel):
     """Store the user information
 
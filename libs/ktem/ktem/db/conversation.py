@@ -0,0 +1,133 @@
+"""Read and write the messages of the conversations
+
+The messages, retrieval panels and plots of a conversation are stored as rows of
+`ConversationMessage`, one per answered turn, so that answering a turn writes one
+row instead of the whole conversation. The conversation keeps the number of its
+messages in `data_source["n_messages"]`.
+
+The conversations created before used to keep everything in `data_source`, they
+are migrated to the rows when they are opened or written, or all at once with
+`scripts/migrate/split_conversation_messages.py`.
+"""
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from .models import Conversation, ConversationMessage
+
+LEGACY_KEYS = ("messages", "retrieval_messages", "plot_history")
+
+
+def append_turns(
+    session: Session,
+    conversation: Conversation,
+    messages: list,
+    retrieval_history: list[str],
+    plot_history: list[Optional[dict]],
+    start: int,
+):
+    """Write the turns of `messages` from `start`, and the number of messages
+
+    A turn written again, like a regenerated answer, is appended as a new row. The
+    turns after the number of messages are ignored when loading, so a shortened
+    conversation writes no row. The session is not committed.
+    """
+    for turn in range(start, len(messages)):
+        retrieval = retrieval_history[turn] if turn < len(retrieval_history) else ""
+        session.add(
+            ConversationMessage(
+                conversation_id=conversation.id,
+                turn=turn,
+                message=list(messages[turn]),
+                retrieval=retrieval or "",
+                plot=plot_history[turn] if turn < len(plot_history) else None,
+            )
+        )
+
+    conversation.data_source = {
+        **conversation.data_source,
+        "n_messages": len(messages),
+    }
+    session.add(conversation)
+
+
+def load_turns(
+    session: Session, conversation: Conversation
+) -> tuple[list, list[str], list[Optional[dict]]]:
+    """Return the messages, retrieval history and plot history of a conversation"""
+    n_messages = conversation.data_source.get("n_messages", 0)
+    if not n_messages:
+        return [], [], []
+
+    statement = (
+        select(ConversationMessage)
+        .where(
+            ConversationMessage.conversation_id == conversation.id,
+            ConversationMessage.turn < n_messages,
+        )
+        .order_by(ConversationMessage.turn, ConversationMessage.id)  # type: ignore
+    )
+    # the latest row of a turn is its current version
+    turns = {row.turn: row for row in session.exec(statement)}
+    rows = [turns[turn] for turn in sorted(turns)]
+
+    return (
+        [row.message for row in rows],
+        [row.retrieval for row in rows],
+        [row.plot for row in rows],
+    )
+
+
+def delete_turns(session: Session, conversation_id: str):
+    """Delete the rows of a conversation, the session is not committed"""
+    session.execute(
+        delete(ConversationMessage).where(
+            ConversationMessage.conversation_id == conversation_id  # type: ignore
+        )
+    )
+
+
+def migrate_conversation(session: Session, conversation: Conversation) -> bool:
+    """Move the messages kept in `data_source` to rows, the session is not committed
+
+    Returns:
+        whether the conversation was migrated
+    """
+    data_source = conversation.data_source or {}
+    if not any(key in data_source for key in LEGACY_KEYS):
+        return False
+
+    conversation.data_source = {
+        key: value for key, value in data_source.items() if key not in LEGACY_KEYS
+    }
+    append_turns(
+        session,
+        conversation,
+        messages=data_source.get("messages", []),
+        retrieval_history=data_source.get("retrieval_messages", []),
+        plot_history=data_source.get("plot_history", []),
+        start=0,
+    )
+    return True
+
+
+def migrate_conversations(engine) -> int:
+    """Migrate all the conversations that keep their messages in `data_source`
+
+    Returns:
+        the number of migrated conversations
+    """
+    with Session(engine) as session:
+        ids = session.exec(select(Conversation.id)).all()
+
+    n_migrated = 0
+    for id_ in ids:
+        # one conversation at a time, to not load all of them in memory
+        with Session(engine) as session:
+            conversation = session.get(Conversation, id_)
+            if conversation is not None and migrate_conversation(session, conversation):
+                session.commit()
+                n_migrated += 1
+
+    return n_migrated
@@ -10,6 +10,12 @@ _base_conv = (
     else base_models.BaseConversation
 )
 
+_base_conv_message = (
+    import_dotted_string(settings.KH_TABLE_CONV_MESSAGE, safe=False)
+    if hasattr(settings, "KH_TABLE_CONV_MESSAGE")
+    else base_models.BaseConversationMessage
+)
+
 _base_user = (
     import_dotted_string(settings.KH_TABLE_USER, safe=False)
     if hasattr(settings, "KH_TABLE_USER")
@@ -33,6 +39,10 @@ class Conversation(_base_conv, table=True):  # type: ignore
     """Conversation record"""
 
 
+class ConversationMessage(_base_conv_message, table=True):  # type: ignore
+    """Conversation message record"""
+
+
 class User(_base_user, table=True):  # type: ignore
     """User table"""
 
@@ -51,6 +51,8 @@ class BaseIndex(abc.ABC):
         get_indexing_pipeline: return the indexing pipeline when the entities are
             populated into the index
         get_retriever_pipelines: return the retriever pipelines when the user chat
+        get_retriever_pipelines_key: return what the retriever pipelines are built
+            from, to reuse them between the questions
     """
 
     def __init__(self, app, id, name, config):
@@ -130,3 +132,13 @@ class BaseIndex(abc.ABC):
     ) -> list["BaseComponent"]:
         """Return the retriever pipelines to retrieve the entity from the index"""
         return []
+
+    def get_retriever_pipelines_key(
+        self, settings: dict, user_id: int, selected: Any = None
+    ) -> Any:
+        """Return what `get_retriever_pipelines` builds the pipelines from
+
+        The pipelines are reused between the questions while this value does not
+        change. None, the default, rebuilds them for each question.
+        """
+        return None
@@ -44,15 +44,20 @@ class BaseFileIndexIndexing(BaseComponent):
     You will have access to the following resources:
         - self._Source: the source table
         - self._Index: the index table
+        - self._Chunk: the order of the chunks of the files
         - self._VS: the vector store
         - self._DS: the docstore
     """
 
     Source = Param(help="The SQLAlchemy Source table")
     Index = Param(help="The SQLAlchemy Index table")
+    Chunk = Param(help="The SQLAlchemy Chunk table, the order of the chunks")
     VS = Param(help="The VectorStore")
     DS = Param(help="The DocStore")
     FSPath = Param(help="The file storage path")
+    ChunkExportPath = Param(
+        None, help="The directory of the chunk exports, None to not export them"
+    )
     user_id = Param(help="The user id")
     private = Param(False, help="Whether this is private index")
     chunk_size = Param(help="Chunk size for this index")
@@ -0,0 +1,138 @@
+"""Browse the chunks of the indexed files, one page at a time
+
+The order of the chunks of a file, by page then by position in the file, is kept
+in the `Chunk` table of the index, so that a page of chunks is read from the
+docstore without loading the other chunks of the file. The files indexed before
+the table existed get their order recorded the first time they are browsed.
+"""
+import base64
+import binascii
+import hashlib
+import re
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from kotaemon.base import Document
+
+# the documents kept in the docstore for the other documents, not browsed
+AUXILIARY_TYPES = ("thumbnail",)
+
+_DATA_URL = re.compile(r"^data:image/(?P<ext>[\w.+-]+);base64,(?P<data>.*)$", re.S)
+
+
+def page_number(page_label) -> Optional[int]:
+    """Return the page of a chunk as a number, None if it has no numeric page"""
+    try:
+        return int(page_label)
+    except (TypeError, ValueError):
+        return None
+
+
+def record_chunks(session: Session, Chunk, file_id: str, docs: list, start: int):
+    """Record the order of the chunks `docs`, the session is not committed
+
+    Args:
+        session: the database session
+        Chunk: the chunk table of the index
+        file_id: the file of the chunks
+        docs: the chunks, in their order in the file
+        start: the position of the first chunk in the file
+    """
+    session.add_all(
+        [
+            Chunk(
+                source_id=file_id,
+                page=page_number(doc.metadata.get("page_label")),
+                position=start + idx,
+                doc_id=doc.doc_id,
+            )
+            for idx, doc in enumerate(docs)
+            if doc.metadata.get("type", "text") not in AUXILIARY_TYPES
+        ]
+    )
+
+
+def count_chunks(session: Session, Chunk, file_id: str) -> int:
+    return session.execute(
+        select(func.count()).select_from(Chunk).where(Chunk.source_id == file_id)
+    ).scalar_one()
+
+
+def backfill_chunks(session: Session, Chunk, Index, docstore, file_id: str) -> int:
+    """Record the order of the chunks of a file indexed without it
+
+    The chunks are ordered as they used to be shown: by page, the chunks without
+    page last. The session is committed.
+
+    Returns:
+        the number of recorded chunks
+    """
+    doc_ids = session.execute(
+        select(Index.target_id).where(
+            Index.source_id == file_id,
+            Index.relation_type == "document",
+        )
+    ).scalars()
+    docs = docstore.get(list(doc_ids))
+    docs = sorted(
+        docs,
+        key=lambda doc: (
+            page_number(doc.metadata.get("page_label")) is None,
+            page_number(doc.metadata.get("page_label")) or 0,
+        ),
+    )
+
+    # another request may have recorded them meanwhile
+    if not count_chunks(session, Chunk, file_id):
+        record_chunks(session, Chunk, file_id, docs, start=0)
+        session.commit()
+    return count_chunks(session, Chunk, file_id)
+
+
+def get_chunks(
+    session: Session, Chunk, docstore, file_id: str, offset: int, limit: int
+) -> list[Document]:
+    """Return `limit` chunks of a file from `offset`, in their order"""
+    doc_ids = session.execute(
+        select(Chunk.doc_id)
+        .where(Chunk.source_id == file_id)
+        .order_by(Chunk.page.asc().nulls_last(), Chunk.position)
+        .offset(offset)
+        .limit(limit)
+    ).scalars()
+    doc_ids = list(doc_ids)
+    docs = {doc.doc_id: doc for doc in docstore.get(doc_ids)}
+    return [docs[doc_id] for doc_id in doc_ids if doc_id in docs]
+
+
+def image_reference(doc_id: str, url: str, cache_dir: str | Path) -> Optional[Path]:
+    """Write the image of a chunk to a file, to load it by reference
+
+    The images are kept as base64 data URL in the chunks, they are written once
+    to `cache_dir`.
+
+    Returns:
+        the path of the image, None if `url` is not a data URL
+    """
+    match = _DATA_URL.match(url or "")
+    if not match:
+        return None
+
+    ext = match.group("ext").split("+")[0]
+    name = hashlib.md5(doc_id.encode("utf-8")).hexdigest()
+    path = Path(cache_dir) / f"{name}.{ext}"
+    if not path.exists():
+        try:
+            data = base64.b64decode(match.group("data"))
+        except (binascii.Error, ValueError):
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written then renamed, so a concurrent reader never sees half an image
+        tmp_path = path.with_suffix(f".{uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    return path
@@ -1,5 +1,23 @@
-from .graph_index import GraphRAGIndex
-from .light_graph_index import LightRAGIndex
-from .nano_graph_index import NanoGraphRAGIndex
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .graph_index import GraphRAGIndex
+    from .light_graph_index import LightRAGIndex
+    from .nano_graph_index import NanoGraphRAGIndex
 
 __all__ = ["GraphRAGIndex", "NanoGraphRAGIndex", "LightRAGIndex"]
+
+# each index is imported when it is used, so that enabling one graph index does
+# not import the pipelines (and create the storage folders) of the others
+_INDICES = {
+    "GraphRAGIndex": ".graph_index",
+    "NanoGraphRAGIndex": ".nano_graph_index",
+    "LightRAGIndex": ".light_graph_index",
+}
+
+
+def __getattr__(name: str):
+    if name in _INDICES:
+        return getattr(import_module(_INDICES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
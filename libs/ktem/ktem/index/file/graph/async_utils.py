@@ -0,0 +1,151 @@
+"""Helpers shared by the LightRAG / NanoGraphRAG pipelines, which run async"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from decouple import config
+
+CHECKPOINT_FILE = "kh_index_checkpoint.json"
+EMBEDDING_BATCH_SIZE = config("KH_GRAPHRAG_EMBEDDING_BATCH_SIZE", default=64, cast=int)
+
+# the embedding models without async API run in these threads
+_embedding_executor = ThreadPoolExecutor(
+    max_workers=config("KH_GRAPHRAG_EMBEDDING_THREADS", default=4, cast=int),
+    thread_name_prefix="graph-embedding",
+)
+# the embedding classes whose ainvoke is not implemented
+_sync_embedding_classes: set[type] = set()
+
+
+def estimate_tokens(*texts: str | None) -> int:
+    """Roughly count the tokens of the texts, 4 characters per token"""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+
+class TokenRateLimiter:
+    """Limit the number of LLM tokens sent per minute, across threads and loops
+
+    A call reserves its tokens, then waits until the reserved tokens fit in the
+    rate. So concurrent calls are served in order and never exceed the rate.
+
+    Args:
+        tokens_per_minute: the rate, 0 to not limit
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._available = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take the tokens from the bucket, return the seconds to wait for them"""
+        rate = self.tokens_per_minute / 60
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(
+                self._available + (now - self._updated_at) * rate,
+                self.tokens_per_minute,
+            )
+            self._updated_at = now
+            # a call larger than the rate would wait forever
+            self._available -= min(tokens, self.tokens_per_minute)
+            return max(-self._available, 0) / rate
+
+    async def acquire(self, tokens: int):
+        """Wait until `tokens` can be sent"""
+        if self.tokens_per_minute <= 0:
+            return
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def consume(self, tokens: int):
+        """Count `tokens` already used, like the tokens of a completion"""
+        if self.tokens_per_minute <= 0:
+            return
+        self._reserve(tokens)
+
+
+# shared by all the graph builds of the process, as they share the LLM quota
+llm_rate_limiter = TokenRateLimiter(
+    config("KH_GRAPHRAG_TOKENS_PER_MINUTE", default=0, cast=int)
+)
+
+
+class IndexCheckpoint:
+    """Remember the batches of documents already inserted into a graph
+
+    The graph libraries save the graph at the end of each insert, so inserting
+    the documents in several calls, and recording each call here, lets an
+    interrupted build resume after the last inserted batch.
+
+    Args:
+        working_dir: the directory of the graph
+    """
+
+    def __init__(self, working_dir: str | Path):
+        self.path = Path(working_dir) / CHECKPOINT_FILE
+        try:
+            self._done = set(json.loads(self.path.read_text()))
+        except (FileNotFoundError, ValueError):
+            self._done = set()
+
+    @staticmethod
+    def key(batch: str) -> str:
+        return hashlib.md5(batch.encode("utf-8")).hexdigest()
+
+    def __contains__(self, batch: str) -> bool:
+        return self.key(batch) in self._done
+
+    def add(self, batches: list[str]):
+        """Record the inserted batches, and write the checkpoint"""
+        self._done.update(self.key(batch) for batch in batches)
+        self.path.write_text(json.dumps(sorted(self._done)))
+
+
+async def _aembed_batch(model, texts: list[str]) -> list[list[float]]:
+    if type(model) not in _sync_embedding_classes:
+        try:
+            return [doc.embedding for doc in await model.ainvoke(texts)]
+        except NotImplementedError:
+            _sync_embedding_classes.add(type(model))
+
+    outputs = await asyncio.get_running_loop().run_in_executor(
+        _embedding_executor, model, texts
+    )
+    return [doc.embedding for doc in outputs]
+
+
+async def aembed(model, texts: list[str]) -> np.ndarray:
+    """Embed the texts with a kotaemon embedding model, without blocking the loop
+
+    The model's ainvoke is used when implemented, otherwise the model is called
+    in a bounded pool of threads. The duplicated texts are embedded once, and the
+    texts are sent in batches of EMBEDDING_BATCH_SIZE, concurrently.
+
+    Args:
+        model: the kotaemon embedding model
+        texts: the texts to embed
+
+    Returns:
+        the embeddings, in the order of the texts
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    batches = [
+        unique_texts[idx : idx + EMBEDDING_BATCH_SIZE]
+        for idx in range(0, len(unique_texts), EMBEDDING_BATCH_SIZE)
+    ]
+    outputs = await asyncio.gather(*[_aembed_batch(model, batch) for batch in batches])
+
+    embeddings = {
+        text: embedding
+        for batch, batch_embeddings in zip(batches, outputs)
+        for text, embedding in zip(batch, batch_embeddings)
+    }
+    return np.array([embeddings[text] for text in texts])
@@ -0,0 +1,118 @@
+"""Process-level cache of the loaded LightRAG / NanoGraphRAG engines
+
+Loading a graph engine reads its graphml, its KV stores and its entity vector DB
+from disk, so the engines are kept in memory between the questions. An engine is
+reloaded when its graph was indexed again, which bumps the version stored next to
+the graph, or when the default LLM or embedding model changes.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+from decouple import config
+
+GRAPH_VERSION_FILE = "graph_version"
+
+_embedding_dims: dict[int, tuple[Any, int]] = {}
+_embedding_dims_lock = threading.Lock()
+
+
+def get_embedding_dim(model) -> int:
+    """Return the dimension of the embeddings of `model`
+
+    The model is only called the first time, to embed a probe text.
+    """
+    with _embedding_dims_lock:
+        cached = _embedding_dims.get(id(model))
+        # the model is kept in the cache so that its id is not reused
+        if cached is not None and cached[0] is model:
+            return cached[1]
+
+    dim = len(model(["Hi"])[0].embedding)
+    with _embedding_dims_lock:
+        _embedding_dims[id(model)] = (model, dim)
+    return dim
+
+
+def get_graph_version(working_dir: str | Path) -> str:
+    """Return the version of the graph in `working_dir`, empty if never bumped"""
+    try:
+        return (Path(working_dir) / GRAPH_VERSION_FILE).read_text().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def bump_graph_version(working_dir: str | Path) -> str:
+    """Mark the graph in `working_dir` as changed, to reload its cached engines
+
+    The version is stored in the graph directory, so that the engines cached by
+    the other processes serving the app are reloaded too.
+    """
+    version = uuid4().hex
+    (Path(working_dir) / GRAPH_VERSION_FILE).write_text(version)
+    return version
+
+
+class GraphEngineCache:
+    """Keep the most recently used graph engines, by graph id
+
+    Args:
+        max_size: the number of engines kept in memory, defaults to the
+            `KH_GRAPH_ENGINE_CACHE_SIZE` environment variable, or 4
+    """
+
+    def __init__(self, max_size: int | None = None):
+        if max_size is None:
+            max_size = config("KH_GRAPH_ENGINE_CACHE_SIZE", default=4, cast=int)
+        self.max_size = max_size
+        self._engines: OrderedDict[str, tuple[str, tuple, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        graph_id: str,
+        working_dir: str | Path,
+        models: tuple,
+        build: Callable[[], Any],
+    ) -> Any:
+        """Return the engine of the graph, built with `build` if not cached
+
+        Args:
+            graph_id: the id of the graph
+            working_dir: the directory of the graph, holding its version
+            models: the models used by the engine, a different model rebuilds it
+            build: create the engine
+        """
+        version = get_graph_version(working_dir)
+        with self._lock:
+            cached = self._engines.get(graph_id)
+            if (
+                cached is not None
+                and cached[0] == version
+                and len(cached[1]) == len(models)
+                and all(a is b for a, b in zip(cached[1], models))
+            ):
+                self._engines.move_to_end(graph_id)
+                return cached[2]
+
+            # building under the lock avoids loading the same graph twice, when
+            # several questions arrive at once after a restart
+            engine = build()
+            if self.max_size > 0:
+                self._engines[graph_id] = (version, models, engine)
+                self._engines.move_to_end(graph_id)
+                while len(self._engines) > self.max_size:
+                    self._engines.popitem(last=False)
+            return engine
+
+    def invalidate(self, graph_id: str):
+        """Drop the cached engine of the graph"""
+        with self._lock:
+            self._engines.pop(graph_id, None)
+
+    def clear(self):
+        """Drop all the cached engines"""
+        with self._lock:
+            self._engines.clear()
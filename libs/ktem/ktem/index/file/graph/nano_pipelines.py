@@ -4,10 +4,10 @@ import logging
 import os
 import re
 from pathlib import Path
-from typing import Generator
+from typing import TYPE_CHECKING, Generator
 
 import numpy as np
-import pandas as pd
+from decouple import config
 from ktem.db.models import engine
 from ktem.embeddings.manager import embedding_models_manager as embeddings
 from ktem.llms.manager import llms
@@ -24,26 +24,19 @@ from kotaemon.base import Document, Param, RetrievedDocument
 from kotaemon.base.schema import AIMessage, HumanMessage, SystemMessage
 
 from ..pipelines import BaseFileIndexRetriever
+from .async_utils import IndexCheckpoint, aembed, estimate_tokens, llm_rate_limiter
+from .engine_cache import GraphEngineCache, bump_graph_version, get_embedding_dim
 from .pipelines import GraphRAGIndexingPipeline
 from .visualize import create_knowledge_graph, visualize_graph
 
-try:
-    from nano_graphrag import GraphRAG, QueryParam
-    from nano_graphrag._op import (
-        _find_most_related_community_from_entities,
-        _find_most_related_edges_from_entities,
-        _find_most_related_text_unit_from_entities,
-    )
-    from nano_graphrag._utils import EmbeddingFunc, compute_args_hash
+if TYPE_CHECKING:
+    import pandas as pd
 
-except ImportError:
-    print(
-        (
-            "Nano-GraphRAG dependencies not installed. "
-            "Try `pip install nano-graphrag` to install. "
-            "Nano-GraphRAG retriever pipeline will not work properly."
-        )
-    )
+NANO_GRAPHRAG_NOT_INSTALLED_MESSAGE = (
+    "Nano-GraphRAG dependencies not installed. "
+    "Try `pip install nano-graphrag` to install. "
+    "Nano-GraphRAG retriever pipeline will not work properly."
+)
 
 
 logging.getLogger("nano-graphrag").setLevel(logging.INFO)
@@ -53,6 +46,13 @@ filestorage_path = Path(settings.KH_FILESTORAGE_PATH) / "nano_graphrag"
 filestorage_path.mkdir(parents=True, exist_ok=True)
 
 INDEX_BATCHSIZE = 4
+# the batches inserted together, the graph is saved after each group
+INDEX_CHECKPOINT_BATCHES = config("KH_GRAPHRAG_CHECKPOINT_BATCHES", default=8, cast=int)
+# the LLM calls run at the same time by a graph engine
+LLM_CONCURRENCY = config("KH_GRAPHRAG_LLM_CONCURRENCY", default=16, cast=int)
+
+# the graphs loaded by the retrievers, kept between the questions
+graph_engines = GraphEngineCache()
 
 
 def get_llm_func(model):
@@ -83,16 +83,22 @@ def get_llm_func(model):
         input_messages.append(HumanMessage(text=prompt))
 
         if hashing_kv is not None:
+            from nano_graphrag._utils import compute_args_hash
+
             args_hash = compute_args_hash("model", input_messages)
             if_cache_return = await hashing_kv.get_by_id(args_hash)
             if if_cache_return is not None:
                 return if_cache_return["return"]
 
+        await llm_rate_limiter.acquire(
+            estimate_tokens(*(msg.text for msg in input_messages))
+        )
         try:
             output = await _call_model(model, input_messages)
         except Exception as e:
             logging.error(f"Failed to call LLM API after 3 retries: {str(e)}")
             raise
+        llm_rate_limiter.consume(estimate_tokens(output))
 
         print("-" * 50)
         print(output, "\n", "-" * 50)
@@ -107,24 +113,25 @@ def get_llm_func(model):
 
 def get_embedding_func(model):
     async def embedding_func(texts: list[str]) -> np.ndarray:
-        outputs = model(texts)
-        embedding_outputs = np.array([doc.embedding for doc in outputs])
-
-        return embedding_outputs
+        return await aembed(model, texts)
 
     return embedding_func
 
 
 def get_default_models_wrapper():
+    try:
+        from nano_graphrag._utils import EmbeddingFunc
+    except ImportError:
+        raise ImportError(NANO_GRAPHRAG_NOT_INSTALLED_MESSAGE)
+
     # setup model functions
     default_embedding = embeddings.get_default()
-    default_embedding_dim = len(default_embedding(["Hi"])[0].embedding)
+    default_embedding_dim = get_embedding_dim(default_embedding)
     embedding_func = EmbeddingFunc(
         embedding_dim=default_embedding_dim,
         max_token_size=8192,
         func=get_embedding_func(default_embedding),
     )
-    print("GraphRAG embedding dim", default_embedding_dim)
 
     default_llm = llms.get_default()
     llm_func = get_llm_func(default_llm)
@@ -139,7 +146,9 @@ def prepare_graph_index_path(graph_id: str):
     return root_path, input_path
 
 
-def list_of_list_to_df(data: list[list]) -> pd.DataFrame:
+def list_of_list_to_df(data: list[list]) -> "pd.DataFrame":
+    import pandas as pd
+
     df = pd.DataFrame(data[1:], columns=data[0])
     return df
 
@@ -153,6 +162,12 @@ async def nano_graph_rag_build_local_query_context(
     query,
     query_param,
 ):
+    from nano_graphrag._op import (
+        _find_most_related_community_from_entities,
+        _find_most_related_edges_from_entities,
+        _find_most_related_text_unit_from_entities,
+    )
+
     knowledge_graph_inst = graph_func.chunk_entity_relation_graph
     entities_vdb = graph_func.entities_vdb
     community_reports = graph_func.community_reports
@@ -225,10 +240,14 @@ async def nano_graph_rag_build_local_query_context(
 
 
 def build_graphrag(working_dir, llm_func, embedding_func):
+    from nano_graphrag import GraphRAG
+
     graphrag_func = GraphRAG(
         working_dir=working_dir,
         best_model_func=llm_func,
         cheap_model_func=llm_func,
+        best_model_max_async=LLM_CONCURRENCY,
+        cheap_model_max_async=LLM_CONCURRENCY,
         embedding_func=embedding_func,
     )
     return graphrag_func
@@ -345,8 +364,21 @@ class NanoGraphRAGIndexingPipeline(GraphRAGIndexingPipeline):
             embedding_func=embedding_func,
         )
 
+        # skip the batches inserted before an interruption
+        checkpoint = IndexCheckpoint(input_path)
+        batches = [
+            all_docs[doc_id : doc_id + INDEX_BATCHSIZE]
+            for doc_id in range(0, len(all_docs), INDEX_BATCHSIZE)
+        ]
+        combined_docs = ["\n".join(cur_docs) for cur_docs in batches]
+        pending = [
+            (combined_doc, len(cur_docs))
+            for combined_doc, cur_docs in zip(combined_docs, batches)
+            if combined_doc not in checkpoint
+        ]
+
         total_docs = len(all_docs)
-        process_doc_count = 0
+        process_doc_count = total_docs - sum(n_docs for _, n_docs in pending)
         yield Document(
             channel="debug",
             text=(
@@ -355,20 +387,30 @@ class NanoGraphRAGIndexingPipeline(GraphRAGIndexingPipeline):
             ),
         )
 
-        for doc_id in range(0, len(all_docs), INDEX_BATCHSIZE):
-            cur_docs = all_docs[doc_id : doc_id + INDEX_BATCHSIZE]
-            combined_doc = "\n".join(cur_docs)
-
-            # Use insert for incremental updates
-            graphrag_func.insert(combined_doc)
-            process_doc_count += len(cur_docs)
-            yield Document(
-                channel="debug",
-                text=(
-                    f"[GraphRAG] {'Updated' if is_incremental else 'Indexed'} "
-                    f"{process_doc_count} / {total_docs} documents."
-                ),
-            )
+        # the batches of a group are extracted concurrently, with at most
+        # LLM_CONCURRENCY LLM calls at a time, then the graph is saved
+        loop = asyncio.new_event_loop()
+        try:
+            for group_id in range(0, len(pending), INDEX_CHECKPOINT_BATCHES):
+                group = pending[group_id : group_id + INDEX_CHECKPOINT_BATCHES]
+                loop.run_until_complete(
+                    graphrag_func.ainsert([combined_doc for combined_doc, _ in group])
+                )
+                checkpoint.add([combined_doc for combined_doc, _ in group])
+                process_doc_count += sum(n_docs for _, n_docs in group)
+                yield Document(
+                    channel="debug",
+                    text=(
+                        f"[GraphRAG] {'Updated' if is_incremental else 'Indexed'} "
+                        f"{process_doc_count} / {total_docs} documents."
+                    ),
+                )
+        finally:
+            loop.close()
+
+        # the retrievers reload the graph on their next question
+        bump_graph_version(input_path)
+        graph_engines.invalidate(graph_id)
 
         yield Document(
             channel="debug",
@@ -423,12 +465,24 @@ class NanoGraphRAGRetrieverPipeline(BaseFileIndexRetriever):
         _, input_path = prepare_graph_index_path(graph_id)
         input_path.mkdir(parents=True, exist_ok=True)
 
-        llm_func, embedding_func, _, _ = get_default_models_wrapper()
-        graphrag_func = build_graphrag(
+        (
+            llm_func,
+            embedding_func,
+            default_llm,
+            default_embedding,
+        ) = get_default_models_wrapper()
+        graphrag_func = graph_engines.get(
+            graph_id,
             input_path,
-            llm_func=llm_func,
-            embedding_func=embedding_func,
+            models=(default_llm, default_embedding),
+            build=lambda: build_graphrag(
+                input_path,
+                llm_func=llm_func,
+                embedding_func=embedding_func,
+            ),
         )
+        from nano_graphrag import QueryParam
+
         print("search_type", self.search_type)
         query_params = QueryParam(mode=self.search_type, only_need_context=True)
 
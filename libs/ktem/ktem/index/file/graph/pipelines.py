@@ -6,8 +6,6 @@ from shutil import rmtree
 from typing import Generator
 from uuid import uuid4
 
-import pandas as pd
-import tiktoken
 import yaml
 from decouple import config
 from ktem.db.models import engine
@@ -19,34 +17,14 @@ from kotaemon.base import Document, Param, RetrievedDocument
 from ..pipelines import BaseFileIndexRetriever, IndexDocumentPipeline, IndexPipeline
 from .visualize import create_knowledge_graph, visualize_graph
 
-try:
-    from graphrag.query.context_builder.entity_extraction import EntityVectorStoreKey
-    from graphrag.query.indexer_adapters import (
-        read_indexer_entities,
-        read_indexer_relationships,
-        read_indexer_reports,
-        read_indexer_text_units,
-    )
-    from graphrag.query.input.loaders.dfs import store_entity_semantic_embeddings
-    from graphrag.query.llm.oai.embedding import OpenAIEmbedding
-    from graphrag.query.llm.oai.typing import OpenaiApiType
-    from graphrag.query.structured_search.local_search.mixed_context import (
-        LocalSearchMixedContext,
-    )
-    from graphrag.vector_stores.lancedb import LanceDBVectorStore
-except ImportError:
-    print(
-        (
-            "GraphRAG dependencies not installed. "
-            "Try `pip install graphrag future` to install. "
-            "GraphRAG retriever pipeline will not work properly."
-        )
-    )
-
-
 filestorage_path = Path(settings.KH_FILESTORAGE_PATH) / "graphrag"
 filestorage_path.mkdir(parents=True, exist_ok=True)
 
+GRAPHRAG_NOT_INSTALLED_MESSAGE = (
+    "GraphRAG dependencies not installed. "
+    "Try `pip install graphrag future` to install. "
+    "GraphRAG retriever pipeline will not work properly."
+)
 GRAPHRAG_KEY_MISSING_MESSAGE = (
     "GRAPHRAG_API_KEY is not set. Please set it to use the GraphRAG retriever pipeline."
 )
@@ -187,6 +165,32 @@ class GraphRAGRetrieverPipeline(BaseFileIndexRetriever):
         }
 
     def _build_graph_search(self):
+        # graphrag, pandas and tiktoken are only imported when searching the graph
+        import pandas as pd
+        import tiktoken
+
+        try:
+            from graphrag.query.context_builder.entity_extraction import (
+                EntityVectorStoreKey,
+            )
+            from graphrag.query.indexer_adapters import (
+                read_indexer_entities,
+                read_indexer_relationships,
+                read_indexer_reports,
+                read_indexer_text_units,
+            )
+            from graphrag.query.input.loaders.dfs import (
+                store_entity_semantic_embeddings,
+            )
+            from graphrag.query.llm.oai.embedding import OpenAIEmbedding
+            from graphrag.query.llm.oai.typing import OpenaiApiType
+            from graphrag.query.structured_search.local_search.mixed_context import (
+                LocalSearchMixedContext,
+            )
+            from graphrag.vector_stores.lancedb import LanceDBVectorStore
+        except ImportError:
+            raise ImportError(GRAPHRAG_NOT_INSTALLED_MESSAGE)
+
         assert (
             len(self.file_ids) <= 1
         ), "GraphRAG retriever only supports one file_id at a time"
@@ -363,6 +367,10 @@ class GraphRAGRetrieverPipeline(BaseFileIndexRetriever):
 
         context_builder = self._build_graph_search()
 
+        from graphrag.query.context_builder.entity_extraction import (
+            EntityVectorStoreKey,
+        )
+
         local_context_params = {
             "text_unit_prop": 0.5,
             "community_prop": 0.1,
@@ -1,39 +1,95 @@
-import networkx as nx
-import plotly.graph_objects as go
-from plotly.io import to_json
+# networkx and plotly are imported on first use, not when the graph index is loaded
+import hashlib
+import threading
+from collections import OrderedDict
 
+import numpy as np
+from decouple import config
 
-def create_knowledge_graph(df):
+# the nodes plotted, the other nodes have a lower rank (degree in the relations)
+MAX_NODES = config("KH_GRAPH_PLOT_MAX_NODES", default=100, cast=int)
+LAYOUT_ITERATIONS = 50
+LAYOUT_CACHE_SIZE = 32
+
+_layouts: OrderedDict[str, dict] = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+def create_knowledge_graph(df, max_nodes: int | None = MAX_NODES):
     """
     create nx Graph from DataFrame relations data
+
+    Only the relations between the `max_nodes` nodes of highest rank are kept,
+    the rank of a node being its number of relations. None to keep every node.
     """
-    G = nx.Graph()
-    for _, row in df.iterrows():
-        source = row["source"]
-        target = row["target"]
-        attributes = {k: v for k, v in row.items() if k not in ["source", "target"]}
-        G.add_edge(source, target, **attributes)
+    import networkx as nx
+    import pandas as pd
+
+    if max_nodes is not None and len(df):
+        # the nodes in the order they appear in the relations
+        ends = pd.Series(df[["source", "target"]].to_numpy().ravel())
+        degrees = ends.value_counts(sort=False)
+        if len(degrees) > max_nodes:
+            # the stable sort keeps the first seen nodes among the equal ranks
+            kept = degrees.sort_values(ascending=False, kind="stable").index
+            kept = kept[:max_nodes]
+            df = df[df["source"].isin(kept) & df["target"].isin(kept)]
+
+    edge_attr = [col for col in df.columns if col not in ["source", "target"]]
+    return nx.from_pandas_edgelist(
+        df, "source", "target", edge_attr=edge_attr or None, create_using=nx.Graph
+    )
+
+
+def _layout_key(G) -> str:
+    """Hash the structure of the graph, as its layout only depends on it"""
+    nodes = "\x1f".join(map(str, G.nodes()))
+    edges = "\x1f".join(f"{u}\x1e{v}" for u, v in G.edges())
+    return hashlib.md5(f"{nodes}\x1d{edges}".encode("utf-8")).hexdigest()
 
-    return G
+
+def layout_graph(G) -> dict:
+    """Place the nodes of the graph, the layouts are cached by graph structure
+
+    The same relations are plotted again for the same question, or for the
+    questions about the same entities.
+    """
+    import networkx as nx
+
+    key = _layout_key(G)
+    with _layouts_lock:
+        if key in _layouts:
+            _layouts.move_to_end(key)
+            return _layouts[key]
+
+    # the seed makes the layout of a graph stable between the questions
+    pos = nx.spring_layout(G, dim=2, iterations=LAYOUT_ITERATIONS, seed=42)
+    with _layouts_lock:
+        _layouts[key] = pos
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return pos
 
 
 def visualize_graph(G):
-    pos = nx.spring_layout(G, dim=2)
-
-    edge_x = []
-    edge_y = []
-    edge_texts = nx.get_edge_attributes(G, "description")
-    to_display_edge_texts = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.append(x0)
-        edge_x.append(x1)
-        edge_x.append(None)
-        edge_y.append(y0)
-        edge_y.append(y1)
-        edge_y.append(None)
-        to_display_edge_texts.append(edge_texts[edge])
+    import plotly.graph_objects as go
+    from plotly.io import to_json
+
+    pos = layout_graph(G)
+    nodes = list(G.nodes())
+    index = {node: idx for idx, node in enumerate(nodes)}
+    # 3 decimals are enough on screen and keep the plot JSON small
+    xy = np.round(np.array([pos[node] for node in nodes]).reshape(-1, 2), 3)
+
+    # the edges are drawn as one line with a gap (NaN) between the segments
+    edges = [(index[u], index[v]) for u, v in G.edges()]
+    edges = np.array(edges, dtype=int).reshape(-1, 2)
+    gaps = np.full(len(edges), np.nan)
+    edge_x = np.column_stack([xy[edges[:, 0], 0], xy[edges[:, 1], 0], gaps]).ravel()
+    edge_y = np.column_stack([xy[edges[:, 0], 1], xy[edges[:, 1], 1], gaps]).ravel()
+    to_display_edge_texts = [
+        data.get("description", "") for _, _, data in G.edges(data=True)
+    ]
 
     edge_trace = go.Scatter(
         x=edge_x,
@@ -44,25 +100,14 @@ def visualize_graph(G):
         mode="lines",
     )
 
-    node_x = []
-    node_y = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-
-    node_adjacencies = []
-    node_text = []
-    node_size = []
-    for node_id, adjacencies in enumerate(G.adjacency()):
-        degree = len(adjacencies[1])
-        node_adjacencies.append(degree)
-        node_text.append(adjacencies[0])
-        node_size.append(15 if degree < 5 else (30 if degree < 10 else 60))
+    node_adjacencies = np.array([G.degree(node) for node in nodes], dtype=int)
+    node_size = np.select(
+        [node_adjacencies < 5, node_adjacencies < 10], [15, 30], default=60
+    )
 
     node_trace = go.Scatter(
-        x=node_x,
-        y=node_y,
+        x=xy[:, 0],
+        y=xy[:, 1],
         textfont=dict(
             family="Courier New, monospace",
             size=10,  # Set the font size here
@@ -70,7 +115,7 @@ def visualize_graph(G):
         textposition="top center",
         mode="markers+text",
         hoverinfo="text",
-        text=node_text,
+        text=nodes,
         marker=dict(
             showscale=True,
             # colorscale options
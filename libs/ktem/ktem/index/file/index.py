@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from pathlib import Path
 from typing import Any, Optional, Type
 
 from ktem.components import filestorage_path, get_docstore, get_vectorstore
@@ -8,6 +9,7 @@ from ktem.index.base import BaseIndex
 from sqlalchemy import JSON, Column, DateTime, Integer, String, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.schema import Index as SQLIndex
 from theflow.settings import settings as flowsettings
 from theflow.utils.modules import import_dotted_string
 from tzlocal import get_localzone
@@ -15,6 +17,7 @@ from tzlocal import get_localzone
 from kotaemon.storages import BaseDocumentStore, BaseVectorStore
 
 from .base import BaseFileIndexIndexing, BaseFileIndexRetriever
+from .listing import SORT_COLUMNS, drop_name_search, setup_name_search
 
 
 def generate_uuid():
@@ -59,6 +62,13 @@ class FileIndex(BaseIndex):
         """
         Base = declarative_base()
 
+        # the indices of the sorted file listing, per user for private indices
+        owner = ["user"] if self.config.get("private", False) else []
+        source_indices = tuple(
+            SQLIndex(f"ix_index__{self.id}__source_{sort}", *owner, sort, "id")
+            for sort in SORT_COLUMNS
+        )
+
         if self.config.get("private", False):
             Source = type(
                 "Source",
@@ -67,6 +77,7 @@ class FileIndex(BaseIndex):
                     "__tablename__": f"index__{self.id}__source",
                     "__table_args__": (
                         UniqueConstraint("name", "user", name="_name_user_uc"),
+                        *source_indices,
                     ),
                     "id": Column(
                         String,
@@ -78,7 +89,8 @@ class FileIndex(BaseIndex):
                     "path": Column(String),
                     "size": Column(Integer, default=0),
                     "date_created": Column(
-                        DateTime(timezone=True), default=datetime.now(get_localzone())
+                        DateTime(timezone=True),
+                        default=lambda: datetime.now(get_localzone()),
                     ),
                     "user": Column(String, default=""),
                     "note": Column(
@@ -93,6 +105,7 @@ class FileIndex(BaseIndex):
                 (Base,),
                 {
                     "__tablename__": f"index__{self.id}__source",
+                    "__table_args__": source_indices,
                     "id": Column(
                         String,
                         primary_key=True,
@@ -103,7 +116,8 @@ class FileIndex(BaseIndex):
                     "path": Column(String),
                     "size": Column(Integer, default=0),
                     "date_created": Column(
-                        DateTime(timezone=True), default=datetime.now(get_localzone())
+                        DateTime(timezone=True),
+                        default=lambda: datetime.now(get_localzone()),
                     ),
                     "user": Column(String, default=""),
                     "note": Column(
@@ -124,6 +138,26 @@ class FileIndex(BaseIndex):
                 "user": Column(String, default=""),
             },
         )
+        Chunk = type(
+            "ChunkTable",
+            (Base,),
+            {
+                "__tablename__": f"index__{self.id}__chunk",
+                "__table_args__": (
+                    SQLIndex(
+                        f"ix_index__{self.id}__chunk_order",
+                        "source_id",
+                        "page",
+                        "position",
+                    ),
+                ),
+                "id": Column(Integer, primary_key=True, autoincrement=True),
+                "source_id": Column(String),
+                "page": Column(Integer, nullable=True),
+                "position": Column(Integer),
+                "doc_id": Column(String),
+            },
+        )
         FileGroup = type(
             "FileGroupTable",
             (Base,),
@@ -153,13 +187,20 @@ class FileIndex(BaseIndex):
         self._vs: BaseVectorStore = get_vectorstore(f"index_{self.id}")
         self._docstore: BaseDocumentStore = get_docstore(f"index_{self.id}")
         self._fs_path = filestorage_path / f"index_{self.id}"
+        chunks_output_dir = getattr(flowsettings, "KH_CHUNKS_OUTPUT_DIR", None)
+        self._chunk_export_path = (
+            Path(chunks_output_dir) / f"index_{self.id}" if chunks_output_dir else None
+        )
         self._resources = {
             "Source": Source,
             "Index": Index,
+            "Chunk": Chunk,
             "FileGroup": FileGroup,
             "VectorStore": self._vs,
             "DocStore": self._docstore,
             "FileStoragePath": self._fs_path,
+            "ChunkExportPath": self._chunk_export_path,
+            "NameSearch": False,
         }
 
     def _setup_indexing_cls(self):
@@ -329,6 +370,7 @@ class FileIndex(BaseIndex):
         self._resources["Source"].metadata.create_all(engine)  # type: ignore
         self._resources["Index"].metadata.create_all(engine)  # type: ignore
         self._resources["FileGroup"].metadata.create_all(engine)  # type: ignore
+        self._resources["Chunk"].metadata.create_all(engine)  # type: ignore
         self._fs_path.mkdir(parents=True, exist_ok=True)
 
     def on_delete(self):
@@ -339,6 +381,8 @@ class FileIndex(BaseIndex):
         self._resources["Source"].__table__.drop(engine)  # type: ignore
         self._resources["Index"].__table__.drop(engine)  # type: ignore
         self._resources["FileGroup"].__table__.drop(engine)  # type: ignore
+        self._resources["Chunk"].__table__.drop(engine)  # type: ignore
+        drop_name_search(engine, self._resources["Source"])
         self._vs.drop()
         self._docstore.drop()
         shutil.rmtree(self._fs_path)
@@ -346,11 +390,31 @@ class FileIndex(BaseIndex):
     def on_start(self):
         """Setup the classes and hooks"""
         self._setup_resources()
+        # the chunk table and the listing indices are missing from the indices
+        # created before them
+        self._resources["Chunk"].__table__.create(engine, checkfirst=True)
+        for source_index in self._resources["Source"].__table__.indexes:
+            source_index.create(engine, checkfirst=True)
+        self._resources["NameSearch"] = setup_name_search(
+            engine, self._resources["Source"]
+        )
         self._setup_indexing_cls()
         self._setup_retriever_cls()
         self._setup_file_index_ui_cls()
         self._setup_file_selector_ui_cls()
 
+        if getattr(flowsettings, "KH_DOCLING_PRELOAD", False):
+            self._preload_docling_converters()
+
+    def _preload_docling_converters(self):
+        """Load the Docling models in background so the first file does not
+        pay for it"""
+        import threading
+
+        from kotaemon.loaders.docling_loader import preload_docling_converters
+
+        threading.Thread(target=preload_docling_converters, daemon=True).start()
+
     def get_selector_component_ui(self):
         if self._selector_ui is None:
             self._selector_ui = self._selector_ui_cls(self._app, self)
@@ -449,9 +513,11 @@ class FileIndex(BaseIndex):
         obj = self._indexing_pipeline_cls.get_pipeline(stripped_settings, self.config)
         obj.Source = self._resources["Source"]
         obj.Index = self._resources["Index"]
+        obj.Chunk = self._resources["Chunk"]
         obj.VS = self._vs
         obj.DS = self._docstore
         obj.FSPath = self._fs_path
+        obj.ChunkExportPath = self._chunk_export_path
         obj.user_id = user_id
         obj.private = self.config.get("private", False)
         obj.chunk_size = self.config.get("chunk_size", 0)
@@ -486,3 +552,15 @@ class FileIndex(BaseIndex):
             retrievers.append(obj)
 
         return retrievers
+
+    def get_retriever_pipelines_key(
+        self, settings: dict, user_id: int, selected: Any = None
+    ) -> Any:
+        prefix = f"index.options.{self.id}."
+        stripped_settings = {
+            key: value for key, value in settings.items() if key.startswith(prefix)
+        }
+        # changes when files are added or deleted, so that they are searched,
+        # without listing all the files of the index
+        selection_key = self._selector_ui.get_selection_key(selected)
+        return stripped_settings, user_id, selection_key
@@ -0,0 +1,275 @@
+"""List the files of an index one page at a time
+
+The files are listed with keyset pagination: a page is fetched after the sort
+value and id of the last file of the previous page, which the database finds
+with the indices of the `Source` table, whatever the page. The names are searched
+with a SQLite FTS5 trigram index when available, kept in sync with the `Source`
+table by triggers, otherwise with a `LIKE` scan.
+"""
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, column, func, or_, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+# the columns the files can be sorted by
+SORT_COLUMNS = ("date_created", "name", "size")
+# the trigram index only matches the patterns of 3 characters or more
+MIN_TRIGRAM_LENGTH = 3
+
+
+def name_search_table(Source) -> str:
+    return f"{Source.__tablename__}_name_fts"
+
+
+def setup_name_search(engine, Source) -> bool:
+    """Create the full-text index of the file names, if the database supports it
+
+    Called when the index starts, it also rebuilds the full-text index.
+
+    Returns:
+        whether the names can be searched with the index
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    fts = name_search_table(Source)
+    source = Source.__tablename__
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+                {"n": fts},
+            ).first()
+            if not exists:
+                conn.execute(
+                    text(
+                        f"CREATE VIRTUAL TABLE {fts} USING "
+                        "fts5(source_id UNINDEXED, name, tokenize='trigram')"
+                    )
+                )
+            # the rows of the index share the rowid of their file, which a VACUUM
+            # may renumber, so the index is rebuilt at each start
+            conn.execute(text(f"DELETE FROM {fts}"))
+            conn.execute(
+                text(
+                    f"INSERT INTO {fts}(rowid, source_id, name) "
+                    f"SELECT rowid, id, name FROM {source}"
+                )
+            )
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON "
+                    f"{source} BEGIN INSERT INTO {fts}(rowid, source_id, name) "
+                    "VALUES (new.rowid, new.id, new.name); END"
+                )
+            )
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON "
+                    f"{source} BEGIN DELETE FROM {fts} WHERE rowid = old.rowid; END"
+                )
+            )
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF name "
+                    f"ON {source} BEGIN UPDATE {fts} SET name = new.name "
+                    "WHERE rowid = new.rowid; END"
+                )
+            )
+    except OperationalError:
+        # SQLite built without FTS5, or older than the trigram tokenizer
+        return False
+    return True
+
+
+def drop_name_search(engine, Source):
+    """Drop the full-text index of the file names, the triggers go with `Source`"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {name_search_table(Source)}"))
+
+
+def filter_sources(
+    statement,
+    Source,
+    user_id: Optional[str] = None,
+    name_pattern: str = "",
+    name_search: bool = False,
+):
+    """Keep the files of `user_id`, if given, whose name contains `name_pattern`"""
+    if user_id is not None:
+        statement = statement.where(Source.user == user_id)
+    if not name_pattern:
+        return statement
+
+    if name_search and len(name_pattern) >= MIN_TRIGRAM_LENGTH:
+        fts_name = name_search_table(Source)
+        fts = table(fts_name, column("source_id"))
+        # quoted, the pattern is matched as a substring, case-insensitively
+        match = '"' + name_pattern.replace('"', '""') + '"'
+        return statement.where(
+            Source.id.in_(
+                select(fts.c.source_id).where(
+                    text(f"{fts_name} MATCH :name_match").bindparams(name_match=match)
+                )
+            )
+        )
+    return statement.where(Source.name.ilike(f"%{name_pattern}%"))
+
+
+def encode_cursor(source, sort: str) -> str:
+    value = getattr(source, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return json.dumps([value, source.id])
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    value, id_ = json.loads(cursor)
+    if sort == "date_created" and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, id_
+
+
+def list_sources(
+    session: Session,
+    Source,
+    user_id: Optional[str] = None,
+    name_pattern: str = "",
+    name_search: bool = False,
+    sort: str = "date_created",
+    descending: bool = True,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> tuple[list, Optional[str]]:
+    """Return a page of files, sorted by `sort` then by id
+
+    Args:
+        cursor: the cursor returned with the previous page, None for the first
+            page
+        limit: the number of files of the page
+
+    Returns:
+        the files of the page, and the cursor of the next page, None if it is the
+        last page
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort the files by {sort}")
+
+    sort_column = getattr(Source, sort)
+    statement = filter_sources(
+        select(Source), Source, user_id, name_pattern, name_search
+    )
+    if cursor is not None:
+        value, last_id = decode_cursor(cursor, sort)
+        if descending:
+            after = or_(
+                sort_column < value, and_(sort_column == value, Source.id < last_id)
+            )
+        else:
+            after = or_(
+                sort_column > value, and_(sort_column == value, Source.id > last_id)
+            )
+        statement = statement.where(after)
+
+    if descending:
+        statement = statement.order_by(sort_column.desc(), Source.id.desc())
+    else:
+        statement = statement.order_by(sort_column.asc(), Source.id.asc())
+
+    # one more file tells if there is a next page
+    sources = list(session.execute(statement.limit(limit + 1)).scalars())
+    next_cursor = None
+    if len(sources) > limit:
+        sources = sources[:limit]
+        next_cursor = encode_cursor(sources[-1], sort)
+    return sources, next_cursor
+
+
+def count_sources(
+    session: Session,
+    Source,
+    user_id: Optional[str] = None,
+    name_pattern: str = "",
+    name_search: bool = False,
+) -> int:
+    statement = filter_sources(
+        select(func.count()).select_from(Source),
+        Source,
+        user_id,
+        name_pattern,
+        name_search,
+    )
+    return session.execute(statement).scalar_one()
+
+
+def iter_source_ids(
+    session: Session,
+    Source,
+    user_id: Optional[str] = None,
+    name_pattern: str = "",
+    name_search: bool = False,
+    batch_size: int = 1000,
+):
+    """Yield the ids of the files in batches, without loading them all at once"""
+    statement = filter_sources(
+        select(Source.id), Source, user_id, name_pattern, name_search
+    ).order_by(Source.id)
+    last_id = None
+    while True:
+        batch_statement = statement
+        if last_id is not None:
+            batch_statement = batch_statement.where(Source.id > last_id)
+        ids = list(session.execute(batch_statement.limit(batch_size)).scalars())
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def get_source_names(session: Session, Source, ids: list[str]) -> dict[str, str]:
+    """Return the names of the files `ids`, by id"""
+    names = {}
+    ids = list(dict.fromkeys(ids))
+    # in batches, under the limit of parameters of the database
+    for start in range(0, len(ids), 500):
+        statement = select(Source.id, Source.name).where(
+            Source.id.in_(ids[start : start + 500])
+        )
+        names.update({id_: name for id_, name in session.execute(statement)})
+    return names
+
+
+def get_file_choices(
+    session: Session,
+    Source,
+    user_id: Optional[str] = None,
+    selected: Optional[list[str]] = None,
+    name_pattern: str = "",
+    name_search: bool = False,
+    limit: int = 50,
+) -> list[tuple[str, str]]:
+    """Return the files to choose from, as (name, id)
+
+    The choices are the `selected` files, then the `limit` most recent files whose
+    name contains `name_pattern`.
+    """
+    selected = selected or []
+    names = get_source_names(session, Source, selected)
+    choices = [(names[id_], id_) for id_ in selected if id_ in names]
+    sources, _ = list_sources(
+        session,
+        Source,
+        user_id=user_id,
+        name_pattern=name_pattern,
+        name_search=name_search,
+        limit=limit,
+    )
+    choices.extend(
+        (source.name, source.id) for source in sources if source.id not in names
+    )
+    return choices
@@ -7,7 +7,6 @@ import threading
 import time
 import warnings
 from collections import defaultdict
-from copy import deepcopy
 from functools import lru_cache
 from hashlib import sha256
 from pathlib import Path
@@ -31,23 +30,16 @@ from llama_index.core.vector_stores.types import VectorStoreQueryMode
 from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 from theflow.settings import settings
-from theflow.utils.modules import import_dotted_string
 
 from kotaemon.base import BaseComponent, Document, Node, Param, RetrievedDocument
 from kotaemon.embeddings import BaseEmbeddings
 from kotaemon.indices import VectorIndexing, VectorRetrieval
-from kotaemon.indices.ingests.files import (
-    KH_DEFAULT_FILE_EXTRACTORS,
-    adobe_reader,
-    azure_reader,
-    docling_reader,
-    unstructured,
-    web_reader,
-)
+from kotaemon.indices.ingests.files import KH_DEFAULT_FILE_EXTRACTORS, get_reader
 from kotaemon.indices.rankings import BaseReranking, LLMReranking, LLMTrulensScoring
 from kotaemon.indices.splitters import BaseSplitter, TokenSplitter
 
 from .base import BaseFileIndexIndexing, BaseFileIndexRetriever
+from .chunks import record_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -58,10 +50,8 @@ def dev_settings():
     file_extractors = {}
 
     if hasattr(settings, "FILE_INDEX_PIPELINE_FILE_EXTRACTORS"):
-        file_extractors = {
-            key: import_dotted_string(value, safe=False)()
-            for key, value in settings.FILE_INDEX_PIPELINE_FILE_EXTRACTORS.items()
-        }
+        # dotted paths, the readers are created on first use by `get_reader`
+        file_extractors = dict(settings.FILE_INDEX_PIPELINE_FILE_EXTRACTORS)
 
     chunk_size = None
     if hasattr(settings, "FILE_INDEX_PIPELINE_SPLITTER_CHUNK_SIZE"):
@@ -74,7 +64,15 @@ def dev_settings():
     return file_extractors, chunk_size, chunk_overlap
 
 
-_default_token_func = tiktoken.encoding_for_model("gpt-3.5-turbo").encode
+@lru_cache(maxsize=1)
+def _default_encoding():
+    # loading the encoding reads (or downloads) its BPE file, so it is not done
+    # on import but when the first file is indexed
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+
+def _default_token_func(text: str) -> list[int]:
+    return _default_encoding().encode(text)
 
 
 class DocumentRetrievalPipeline(BaseFileIndexRetriever):
@@ -334,19 +332,26 @@ class IndexPipeline(BaseComponent):
 
     Source = Param(help="The SQLAlchemy Source table")
     Index = Param(help="The SQLAlchemy Index table")
+    Chunk = Param(help="The SQLAlchemy Chunk table, the order of the chunks")
     VS = Param(help="The VectorStore")
     DS = Param(help="The DocStore")
     FSPath = Param(help="The file storage path")
+    ChunkExportPath = Param(
+        None, help="The directory of the chunk exports, None to not export them"
+    )
     user_id = Param(help="The user id")
     collection_name: str = "default"
     private: bool = False
     run_embedding_in_thread: bool = False
     embedding: BaseEmbeddings
 
-    @Node.auto(depends_on=["Source", "Index", "embedding"])
+    @Node.auto(depends_on=["Source", "Index", "embedding", "ChunkExportPath"])
     def vector_indexing(self) -> VectorIndexing:
         return VectorIndexing(
-            vector_store=self.VS, doc_store=self.DS, embedding=self.embedding
+            vector_store=self.VS,
+            doc_store=self.DS,
+            embedding=self.embedding,
+            cache_dir=self.ChunkExportPath,
         )
 
     def handle_docs(self, docs, file_id, file_name) -> Generator[Document, None, int]:
@@ -380,7 +385,10 @@ class IndexPipeline(BaseComponent):
             if page_label and page_label in page_label_to_thumbnail:
                 chunk.metadata["thumbnail_doc_id"] = page_label_to_thumbnail[page_label]
 
-        to_index_chunks = all_chunks + non_text_docs + thumbnail_docs
+        # the thumbnails are auxiliary documents: they are only looked up by
+        # `thumbnail_doc_id`, so they are kept in the docstore but not embedded
+        to_index_chunks = all_chunks + non_text_docs
+        auxiliary_docs = thumbnail_docs
 
         # add to doc store
         chunks = []
@@ -388,13 +396,18 @@ class IndexPipeline(BaseComponent):
         chunk_size = self.chunk_batch_size * 4
         for start_idx in range(0, len(to_index_chunks), chunk_size):
             chunks = to_index_chunks[start_idx : start_idx + chunk_size]
-            self.handle_chunks_docstore(chunks, file_id)
+            self.handle_chunks_docstore(chunks, file_id, position=start_idx)
             n_chunks += len(chunks)
             yield Document(
                 f" => [{file_name}] Processed {n_chunks} chunks",
                 channel="debug",
             )
 
+        for start_idx in range(0, len(auxiliary_docs), chunk_size):
+            self.handle_chunks_docstore(
+                auxiliary_docs[start_idx : start_idx + chunk_size], file_id
+            )
+
         def insert_chunks_to_vectorstore():
             chunks = []
             n_chunks = 0
@@ -421,8 +434,13 @@ class IndexPipeline(BaseComponent):
         print("indexing step took", time.time() - s_time)
         return n_chunks
 
-    def handle_chunks_docstore(self, chunks, file_id):
-        """Run chunks"""
+    def handle_chunks_docstore(self, chunks, file_id, position=None):
+        """Run chunks
+
+        Args:
+            position: the position of the first chunk in the file, to browse the
+                chunks in order. None for the chunks not browsed
+        """
         # run embedding, add to both vector store and doc store
         self.vector_indexing.add_to_docstore(chunks)
 
@@ -438,6 +456,8 @@ class IndexPipeline(BaseComponent):
                     )
                 )
             session.add_all(nodes)
+            if self.Chunk is not None and position is not None:
+                record_chunks(session, self.Chunk, file_id, chunks, start=position)
             session.commit()
 
     def handle_chunks_vectorstore(self, chunks, file_id):
@@ -579,20 +599,28 @@ class IndexPipeline(BaseComponent):
             session.execute(delete(self.Source).where(self.Source.id == file_id))
             vs_ids, ds_ids = [], []
             index = session.execute(
-                select(self.Index).where(self.Index.source_id == file_id)
+                select(self.Index.relation_type, self.Index.target_id).where(
+                    self.Index.source_id == file_id
+                )
             ).all()
-            for each in index:
-                if each[0].relation_type == "vector":
-                    vs_ids.append(each[0].target_id)
-                elif each[0].relation_type == "document":
-                    ds_ids.append(each[0].target_id)
-                session.delete(each[0])
+            for relation_type, target_id in index:
+                if relation_type == "vector":
+                    vs_ids.append(target_id)
+                elif relation_type == "document":
+                    ds_ids.append(target_id)
+            session.execute(delete(self.Index).where(self.Index.source_id == file_id))
+            if self.Chunk is not None:
+                session.execute(
+                    delete(self.Chunk).where(self.Chunk.source_id == file_id)
+                )
             session.commit()
 
+        # a single bulk delete per store for all the chunks of the file
         if vs_ids and self.VS:
             self.VS.delete(vs_ids)
         if ds_ids:
             self.DS.delete(ds_ids)
+        self.vector_indexing.remove_chunk_file(file_id)
 
     def run(
         self, file_path: str | Path, reindex: bool, **kwargs
@@ -672,14 +700,14 @@ class IndexDocumentPipeline(BaseFileIndexIndexing):
 
     @Param.auto(depends_on="reader_mode")
     def readers(self):
-        readers = deepcopy(KH_DEFAULT_FILE_EXTRACTORS)
+        readers = KH_DEFAULT_FILE_EXTRACTORS.copy()
         print("reader_mode", self.reader_mode)
         if self.reader_mode == "adobe":
-            readers[".pdf"] = adobe_reader
+            readers[".pdf"] = "adobe"
         elif self.reader_mode == "azure-di":
-            readers[".pdf"] = azure_reader
+            readers[".pdf"] = "azure-di"
         elif self.reader_mode == "docling":
-            readers[".pdf"] = docling_reader
+            readers[".pdf"] = "docling-vlm"
 
         dev_readers, _, _ = dev_settings()
         readers.update(dev_readers)
@@ -725,6 +753,54 @@ class IndexDocumentPipeline(BaseFileIndexIndexing):
             file_path.startswith("http://") or file_path.startswith("https://")
         )
 
+    def get_reader(self, ext: str) -> BaseReader:
+        """Get the reader of a file extension, created on first use"""
+        if ext in self.readers:
+            return self.readers[ext]
+        return get_reader("unstructured")
+
+    def _prefetch_readers(
+        self, file_paths: list[str | Path], method: str
+    ) -> list[tuple[BaseReader, list[Path]]]:
+        """Group the local files by their reader, for readers having `method`"""
+        readers: dict[int, BaseReader] = {}
+        reader_files: dict[int, list[Path]] = defaultdict(list)
+        for file_path in file_paths:
+            if self.is_url(file_path):
+                continue
+            file_path = Path(file_path)
+            reader = self.get_reader(file_path.suffix.lower())
+            if hasattr(reader, method):
+                readers[id(reader)] = reader
+                reader_files[id(reader)].append(file_path)
+
+        return [
+            (readers[reader_id], paths) for reader_id, paths in reader_files.items()
+        ]
+
+    def prefetch(self, file_paths: list[str | Path]):
+        """Let the readers that support it start converting the files ahead
+
+        E.g. `DoclingReader` converts several files in parallel in its
+        multi-process mode.
+        """
+        for reader, paths in self._prefetch_readers(file_paths, "prefetch"):
+            try:
+                reader.prefetch(paths)
+            except Exception as e:
+                logger.exception(e)
+
+    def discard_prefetched(self, file_paths: list[str | Path]):
+        """Drop the prefetched results that were not consumed
+
+        E.g. when a file is skipped because it is already indexed.
+        """
+        for reader, paths in self._prefetch_readers(file_paths, "discard_prefetched"):
+            try:
+                reader.discard_prefetched(paths)
+            except Exception as e:
+                logger.exception(e)
+
     def route(self, file_path: str | Path) -> IndexPipeline:
         """Decide the pipeline based on the file type
 
@@ -738,11 +814,11 @@ class IndexDocumentPipeline(BaseFileIndexIndexing):
 
         # check if file_path is a URL
         if self.is_url(file_path):
-            reader = web_reader
+            reader = get_reader("web")
         else:
             assert isinstance(file_path, Path)
             ext = file_path.suffix.lower()
-            reader = self.readers.get(ext, unstructured)
+            reader = self.get_reader(ext)
             if reader is None:
                 raise NotImplementedError(
                     f"No supported pipeline to index {file_path.name}. Please specify "
@@ -763,9 +839,11 @@ class IndexDocumentPipeline(BaseFileIndexIndexing):
             run_embedding_in_thread=self.run_embedding_in_thread,
             Source=self.Source,
             Index=self.Index,
+            Chunk=self.Chunk,
             VS=self.VS,
             DS=self.DS,
             FSPath=self.FSPath,
+            ChunkExportPath=self.ChunkExportPath,
             user_id=self.user_id,
             private=self.private,
             embedding=self.embedding,
@@ -791,47 +869,55 @@ class IndexDocumentPipeline(BaseFileIndexIndexing):
         errors: list[str | None] = []
         all_docs = []
 
-        n_files = len(file_paths)
-        for idx, file_path in enumerate(file_paths):
-            if self.is_url(file_path):
-                file_name = file_path
-            else:
-                file_path = Path(file_path)
-                file_name = file_path.name
+        prefetch = len(file_paths) > 1
+        if prefetch:
+            self.prefetch(file_paths)
 
-            yield Document(
-                content=f"Indexing [{idx + 1}/{n_files}]: {file_name}",
-                channel="debug",
-            )
+        try:
+            n_files = len(file_paths)
+            for idx, file_path in enumerate(file_paths):
+                if self.is_url(file_path):
+                    file_name = file_path
+                else:
+                    file_path = Path(file_path)
+                    file_name = file_path.name
 
-            try:
-                pipeline = self.route(file_path)
-                file_id, docs = yield from pipeline.stream(
-                    file_path, reindex=reindex, **kwargs
-                )
-                all_docs.extend(docs)
-                file_ids.append(file_id)
-                errors.append(None)
-                yield Document(
-                    content={
-                        "file_path": file_path,
-                        "file_name": file_name,
-                        "status": "success",
-                    },
-                    channel="index",
-                )
-            except Exception as e:
-                logger.exception(e)
-                file_ids.append(None)
-                errors.append(str(e))
                 yield Document(
-                    content={
-                        "file_path": file_path,
-                        "file_name": file_name,
-                        "status": "failed",
-                        "message": str(e),
-                    },
-                    channel="index",
+                    content=f"Indexing [{idx + 1}/{n_files}]: {file_name}",
+                    channel="debug",
                 )
 
+                try:
+                    pipeline = self.route(file_path)
+                    file_id, docs = yield from pipeline.stream(
+                        file_path, reindex=reindex, **kwargs
+                    )
+                    all_docs.extend(docs)
+                    file_ids.append(file_id)
+                    errors.append(None)
+                    yield Document(
+                        content={
+                            "file_path": file_path,
+                            "file_name": file_name,
+                            "status": "success",
+                        },
+                        channel="index",
+                    )
+                except Exception as e:
+                    logger.exception(e)
+                    file_ids.append(None)
+                    errors.append(str(e))
+                    yield Document(
+                        content={
+                            "file_path": file_path,
+                            "file_name": file_name,
+                            "status": "failed",
+                            "message": str(e),
+                        },
+                        channel="index",
+                    )
+        finally:
+            if prefetch:
+                self.discard_prefetched(file_paths)
+
         return file_ids, errors, all_docs
@@ -1,5 +1,6 @@
 import html
 import json
+import math
 import os
 import shutil
 import tempfile
@@ -14,13 +15,23 @@ from gradio.data_classes import FileData
 from gradio.utils import NamedString
 from ktem.app import BasePage
 from ktem.db.engine import engine
-from ktem.utils.render import Render
-from sqlalchemy import select
+from ktem.utils.render import BASE_PATH, Render
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 from theflow.settings import settings as flowsettings
 
+from kotaemon.indices.chunk_export import chunk_exports, export_path, iter_exports
+
 from ...utils.commands import WEB_SEARCH_COMMAND
 from ...utils.rate_limit import check_rate_limit
+from .chunks import backfill_chunks, count_chunks, get_chunks, image_reference
+from .listing import (
+    count_sources,
+    get_file_choices,
+    get_source_names,
+    iter_source_ids,
+    list_sources,
+)
 from .utils import download_arxiv_pdf, is_arxiv_url
 
 KH_DEMO_MODE = getattr(flowsettings, "KH_DEMO_MODE", False)
@@ -28,6 +39,26 @@ KH_SSO_ENABLED = getattr(flowsettings, "KH_SSO_ENABLED", False)
 DOWNLOAD_MESSAGE = "Start download"
 MAX_FILENAME_LENGTH = 20
 MAX_FILE_COUNT = 200
+MAX_FILE_PAGE_SIZE = 500
+FILE_PAGE_SIZE = min(
+    max(getattr(flowsettings, "KH_FILE_LIST_PAGE_SIZE", 50), 1), MAX_FILE_PAGE_SIZE
+)
+# the files offered in the selection dropdowns, besides the selected ones
+MAX_FILE_CHOICES = 50
+# the sort of the file list: the column and whether it is descending
+FILE_SORTS = {
+    "Newest first": ("date_created", True),
+    "Oldest first": ("date_created", False),
+    "Name (A-Z)": ("name", False),
+    "Name (Z-A)": ("name", True),
+    "Largest first": ("size", True),
+}
+DEFAULT_FILE_SORT = "Newest first"
+MAX_CHUNK_PAGE_SIZE = 100
+CHUNK_PAGE_SIZE = min(
+    max(getattr(flowsettings, "KH_CHUNK_VIEWER_PAGE_SIZE", 20), 1),
+    MAX_CHUNK_PAGE_SIZE,
+)
 
 chat_input_focus_js = """
 function() {
@@ -164,14 +195,22 @@ class FileIndexPage(BasePage):
         return ""
 
     def render_file_list(self):
-        self.filter = gr.Textbox(
-            value="",
-            label="Filter by name:",
-            info=(
-                "(1) Case-insensitive. "
-                "(2) Search with empty string to show all files."
-            ),
-        )
+        with gr.Row():
+            self.filter = gr.Textbox(
+                value="",
+                label="Filter by name:",
+                info=(
+                    "(1) Case-insensitive. "
+                    "(2) Search with empty string to show all files."
+                ),
+                scale=3,
+            )
+            self.file_list_sort = gr.Dropdown(
+                label="Sort by:",
+                choices=list(FILE_SORTS),
+                value=DEFAULT_FILE_SORT,
+                scale=1,
+            )
         self.file_list_state = gr.State(value=None)
         self.file_list = gr.DataFrame(
             headers=[
@@ -187,6 +226,12 @@ class FileIndexPage(BasePage):
             wrap=False,
             elem_id="file_list_view",
         )
+        with gr.Row():
+            self.file_list_prev_button = gr.Button(
+                "Previous", size="sm", interactive=False
+            )
+            self.file_list_info = gr.Markdown("")
+            self.file_list_next_button = gr.Button("Next", size="sm", interactive=False)
 
         with gr.Row():
 
@@ -214,6 +259,11 @@ class FileIndexPage(BasePage):
             with gr.Column(scale=2):
                 self.selected_panel = gr.Markdown(self.selected_panel_false)
 
+        with gr.Row(visible=False) as self.chunks_pager:
+            self.chunks_page = gr.State(value=0)
+            self.chunks_prev_button = gr.Button("Previous", size="sm")
+            self.chunks_page_info = gr.Markdown("")
+            self.chunks_next_button = gr.Button("Next", size="sm")
         self.chunks = gr.HTML(visible=False)
 
         with gr.Accordion("Advance options", open=False):
@@ -276,6 +326,7 @@ class FileIndexPage(BasePage):
             )
             self.group_files = gr.Dropdown(
                 label="Attached files",
+                info="Type to search the files by name",
                 multiselect=True,
             )
             self.group_save_button = gr.Button(
@@ -368,7 +419,7 @@ class FileIndexPage(BasePage):
                 name="onSignIn",
                 definition={
                     "fn": self.list_group,
-                    "inputs": [self._app.user_id, self.file_list_state],
+                    "inputs": [self._app.user_id],
                     "outputs": [self.group_list_state, self.group_list],
                     "show_progress": "hidden",
                 },
@@ -392,88 +443,141 @@ class FileIndexPage(BasePage):
                 },
             )
 
-    def file_selected(self, file_id):
-        chunks = []
-        if file_id is not None:
-            # get the chunks
+    def render_chunks_page(self, file_id, page: int) -> tuple[str, int, int]:
+        """Render a page of the chunks of a file
 
-            Index = self._index._resources["Index"]
-            with Session(engine) as session:
-                matches = session.execute(
-                    select(Index).where(
-                        Index.source_id == file_id,
-                        Index.relation_type == "document",
-                    )
+        Only the chunks of the page are read from the docstore, and their images
+        are referenced by URL, loaded when scrolled into view.
+
+        Returns:
+            the HTML of the chunks, the page rendered, the number of pages
+        """
+        Chunk = self._index._resources["Chunk"]
+        with Session(engine) as session:
+            n_chunks = count_chunks(session, Chunk, file_id)
+            if not n_chunks:
+                n_chunks = backfill_chunks(
+                    session,
+                    Chunk,
+                    self._index._resources["Index"],
+                    self._index._docstore,
+                    file_id,
                 )
-                doc_ids = [doc.target_id for (doc,) in matches]
-                docs = self._index._docstore.get(doc_ids)
-                docs = sorted(
-                    docs, key=lambda x: x.metadata.get("page_label", float("inf"))
+
+            n_pages = max(math.ceil(n_chunks / CHUNK_PAGE_SIZE), 1)
+            page = min(max(page, 0), n_pages - 1)
+            offset = page * CHUNK_PAGE_SIZE
+            docs = get_chunks(
+                session,
+                Chunk,
+                self._index._docstore,
+                file_id,
+                offset=offset,
+                limit=CHUNK_PAGE_SIZE,
+            )
+
+        image_dir = os.path.join(
+            os.environ.get("GRADIO_TEMP_DIR", tempfile.gettempdir()), "chunk_images"
+        )
+        chunks = []
+        for idx, doc in enumerate(docs, start=offset):
+            title = html.escape(
+                f"{doc.text[:50]}..." if len(doc.text) > 50 else doc.text
+            )
+            doc_type = doc.metadata.get("type", "text")
+            content = ""
+            if doc_type == "text":
+                content = html.escape(doc.text)
+            elif doc_type == "table":
+                content = Render.table(doc.text)
+            elif doc_type == "image":
+                url = doc.metadata.get("image_origin", "")
+                image_path = image_reference(doc.doc_id, url, image_dir)
+                if image_path is not None:
+                    url = f"{BASE_PATH}/file={image_path}"
+                content = Render.image(url=url, text=doc.text, lazy=True)
+
+            header_prefix = f"[{idx+1}/{n_chunks}]"
+            if doc.metadata.get("page_label"):
+                header_prefix += f" [Page {doc.metadata['page_label']}]"
+
+            chunks.append(
+                Render.collapsible(
+                    header=f"{header_prefix} {title}",
+                    content=content,
                 )
+            )
 
-                for idx, doc in enumerate(docs):
-                    title = html.escape(
-                        f"{doc.text[:50]}..." if len(doc.text) > 50 else doc.text
-                    )
-                    doc_type = doc.metadata.get("type", "text")
-                    content = ""
-                    if doc_type == "text":
-                        content = html.escape(doc.text)
-                    elif doc_type == "table":
-                        content = Render.table(doc.text)
-                    elif doc_type == "image":
-                        content = Render.image(
-                            url=doc.metadata.get("image_origin", ""), text=doc.text
-                        )
+        return "".join(chunks), page, n_pages
 
-                    header_prefix = f"[{idx+1}/{len(docs)}]"
-                    if doc.metadata.get("page_label"):
-                        header_prefix += f" [Page {doc.metadata['page_label']}]"
+    def show_chunks(self, file_id, page: int):
+        if file_id is None:
+            return "", 0, ""
 
-                    chunks.append(
-                        Render.collapsible(
-                            header=f"{header_prefix} {title}",
-                            content=content,
-                        )
-                    )
+        chunks, page, n_pages = self.render_chunks_page(file_id, page)
+        return chunks, page, f"Page {page + 1} / {n_pages}"
+
+    def file_selected(self, file_id):
+        chunks, page, page_info = self.show_chunks(file_id, 0)
         return (
-            gr.update(value="".join(chunks), visible=file_id is not None),
+            gr.update(value=chunks, visible=file_id is not None),
+            page,
+            page_info,
+            gr.update(visible=file_id is not None),
             gr.update(visible=file_id is not None),
             gr.update(visible=file_id is not None),
             gr.update(visible=file_id is not None),
             gr.update(visible=file_id is not None),
         )
 
-    def delete_event(self, file_id):
-        file_name = ""
+    def delete_files(self, file_ids: list[str]) -> list[str]:
+        """Delete the files, with their chunks in the docstore and vectorstore
+
+        The chunks of all the files are deleted with a single bulk delete per store.
+
+        Returns:
+            the names of the deleted files
+        """
+        Source = self._index._resources["Source"]
+        Index = self._index._resources["Index"]
+        Chunk = self._index._resources["Chunk"]
         with Session(engine) as session:
-            source = session.execute(
-                select(self._index._resources["Source"]).where(
-                    self._index._resources["Source"].id == file_id
-                )
-            ).first()
-            if source:
-                file_name = source[0].name
-                session.delete(source[0])
+            file_names = (
+                session.execute(select(Source.name).where(Source.id.in_(file_ids)))
+                .scalars()
+                .all()
+            )
+            session.execute(delete(Source).where(Source.id.in_(file_ids)))
 
             vs_ids, ds_ids = [], []
             index = session.execute(
-                select(self._index._resources["Index"]).where(
-                    self._index._resources["Index"].source_id == file_id
+                select(Index.relation_type, Index.target_id).where(
+                    Index.source_id.in_(file_ids)
                 )
             ).all()
-            for each in index:
-                if each[0].relation_type == "vector":
-                    vs_ids.append(each[0].target_id)
-                elif each[0].relation_type == "document":
-                    ds_ids.append(each[0].target_id)
-                session.delete(each[0])
+            for relation_type, target_id in index:
+                if relation_type == "vector":
+                    vs_ids.append(target_id)
+                elif relation_type == "document":
+                    ds_ids.append(target_id)
+            session.execute(delete(Index).where(Index.source_id.in_(file_ids)))
+            session.execute(delete(Chunk).where(Chunk.source_id.in_(file_ids)))
             session.commit()
 
         if vs_ids:
             self._index._vs.delete(vs_ids)
-        self._index._docstore.delete(ds_ids)
+        if ds_ids:
+            self._index._docstore.delete(ds_ids)
+        chunk_export_path = self._index._resources["ChunkExportPath"]
+        if chunk_export_path:
+            for file_id in file_ids:
+                chunk_exports.remove(chunk_export_path, file_id)
+
+        return list(file_names)
 
+    def delete_event(self, file_id):
+        file_names = self.delete_files([file_id])
+        file_name = file_names[0] if file_names else ""
         gr.Info(f"File {file_name} has been deleted")
 
         return None, self.selected_panel_false
@@ -493,23 +597,28 @@ class FileIndexPage(BasePage):
             ).first()
         if source:
             target_file_name = Path(source[0].name)
+        # the chunks of the file are in a single export, once written
+        chunk_exports.flush()
         zip_files = []
-        for file_name in os.listdir(flowsettings.KH_CHUNKS_OUTPUT_DIR):
-            if target_file_name.stem in file_name:
-                zip_files.append(
-                    os.path.join(flowsettings.KH_CHUNKS_OUTPUT_DIR, file_name)
-                )
+        chunk_export_path = self._index._resources["ChunkExportPath"]
+        if chunk_export_path:
+            chunk_export = export_path(chunk_export_path, file_id)
+            if chunk_export.exists():
+                zip_files.append((chunk_export, f"{target_file_name.name}.jsonl"))
         for file_name in os.listdir(flowsettings.KH_MARKDOWN_OUTPUT_DIR):
             if target_file_name.stem in file_name:
                 zip_files.append(
-                    os.path.join(flowsettings.KH_MARKDOWN_OUTPUT_DIR, file_name)
+                    (
+                        os.path.join(flowsettings.KH_MARKDOWN_OUTPUT_DIR, file_name),
+                        file_name,
+                    )
                 )
         zip_file_path = os.path.join(
             flowsettings.KH_ZIP_OUTPUT_DIR, target_file_name.stem
         )
         with zipfile.ZipFile(f"{zip_file_path}.zip", "w") as zipMe:
-            for file in zip_files:
-                zipMe.write(file, arcname=os.path.basename(file))
+            for file, arcname in zip_files:
+                zipMe.write(file, arcname=arcname)
 
         if is_zipped_state:
             new_button = gr.DownloadButton(label="Download", value=None)
@@ -520,7 +629,7 @@ class FileIndexPage(BasePage):
 
         return not is_zipped_state, new_button
 
-    def download_single_file_simple(self, is_zipped_state, file_html, file_id):
+    def download_single_file_simple(self, is_zipped_state, file_id):
         with Session(engine) as session:
             source = session.execute(
                 select(self._index._resources["Source"]).where(
@@ -534,8 +643,13 @@ class FileIndexPage(BasePage):
         output_file_path = os.path.join(
             flowsettings.KH_ZIP_OUTPUT_DIR, target_file_name.stem + ".html"
         )
+        # the chunks are written page by page, as shown in the chunk viewer
         with open(output_file_path, "w") as f:
-            f.write(file_html)
+            page, n_pages = 0, 1
+            while page < n_pages:
+                chunks, page, n_pages = self.render_chunks_page(file_id, page)
+                f.write(chunks)
+                page += 1
 
         if is_zipped_state:
             new_button = gr.DownloadButton(label="Download", value=None)
@@ -552,32 +666,78 @@ class FileIndexPage(BasePage):
         if self._index.config.get("private", False):
             raise gr.Error("This feature is not available for private collection.")
 
+        chunk_exports.flush()
         zip_files = []
-        for file_name in os.listdir(flowsettings.KH_CHUNKS_OUTPUT_DIR):
-            zip_files.append(os.path.join(flowsettings.KH_CHUNKS_OUTPUT_DIR, file_name))
+        chunk_export_path = self._index._resources["ChunkExportPath"]
+        if chunk_export_path:
+            # the exports are named by file id, they are archived by file name
+            exports = {
+                path.name[: -len(".jsonl")]: path
+                for path in iter_exports(chunk_export_path)
+            }
+            with Session(engine) as session:
+                names = get_source_names(
+                    session, self._index._resources["Source"], list(exports)
+                )
+            used_names = set()
+            for file_id, name in names.items():
+                arcname = f"{name}.jsonl"
+                if arcname in used_names:
+                    arcname = f"{name}.{file_id}.jsonl"
+                used_names.add(arcname)
+                zip_files.append((exports[file_id], arcname))
         for file_name in os.listdir(flowsettings.KH_MARKDOWN_OUTPUT_DIR):
             zip_files.append(
-                os.path.join(flowsettings.KH_MARKDOWN_OUTPUT_DIR, file_name)
+                (
+                    os.path.join(flowsettings.KH_MARKDOWN_OUTPUT_DIR, file_name),
+                    file_name,
+                )
             )
         zip_file_path = os.path.join(flowsettings.KH_ZIP_OUTPUT_DIR, "all")
         with zipfile.ZipFile(f"{zip_file_path}.zip", "w") as zipMe:
-            for file in zip_files:
-                arcname = Path(file)
-                zipMe.write(file, arcname=arcname.name)
+            for file, arcname in zip_files:
+                zipMe.write(file, arcname=arcname)
         return gr.DownloadButton(label=DOWNLOAD_MESSAGE, value=f"{zip_file_path}.zip")
 
-    def delete_all_files(self, file_list):
-        for file_id in file_list.id.values:
-            self.delete_event(file_id)
+    def delete_all_files(self, user_id, name_pattern=""):
+        """Delete the files matching the filter, in batches"""
+        Source = self._index._resources["Source"]
+        with Session(engine) as session:
+            batches = iter_source_ids(
+                session,
+                Source,
+                user_id=self._owner(user_id),
+                name_pattern=name_pattern,
+                name_search=self._index._resources["NameSearch"],
+            )
+            for file_ids in batches:
+                self.delete_files(file_ids)
+
+    def set_file_id_selector(self, selected_file_id, user_id):
+        selector = self._index.get_selector_component_ui()
+        return [
+            gr.update(
+                value=[selected_file_id],
+                choices=selector.get_options([selected_file_id], user_id),
+            ),
+            "select",
+            gr.Tabs(selected="chat-tab"),
+        ]
 
-    def set_file_id_selector(self, selected_file_id):
-        return [selected_file_id, "select", gr.Tabs(selected="chat-tab")]
+    def show_delete_all_confirm(self, user_id, name_pattern=""):
+        if user_id is None:
+            n_files = 0
+        else:
+            with Session(engine) as session:
+                n_files = count_sources(
+                    session,
+                    self._index._resources["Source"],
+                    user_id=self._owner(user_id),
+                    name_pattern=name_pattern,
+                    name_search=self._index._resources["NameSearch"],
+                )
 
-    def show_delete_all_confirm(self, file_list):
-        # when the list of files is empty it shows a single line with id equal to -
-        if len(file_list) == 0 or (
-            len(file_list) == 1 and file_list.id.values[0] == "-"
-        ):
+        if not n_files:
             gr.Info("No file to delete")
             return [
                 gr.update(visible=True),
@@ -651,7 +811,11 @@ class FileIndexPage(BasePage):
                         )
                         .then(
                             fn=self.list_file,
-                            inputs=[self._app.user_id, self.filter],
+                            inputs=[
+                                self._app.user_id,
+                                self.filter,
+                                self.file_list_sort,
+                            ],
                             outputs=[self.file_list_state, self.file_list],
                             concurrency_limit=20,
                         )
@@ -708,7 +872,7 @@ class FileIndexPage(BasePage):
                 if not KH_DEMO_MODE:
                     quickURLUploadedEvent = quickURLUploadedEvent.then(
                         fn=self.list_file,
-                        inputs=[self._app.user_id, self.filter],
+                        inputs=[self._app.user_id, self.filter, self.file_list_sort],
                         outputs=[self.file_list_state, self.file_list],
                         concurrency_limit=20,
                     )
@@ -744,7 +908,7 @@ class FileIndexPage(BasePage):
             )
             .then(
                 fn=self.list_file,
-                inputs=[self._app.user_id, self.filter],
+                inputs=[self._app.user_id, self.filter, self.file_list_sort],
                 outputs=[self.file_list_state, self.file_list],
             )
             .then(
@@ -752,6 +916,9 @@ class FileIndexPage(BasePage):
                 inputs=[self.selected_file_id],
                 outputs=[
                     self.chunks,
+                    self.chunks_page,
+                    self.chunks_page_info,
+                    self.chunks_pager,
                     self.deselect_button,
                     self.delete_button,
                     self.download_single_button,
@@ -773,6 +940,9 @@ class FileIndexPage(BasePage):
             inputs=[self.selected_file_id],
             outputs=[
                 self.chunks,
+                self.chunks_page,
+                self.chunks_page_info,
+                self.chunks_pager,
                 self.deselect_button,
                 self.delete_button,
                 self.download_single_button,
@@ -781,9 +951,22 @@ class FileIndexPage(BasePage):
             show_progress="hidden",
         )
 
+        self.chunks_prev_button.click(
+            fn=lambda file_id, page: self.show_chunks(file_id, page - 1),
+            inputs=[self.selected_file_id, self.chunks_page],
+            outputs=[self.chunks, self.chunks_page, self.chunks_page_info],
+            show_progress="hidden",
+        )
+        self.chunks_next_button.click(
+            fn=lambda file_id, page: self.show_chunks(file_id, page + 1),
+            inputs=[self.selected_file_id, self.chunks_page],
+            outputs=[self.chunks, self.chunks_page, self.chunks_page_info],
+            show_progress="hidden",
+        )
+
         self.chat_button.click(
             fn=self.set_file_id_selector,
-            inputs=[self.selected_file_id],
+            inputs=[self.selected_file_id, self._app.user_id],
             outputs=[
                 self._index.get_selector_component_ui().selector,
                 self._index.get_selector_component_ui().mode,
@@ -801,7 +984,7 @@ class FileIndexPage(BasePage):
 
         self.delete_all_button.click(
             self.show_delete_all_confirm,
-            [self.file_list],
+            [self._app.user_id, self.filter],
             [
                 self.delete_all_button,
                 self.delete_all_button_confirm,
@@ -824,12 +1007,12 @@ class FileIndexPage(BasePage):
 
         self.delete_all_button_confirm.click(
             fn=self.delete_all_files,
-            inputs=[self.file_list],
+            inputs=[self._app.user_id, self.filter],
             outputs=[],
             show_progress="hidden",
         ).then(
             fn=self.list_file,
-            inputs=[self._app.user_id, self.filter],
+            inputs=[self._app.user_id, self.filter, self.file_list_sort],
             outputs=[self.file_list_state, self.file_list],
         ).then(
             lambda: [
@@ -855,7 +1038,7 @@ class FileIndexPage(BasePage):
         else:
             self.download_single_button.click(
                 fn=self.download_single_file_simple,
-                inputs=[self.is_zipped_state, self.chunks, self.selected_file_id],
+                inputs=[self.is_zipped_state, self.selected_file_id],
                 outputs=[self.is_zipped_state, self.download_single_button],
                 show_progress="hidden",
             )
@@ -885,7 +1068,7 @@ class FileIndexPage(BasePage):
 
         uploadedEvent = onUploaded.then(
             fn=self.list_file,
-            inputs=[self._app.user_id, self.filter],
+            inputs=[self._app.user_id, self.filter, self.file_list_sort],
             outputs=[self.file_list_state, self.file_list],
             concurrency_limit=20,
         )
@@ -912,6 +1095,9 @@ class FileIndexPage(BasePage):
             inputs=[self.selected_file_id],
             outputs=[
                 self.chunks,
+                self.chunks_page,
+                self.chunks_page_info,
+                self.chunks_pager,
                 self.deselect_button,
                 self.delete_button,
                 self.download_single_button,
@@ -922,7 +1108,7 @@ class FileIndexPage(BasePage):
 
         self.group_list.select(
             fn=self.interact_group_list,
-            inputs=[self.group_list_state],
+            inputs=[self.group_list_state, self._app.user_id],
             outputs=[
                 self.group_label,
                 self.selected_group_id,
@@ -947,9 +1133,58 @@ class FileIndexPage(BasePage):
             ],
         )
 
+        self.file_list.change(
+            fn=self.describe_file_list,
+            inputs=[self.file_list_state],
+            outputs=[
+                self.file_list_info,
+                self.file_list_prev_button,
+                self.file_list_next_button,
+            ],
+            show_progress="hidden",
+        )
+        self.file_list_prev_button.click(
+            fn=lambda user_id, pattern, sort, state: self.list_file_page(
+                user_id, pattern, sort, state, -1
+            ),
+            inputs=[
+                self._app.user_id,
+                self.filter,
+                self.file_list_sort,
+                self.file_list_state,
+            ],
+            outputs=[self.file_list_state, self.file_list],
+            show_progress="hidden",
+        )
+        self.file_list_next_button.click(
+            fn=lambda user_id, pattern, sort, state: self.list_file_page(
+                user_id, pattern, sort, state, 1
+            ),
+            inputs=[
+                self._app.user_id,
+                self.filter,
+                self.file_list_sort,
+                self.file_list_state,
+            ],
+            outputs=[self.file_list_state, self.file_list],
+            show_progress="hidden",
+        )
+        self.file_list_sort.change(
+            fn=self.list_file,
+            inputs=[self._app.user_id, self.filter, self.file_list_sort],
+            outputs=[self.file_list_state, self.file_list],
+            show_progress="hidden",
+        )
+        self.group_files.key_up(
+            fn=self.search_group_files,
+            inputs=[self.group_files, self._app.user_id],
+            outputs=[self.group_files],
+            show_progress="hidden",
+        )
+
         self.filter.submit(
             fn=self.list_file,
-            inputs=[self._app.user_id, self.filter],
+            inputs=[self._app.user_id, self.filter, self.file_list_sort],
             outputs=[self.file_list_state, self.file_list],
             show_progress="hidden",
         )
@@ -1014,7 +1249,7 @@ class FileIndexPage(BasePage):
             )
             .then(
                 self.list_group,
-                inputs=[self._app.user_id, self.file_list_state],
+                inputs=[self._app.user_id],
                 outputs=[self.group_list_state, self.group_list],
             )
             .then(**onGroupClosedEvent)
@@ -1026,7 +1261,7 @@ class FileIndexPage(BasePage):
             )
             .then(
                 self.list_group,
-                inputs=[self._app.user_id, self.file_list_state],
+                inputs=[self._app.user_id],
                 outputs=[self.group_list_state, self.group_list],
             )
             .then(**onGroupClosedEvent)
@@ -1043,11 +1278,11 @@ class FileIndexPage(BasePage):
 
         self._app.app.load(
             self.list_file,
-            inputs=[self._app.user_id, self.filter],
+            inputs=[self._app.user_id, self.filter, self.file_list_sort],
             outputs=[self.file_list_state, self.file_list],
         ).then(
             self.list_group,
-            inputs=[self._app.user_id, self.file_list_state],
+            inputs=[self._app.user_id],
             outputs=[self.group_list_state, self.group_list],
         ).then(
             self.list_file_names,
@@ -1344,10 +1579,24 @@ class FileIndexPage(BasePage):
             num /= 1024.0
         return f"{num:.0f}Yi{suffix}"
 
-    def list_file(self, user_id, name_pattern=""):
+    def _owner(self, user_id):
+        """The user whose files are listed, None for all the users"""
+        return user_id if self._index.config.get("private", False) else None
+
+    def list_file(self, user_id, name_pattern="", sort=DEFAULT_FILE_SORT, cursors=None):
+        """List a page of the files, sorted and filtered by name
+
+        Args:
+            cursors: the cursors of the pages up to the one listed, None for the
+                first page
+
+        Returns:
+            the state of the file list, with the files of the page, and the page
+            as a DataFrame
+        """
         if user_id is None:
             # not signed in
-            return [], pd.DataFrame.from_records(
+            return {}, pd.DataFrame.from_records(
                 [
                     {
                         "id": "-",
@@ -1360,25 +1609,37 @@ class FileIndexPage(BasePage):
                 ]
             )
 
+        cursors = cursors or [None]
+        sort_column, descending = FILE_SORTS.get(sort, FILE_SORTS[DEFAULT_FILE_SORT])
         Source = self._index._resources["Source"]
+        filters = dict(
+            user_id=self._owner(user_id),
+            name_pattern=name_pattern,
+            name_search=self._index._resources["NameSearch"],
+        )
         with Session(engine) as session:
-            statement = select(Source)
-            if self._index.config.get("private", False):
-                statement = statement.where(Source.user == user_id)
-            if name_pattern:
-                statement = statement.where(Source.name.ilike(f"%{name_pattern}%"))
+            sources, next_cursor = list_sources(
+                session,
+                Source,
+                sort=sort_column,
+                descending=descending,
+                cursor=cursors[-1],
+                limit=FILE_PAGE_SIZE,
+                **filters,
+            )
+            n_files = count_sources(session, Source, **filters)
             results = [
                 {
-                    "id": each[0].id,
-                    "name": each[0].name,
-                    "size": self.format_size_human_readable(each[0].size),
+                    "id": source.id,
+                    "name": source.name,
+                    "size": self.format_size_human_readable(source.size),
                     "tokens": self.format_size_human_readable(
-                        each[0].note.get("tokens", "-"), suffix=""
+                        source.note.get("tokens", "-"), suffix=""
                     ),
-                    "loader": each[0].note.get("loader", "-"),
-                    "date_created": each[0].date_created.strftime("%Y-%m-%d %H:%M:%S"),
+                    "loader": source.note.get("loader", "-"),
+                    "date_created": source.date_created.strftime("%Y-%m-%d %H:%M:%S"),
                 }
-                for each in session.execute(statement).all()
+                for source in sources
             ]
 
         if results:
@@ -1397,23 +1658,65 @@ class FileIndexPage(BasePage):
                 ]
             )
 
-        return results, file_list
+        state = {
+            "files": results,
+            "cursors": cursors,
+            "next": next_cursor,
+            "total": n_files,
+        }
+        return state, file_list
+
+    def list_file_page(self, user_id, name_pattern, sort, file_list_state, step):
+        """List the page after (`step` 1) or before (`step` -1) the listed one"""
+        file_list_state = file_list_state or {}
+        cursors = file_list_state.get("cursors") or [None]
+        if step > 0 and file_list_state.get("next"):
+            cursors = cursors + [file_list_state["next"]]
+        elif step < 0:
+            cursors = cursors[:-1]
+        return self.list_file(user_id, name_pattern, sort, cursors)
+
+    def describe_file_list(self, file_list_state):
+        if not file_list_state or not file_list_state["files"]:
+            return "", gr.update(interactive=False), gr.update(interactive=False)
+
+        first = (len(file_list_state["cursors"]) - 1) * FILE_PAGE_SIZE + 1
+        last = first + len(file_list_state["files"]) - 1
+        return (
+            f"Files {first}-{last} of {file_list_state['total']}",
+            gr.update(interactive=len(file_list_state["cursors"]) > 1),
+            gr.update(interactive=file_list_state["next"] is not None),
+        )
 
     def list_file_names(self, file_list_state):
+        # the files of the listed page, the others are found by typing their name
         if file_list_state:
-            file_names = [(item["name"], item["id"]) for item in file_list_state]
+            file_names = [
+                (item["name"], item["id"]) for item in file_list_state["files"]
+            ]
         else:
             file_names = []
 
         return gr.update(choices=file_names)
 
-    def list_group(self, user_id, file_list):
-        # supply file_list to display the file names in the group
-        if file_list:
-            file_id_to_name = {item["id"]: item["name"] for item in file_list}
-        else:
-            file_id_to_name = {}
+    def search_group_files(self, group_files, user_id, key_up_data: gr.KeyUpData):
+        """Offer the files whose name contains the typed text"""
+        if user_id is None:
+            return gr.update()
+
+        with Session(engine) as session:
+            choices = get_file_choices(
+                session,
+                self._index._resources["Source"],
+                user_id=self._owner(user_id),
+                selected=group_files or [],
+                name_pattern=key_up_data.input_value,
+                name_search=self._index._resources["NameSearch"],
+                limit=MAX_FILE_CHOICES,
+            )
+        return gr.update(choices=choices)
 
+    def list_group(self, user_id):
         if user_id is None:
             # not signed in
             return [], pd.DataFrame.from_records(
@@ -1442,6 +1745,12 @@ class FileIndexPage(BasePage):
                 }
                 for each in session.execute(statement).all()
             ]
+            # the names of the files in the groups, to display them
+            file_id_to_name = get_source_names(
+                session,
+                self._index._resources["Source"],
+                [file_id for item in results for file_id in item["files"]],
+            )
 
         if results:
             formated_results = deepcopy(results)
@@ -1555,18 +1864,26 @@ class FileIndexPage(BasePage):
             name=list_files["name"][ev.index[0]]
         )
 
-    def interact_group_list(self, list_groups, ev: gr.SelectData):
+    def interact_group_list(self, list_groups, user_id, ev: gr.SelectData):
         selected_id = ev.index[0]
         if (not ev.value or ev.value == "-") and selected_id == 0:
             raise gr.Error("No group is selected")
 
         selected_item = list_groups[selected_id]
         selected_group_id = selected_item["id"]
+        with Session(engine) as session:
+            choices = get_file_choices(
+                session,
+                self._index._resources["Source"],
+                user_id=self._owner(user_id),
+                selected=selected_item["files"],
+                limit=MAX_FILE_CHOICES,
+            )
         return (
             "### Group Information",
             selected_group_id,
             selected_item["name"],
-            selected_item["files"],
+            gr.update(value=selected_item["files"], choices=choices),
         )
 
     def validate(self, files: list[str]):
@@ -1631,6 +1948,7 @@ class FileSelector(BasePage):
             container=False,
             interactive=True,
             visible=False,
+            info="Type to search the files by name",
         )
         self.selector_user_id = gr.State(value=user_id)
         self.selector_choices = gr.JSON(
@@ -1644,6 +1962,12 @@ class FileSelector(BasePage):
             inputs=[self.mode, self._app.user_id],
             outputs=[self.selector, self.selector_user_id],
         )
+        self.selector.key_up(
+            fn=self.search_files,
+            inputs=[self.selector, self._app.user_id],
+            outputs=[self.selector],
+            show_progress="hidden",
+        )
         # attach special event for the first index
         if self._index.id == 1:
             self.selector_choices.change(
@@ -1666,42 +1990,58 @@ class FileSelector(BasePage):
         elif mode == "select":
             return selected
 
+        Source = self._index._resources["Source"]
         file_ids = []
         with Session(engine) as session:
-            statement = select(self._index._resources["Source"].id)
-            if self._index.config.get("private", False):
-                statement = statement.where(
-                    self._index._resources["Source"].user == user_id
-                )
-            results = session.execute(statement).all()
-            for (id,) in results:
-                file_ids.append(id)
+            for batch in iter_source_ids(session, Source, user_id=self._owner(user_id)):
+                file_ids.extend(batch)
 
         return file_ids
 
-    def load_files(self, selected_files, user_id):
-        options: list = []
-        available_ids = []
-        if user_id is None:
-            # not signed in
-            return gr.update(value=selected_files, choices=options), options
+    def get_selection_key(self, components) -> tuple:
+        """Return a key of the selected files, that changes when they change
+
+        Unlike `get_selected_ids`, the files of the "all" mode are not listed:
+        they are summed up by their number and the date of the newest one.
+        """
+        mode, selected, user_id = components[0], components[1], components[2]
+        if user_id is None or mode == "disabled":
+            return ("disabled",)
+        elif mode == "select":
+            return ("select", sorted(map(str, selected or [])))
 
+        Source = self._index._resources["Source"]
+        owner = self._owner(user_id)
+        statement = select(func.count(), func.max(Source.date_created))
+        if owner is not None:
+            statement = statement.where(Source.user == owner)
         with Session(engine) as session:
-            # get file list from Source table
-            statement = select(self._index._resources["Source"])
-            if self._index.config.get("private", False):
-                statement = statement.where(
-                    self._index._resources["Source"].user == user_id
-                )
+            n_files, last_created = session.execute(statement).one()
 
-            if KH_DEMO_MODE:
-                # limit query by MAX_FILE_COUNT
-                statement = statement.limit(MAX_FILE_COUNT)
+        return ("all", owner, n_files, last_created)
 
-            results = session.execute(statement).all()
-            for result in results:
-                available_ids.append(result[0].id)
-                options.append((result[0].name, result[0].id))
+    def _owner(self, user_id):
+        """The user whose files are listed, None for all the users"""
+        return user_id if self._index.config.get("private", False) else None
+
+    def get_options(self, selected, user_id, name_pattern: str = "") -> list:
+        """Return the options of the selector
+
+        The options are the groups, the selected files, and the most recent files
+        whose name contains `name_pattern`, never all the files of the index.
+        """
+        selected_files = [each for each in selected or [] if not each.startswith("[")]
+        limit = MAX_FILE_COUNT if KH_DEMO_MODE else MAX_FILE_CHOICES
+        with Session(engine) as session:
+            options: list = get_file_choices(
+                session,
+                self._index._resources["Source"],
+                user_id=self._owner(user_id),
+                selected=selected_files,
+                name_pattern=name_pattern,
+                name_search=self._index._resources["NameSearch"],
+                limit=limit,
+            )
 
             # get group list from FileGroup table
             FileGroup = self._index._resources["FileGroup"]
@@ -1715,14 +2055,42 @@ class FileSelector(BasePage):
                     (f"group: '{item.name}'", json.dumps(item.data.get("files", [])))
                 )
 
+        return options
+
+    def get_ids_by_names(self, names: list[str], user_id) -> dict[str, str]:
+        """Return the ids of the files named `names`, by name"""
+        if user_id is None or not names:
+            return {}
+
+        Source = self._index._resources["Source"]
+        statement = select(Source.name, Source.id).where(Source.name.in_(names))
+        if self._index.config.get("private", False):
+            statement = statement.where(Source.user == user_id)
+        with Session(engine) as session:
+            return {name: id_ for name, id_ in session.execute(statement)}
+
+    def load_files(self, selected_files, user_id):
+        if user_id is None:
+            # not signed in
+            return gr.update(value=selected_files, choices=[]), []
+
+        options = self.get_options(selected_files, user_id)
         if selected_files:
-            available_ids_set = set(available_ids)
+            available_values = {value for _, value in options}
             selected_files = [
-                each for each in selected_files if each in available_ids_set
+                each for each in selected_files if each in available_values
             ]
 
         return gr.update(value=selected_files, choices=options), options
 
+    def search_files(self, selected_files, user_id, key_up_data: gr.KeyUpData):
+        """Offer the files whose name contains the typed text"""
+        if user_id is None:
+            return gr.update()
+
+        options = self.get_options(selected_files, user_id, key_up_data.input_value)
+        return gr.update(choices=options)
+
     def _on_app_created(self):
         self._app.app.load(
             self.load_files,
@@ -18,6 +18,7 @@ class LLMManager:
         self._info: dict[str, dict] = {}
         self._default: str = ""
         self._vendors: list[Type] = []
+        self._extra_vendors: list[str] = []
 
         if hasattr(flowsettings, "KH_LLMS"):
             for name, model in flowsettings.KH_LLMS.items():
@@ -74,8 +75,9 @@ class LLMManager:
             LlamaCppChat,
         ]
 
-        for extra_vendor in getattr(flowsettings, "KH_LLM_EXTRA_VENDORS", []):
-            self._vendors.append(import_dotted_string(extra_vendor, safe=False))
+        # the extra vendors can import their SDK with them, they are only imported
+        # when the vendors are listed
+        self._extra_vendors = list(getattr(flowsettings, "KH_LLM_EXTRA_VENDORS", []))
 
     def __getitem__(self, key: str) -> ChatLLM:
         """Get model by name"""
@@ -218,6 +220,9 @@ class LLMManager:
 
     def vendors(self) -> dict:
         """Return list of vendors"""
+        while self._extra_vendors:
+            extra_vendor = self._extra_vendors.pop(0)
+            self._vendors.append(import_dotted_string(extra_vendor, safe=False))
         return {vendor.__qualname__: vendor for vendor in self._vendors}
 
 
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import re
+import time
 from copy import deepcopy
 from typing import Optional
 
@@ -8,8 +9,11 @@ import gradio as gr
 from decouple import config
 from ktem.app import BasePage
 from ktem.components import reasonings
+from ktem.db.conversation import append_turns, migrate_conversation
 from ktem.db.models import Conversation, engine
+from ktem.embeddings.manager import embedding_models_manager
 from ktem.index.file.ui import File
+from ktem.llms.manager import llms
 from ktem.reasoning.prompt_optimization.mindmap import MINDMAP_HTML_EXPORT_TEMPLATE
 from ktem.reasoning.prompt_optimization.suggest_conversation_name import (
     SuggestConvNamePipeline,
@@ -17,7 +21,7 @@ from ktem.reasoning.prompt_optimization.suggest_conversation_name import (
 from ktem.reasoning.prompt_optimization.suggest_followup_chat import (
     SuggestFollowupQuesPipeline,
 )
-from plotly.io import from_json
+from ktem.rerankings.manager import reranking_models_manager
 from sqlmodel import Session, select
 from theflow.settings import settings as flowsettings
 from theflow.utils.modules import import_dotted_string
@@ -29,7 +33,9 @@ from kotaemon.indices.qa.utils import strip_think_tag
 from ...utils import SUPPORTED_LANGUAGE_MAP, get_file_names_regex, get_urls
 from ...utils.commands import WEB_SEARCH_COMMAND
 from ...utils.hf_papers import get_recommended_papers
+from ...utils.pipeline_pool import PipelinePool
 from ...utils.rate_limit import check_rate_limit
+from ...utils.streaming import DeltaStream
 from .chat_panel import ChatPanel
 from .chat_suggestion import ChatSuggestion
 from .common import STATE
@@ -41,6 +47,7 @@ from .report import ReportIssue
 KH_DEMO_MODE = getattr(flowsettings, "KH_DEMO_MODE", False)
 KH_SSO_ENABLED = getattr(flowsettings, "KH_SSO_ENABLED", False)
 KH_WEB_SEARCH_BACKEND = getattr(flowsettings, "KH_WEB_SEARCH_BACKEND", None)
+KH_CHAT_STREAM_INTERVAL = getattr(flowsettings, "KH_CHAT_STREAM_INTERVAL", 50)
 WebSearch = None
 if KH_WEB_SEARCH_BACKEND:
     try:
@@ -48,6 +55,19 @@ if KH_WEB_SEARCH_BACKEND:
     except (ImportError, AttributeError) as e:
         print(f"Error importing {KH_WEB_SEARCH_BACKEND}: {e}")
 
+# the pipelines built for the questions, reused by the next questions
+chat_pipelines = PipelinePool()
+
+
+def get_pipeline_models() -> tuple:
+    """The models of the pipelines, a new object after each change of the models"""
+    return (
+        llms.info(),
+        embedding_models_manager.info(),
+        reranking_models_manager.info(),
+    )
+
+
 REASONING_LIMITS = 2 if KH_DEMO_MODE else 10
 DEFAULT_SETTING = "(default)"
 INFO_PANEL_SCALES = {True: 8, False: 4}
@@ -221,6 +241,7 @@ class ChatPage(BasePage):
             self.state_plot_history = gr.State([])
             self.state_plot_panel = gr.State(None)
             self.first_selector_choices = gr.State(None)
+            self.first_selector_ui = None
 
             with gr.Column(scale=1, elem_id="conv-settings-panel") as self.conv_column:
                 self.chat_control = ConversationControl(self._app)
@@ -250,6 +271,7 @@ class ChatPage(BasePage):
                         # get the file selector choices for the first index
                         if index_id == 0:
                             self.first_selector_choices = index_ui.selector_choices
+                            self.first_selector_ui = index_ui
                             self.first_indexing_url_fn = None
 
                         if gr_index:
@@ -401,6 +423,8 @@ class ChatPage(BasePage):
 
     def _json_to_plot(self, json_dict: dict | None):
         if json_dict:
+            from plotly.io import from_json
+
             plot = from_json(json_dict)
             plot = gr.update(visible=True, value=plot)
         else:
@@ -917,6 +941,17 @@ class ChatPage(BasePage):
                 request=None,
             )
         elif file_names:
+            # the choices hold the recent files only, the others are looked up
+            missing_names = [
+                file_name
+                for file_name in file_names
+                if file_name not in first_selector_choices_map
+            ]
+            if missing_names and self.first_selector_ui is not None:
+                found = self.first_selector_ui.get_ids_by_names(missing_names, user_id)
+                first_selector_choices.extend(found.items())
+                first_selector_choices_map.update(found)
+
             for file_name in file_names:
                 file_id = first_selector_choices_map.get(file_name)
                 if file_id:
@@ -1090,7 +1125,8 @@ class ChatPage(BasePage):
             return
 
         # if not regen, then append the new message
-        if not state["app"].get("regen", False):
+        is_regen = state["app"].get("regen", False)
+        if not is_regen:
             retrival_history = retrival_history + [retrieval_msg]
             plot_history = plot_history + [plot_data]
         else:
@@ -1114,21 +1150,30 @@ class ChatPage(BasePage):
         with Session(engine) as session:
             statement = select(Conversation).where(Conversation.id == convo_id)
             result = session.exec(statement).one()
+            migrate_conversation(session, result)
 
             data_source = result.data_source
             old_selecteds = data_source.get("selected", {})
             is_owner = result.user == user_id
 
-            # Write down to db
+            # Write down to db, only the new turn, or the regenerated last turn,
+            # is written with the small data of the conversation
             result.data_source = {
+                **data_source,
                 "selected": selecteds_ if is_owner else old_selecteds,
-                "messages": messages,
-                "retrieval_messages": retrival_history,
-                "plot_history": plot_history,
                 "state": state,
                 "likes": deepcopy(data_source.get("likes", [])),
             }
-            session.add(result)
+            n_stored = data_source.get("n_messages", 0)
+            start = min(n_stored, len(messages) - 1 if is_regen else len(messages))
+            append_turns(
+                session,
+                result,
+                messages,
+                retrival_history,
+                plot_history,
+                start=max(start, 0),
+            )
             session.commit()
 
         return retrival_history, plot_history
@@ -1188,6 +1233,9 @@ class ChatPage(BasePage):
 
         Returns:
             - the pipeline objects
+            - the state of the reasoning pipeline
+            - the key and models to give the pipeline back to `chat_pipelines`
+                once the question is answered, None if it cannot be reused
         """
         # override reasoning_mode by temporary chat page state
         print(
@@ -1230,17 +1278,15 @@ class ChatPage(BasePage):
         if session_language not in (DEFAULT_SETTING, None):
             settings["reasoning.lang"] = session_language
 
-        # get retrievers
-        retrievers = []
-
-        if command_state == WEB_SEARCH_COMMAND:
-            # set retriever for web search
-            if not WebSearch:
-                raise ValueError("Web search back-end is not available.")
+        # prepare states
+        reasoning_state = {
+            "app": deepcopy(state["app"]),
+            "pipeline": deepcopy(state.get(reasoning_id, {})),
+        }
 
-            web_search = WebSearch()
-            retrievers.append(web_search)
-        else:
+        # get retrievers
+        index_selecteds = []
+        if command_state != WEB_SEARCH_COMMAND:
             for index in self._app.index_manager.indices:
                 index_selected = []
                 if isinstance(index.selector, int):
@@ -1248,20 +1294,54 @@ class ChatPage(BasePage):
                 if isinstance(index.selector, tuple):
                     for i in index.selector:
                         index_selected.append(selecteds[i])
-                iretrievers = index.get_retriever_pipelines(
-                    settings, user_id, index_selected
-                )
-                retrievers += iretrievers
+                index_selecteds.append((index, index_selected))
 
-        # prepare states
-        reasoning_state = {
-            "app": deepcopy(state["app"]),
-            "pipeline": deepcopy(state.get(reasoning_id, {})),
-        }
+        def build():
+            retrievers = []
 
-        pipeline = reasoning_cls.get_pipeline(settings, reasoning_state, retrievers)
+            if command_state == WEB_SEARCH_COMMAND:
+                # set retriever for web search
+                if not WebSearch:
+                    raise ValueError("Web search back-end is not available.")
 
-        return pipeline, reasoning_state
+                web_search = WebSearch()
+                retrievers.append(web_search)
+            else:
+                for index, index_selected in index_selecteds:
+                    iretrievers = index.get_retriever_pipelines(
+                        settings, user_id, index_selected
+                    )
+                    retrievers += iretrievers
+
+            return reasoning_cls.get_pipeline(settings, reasoning_state, retrievers)
+
+        # the pipeline is reused if built from the same settings, states and
+        # selections, unless an index does not tell what its retrievers depend on
+        retriever_keys = [
+            index.get_retriever_pipelines_key(settings, user_id, index_selected)
+            for index, index_selected in index_selecteds
+        ]
+        if any(key is None for key in retriever_keys):
+            pipeline_lease = None
+            start = time.perf_counter()
+            pipeline = build()
+            setup_time = time.perf_counter() - start
+        else:
+            pipeline_key = PipelinePool.make_key(
+                reasoning_mode,
+                settings,
+                reasoning_state,
+                command_state,
+                retriever_keys,
+            )
+            models = get_pipeline_models()
+            pipeline, setup_time = chat_pipelines.acquire(
+                pipeline_key, build, models=models
+            )
+            pipeline_lease = (pipeline_key, models)
+        print(f"Pipeline setup: {setup_time * 1000:.1f} ms")
+
+        return pipeline, reasoning_state, pipeline_lease
 
     def chat_fn(
         self,
@@ -1289,7 +1369,7 @@ class ChatPage(BasePage):
         queue: asyncio.Queue[Optional[dict]] = asyncio.Queue()
 
         # construct the pipeline
-        pipeline, reasoning_state = self.create_pipeline(
+        pipeline, reasoning_state, pipeline_lease = self.create_pipeline(
             settings,
             reasoning_type,
             llm_type,
@@ -1309,14 +1389,28 @@ class ChatPage(BasePage):
             flowsettings, "KH_CHAT_MSG_PLACEHOLDER", "Thinking ..."
         )
         print(msg_placeholder)
-        yield (
-            chat_history + [(chat_input, text or msg_placeholder)],
-            refs,
-            plot_gr,
-            plot,
-            chat_state,
-        )
 
+        # the tokens received between 2 updates are sent together, and the outputs
+        # that did not change are skipped
+        stream = DeltaStream(KH_CHAT_STREAM_INTERVAL / 1000, base=chat_history)
+
+        def update(answer: str):
+            changed = stream.changes(answer=answer, refs=refs, plot=plot)
+            return (
+                (
+                    chat_history + [(chat_input, answer)]
+                    if changed["answer"]
+                    else gr.update()
+                ),
+                refs if changed["refs"] else gr.update(),
+                plot_gr if changed["plot"] else gr.update(),
+                plot,
+                chat_state,
+            )
+
+        yield update(text or msg_placeholder)
+
+        pending = False
         try:
             for response in pipeline.stream(chat_input, conversation_id, chat_history):
 
@@ -1344,13 +1438,10 @@ class ChatPage(BasePage):
 
                 chat_state[pipeline.get_info()["id"]] = reasoning_state["pipeline"]
 
-                yield (
-                    chat_history + [(chat_input, text or msg_placeholder)],
-                    refs,
-                    plot_gr,
-                    plot,
-                    chat_state,
-                )
+                pending = True
+                if stream.due():
+                    pending = False
+                    yield update(text or msg_placeholder)
         except ValueError as e:
             print(e)
 
@@ -1359,13 +1450,15 @@ class ChatPage(BasePage):
                 flowsettings, "KH_CHAT_EMPTY_MSG_PLACEHOLDER", "(Sorry, I don't know)"
             )
             print(f"Generate nothing: {empty_msg}")
-            yield (
-                chat_history + [(chat_input, text or empty_msg)],
-                refs,
-                plot_gr,
-                plot,
-                chat_state,
-            )
+            yield update(text or empty_msg)
+        elif pending:
+            yield update(text)
+
+        print(f"Streamed answer: {stream.summary()}")
+        if pipeline_lease is not None:
+            pipeline_key, models = pipeline_lease
+            chat_pipelines.release(pipeline_key, pipeline, models)
+            print(f"Pipeline pool: {chat_pipelines.summary()}")
 
     def check_and_suggest_name_conv(self, chat_history):
         suggest_pipeline = SuggestConvNamePipeline()
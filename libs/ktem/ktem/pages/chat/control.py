@@ -4,6 +4,7 @@ from copy import deepcopy
 
 import gradio as gr
 from ktem.app import BasePage
+from ktem.db.conversation import delete_turns, load_turns, migrate_conversation
 from ktem.db.models import Conversation, User, engine
 from sqlmodel import Session, or_, select
 
@@ -223,9 +224,10 @@ class ConversationControl(BasePage):
             # Define condition based on admin-role:
             # - can_see: can see their conversations & public files
             # - can_not_see: only see their conversations
+            # only the names are listed, not the conversations' data
             if can_see_public:
                 statement = (
-                    select(Conversation)
+                    select(Conversation.name, Conversation.id)
                     .where(
                         or_(
                             Conversation.user == user_id,
@@ -238,14 +240,14 @@ class ConversationControl(BasePage):
                 )
             else:
                 statement = (
-                    select(Conversation)
+                    select(Conversation.name, Conversation.id)
                     .where(Conversation.user == user_id)
                     .order_by(Conversation.date_created.desc())  # type: ignore
                 )
 
             results = session.exec(statement).all()
-            for result in results:
-                options.append((result.name, result.id))
+            for name, id_ in results:
+                options.append((name, id_))
 
         return options
 
@@ -286,6 +288,7 @@ class ConversationControl(BasePage):
             statement = select(Conversation).where(Conversation.id == conversation_id)
             result = session.exec(statement).one()
 
+            delete_turns(session, result.id)
             session.delete(result)
             session.commit()
 
@@ -304,6 +307,8 @@ class ConversationControl(BasePage):
             statement = select(Conversation).where(Conversation.id == conversation_id)
             try:
                 result = session.exec(statement).one()
+                if migrate_conversation(session, result):
+                    session.commit()
                 id_ = result.id
                 name = result.name
                 is_conv_public = result.is_public
@@ -315,16 +320,11 @@ class ConversationControl(BasePage):
                 else:
                     selected = {}
 
-                chats = result.data_source.get("messages", [])
+                chats, retrieval_history, plot_history = load_turns(session, result)
                 chat_suggestions = result.data_source.get(
                     "chat_suggestions", default_chat_suggestions
                 )
 
-                retrieval_history: list[str] = result.data_source.get(
-                    "retrieval_messages", []
-                )
-                plot_history: list[dict] = result.data_source.get("plot_history", [])
-
                 # On initialization
                 # Ensure len of retrieval and messages are equal
                 retrieval_history = sync_retrieval_n_message(chats, retrieval_history)
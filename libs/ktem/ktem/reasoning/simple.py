@@ -12,7 +12,6 @@ from ktem.reasoning.prompt_optimization import (
 )
 from ktem.utils.render import Render
 from ktem.utils.visualize_cited import CreateCitationVizPipeline
-from plotly.io import to_json
 
 from kotaemon.base import (
     AIMessage,
@@ -215,6 +214,8 @@ class FullQAPipeline(BaseReasoning):
                 print("Failed to create citation plot:", e)
 
             if citation_plot:
+                from plotly.io import to_json
+
                 plot = to_json(citation_plot)
                 plot_content = Document(channel="plot", content=plot)
 
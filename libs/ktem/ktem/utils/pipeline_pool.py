@@ -0,0 +1,117 @@
+"""Reuse the chat pipelines between the turns of the conversations
+
+Building the pipeline of a turn creates its theflow components, the retrievers
+of the selected indices, their rerankers, splitters and tokenizers. `PipelinePool`
+keeps the pipelines built for a key, made of everything the pipeline was built
+from, and lends each of them to one turn at a time, so that the concurrent
+conversations never share a pipeline.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from decouple import config
+
+
+class PipelinePool:
+    """Keep the idle pipelines by key, dropping the least recently used keys
+
+    Args:
+        max_keys: the number of keys kept, 0 to never reuse a pipeline. Defaults
+            to the `KH_PIPELINE_POOL_SIZE` environment variable, or 16
+        max_idle: the number of idle pipelines kept per key
+    """
+
+    def __init__(self, max_keys: int | None = None, max_idle: int = 4):
+        if max_keys is None:
+            max_keys = config("KH_PIPELINE_POOL_SIZE", default=16, cast=int)
+        self.max_keys = max_keys
+        self.max_idle = max_idle
+        self.n_reused = 0
+        self.n_built = 0
+        self.setup_time = 0.0
+        self._idle: OrderedDict[str, list] = OrderedDict()
+        self._models: tuple = ()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash the values a pipeline is built from into a key"""
+        dumped = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.md5(dumped.encode("utf-8")).hexdigest()
+
+    def _same_models(self, models: tuple) -> bool:
+        return len(models) == len(self._models) and all(
+            a is b for a, b in zip(models, self._models)
+        )
+
+    def acquire(
+        self, key: str, build: Callable[[], Any], models: tuple = ()
+    ) -> tuple[Any, float]:
+        """Lend a pipeline of `key`, built with `build` if none is idle
+
+        Args:
+            key: the key of the pipeline, see `make_key`
+            build: create the pipeline
+            models: the models shared by all the pipelines, a different model
+                drops every idle pipeline
+
+        Returns:
+            the pipeline, to give back with `release` once the turn is answered,
+            and the seconds taken to get it
+        """
+        start = time.perf_counter()
+        pipeline, reused = None, False
+        with self._lock:
+            if not self._same_models(models):
+                self._idle.clear()
+                self._models = models
+            idle = self._idle.get(key)
+            if idle:
+                pipeline, reused = idle.pop(), True
+                self._idle.move_to_end(key)
+
+        if pipeline is None:
+            pipeline = build()
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if reused:
+                self.n_reused += 1
+            else:
+                self.n_built += 1
+            self.setup_time += elapsed
+        return pipeline, elapsed
+
+    def release(self, key: str, pipeline: Any, models: tuple = ()):
+        """Give back a pipeline lent by `acquire`, to reuse it in the next turns
+
+        The pipeline is dropped if the models changed since it was lent.
+        """
+        if self.max_keys <= 0:
+            return
+        with self._lock:
+            if not self._same_models(models):
+                return
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(pipeline)
+            self._idle.move_to_end(key)
+            while len(self._idle) > self.max_keys:
+                self._idle.popitem(last=False)
+
+    def clear(self):
+        """Drop all the idle pipelines"""
+        with self._lock:
+            self._idle.clear()
+
+    def summary(self) -> str:
+        n_turns = self.n_reused + self.n_built
+        average = self.setup_time / n_turns if n_turns else 0.0
+        return (
+            f"{self.n_reused} pipelines reused, {self.n_built} built, "
+            f"{average * 1000:.1f} ms average setup"
+        )
@@ -130,9 +130,10 @@ class Render:
         return f"<mark{id_text}>{text}</mark>"
 
     @staticmethod
-    def image(url: str, text: str = "") -> str:
-        """Render an image"""
-        img = f'<img src="{url}"><br>'
+    def image(url: str, text: str = "", lazy: bool = False) -> str:
+        """Render an image, loaded once scrolled into view if `lazy`"""
+        loading = ' loading="lazy"' if lazy else ""
+        img = f'<img src="{url}"{loading}><br>'
         if text:
             caption = f"<p>{text}</p>"
             return f"<figure>{img}{caption}</figure><br>"
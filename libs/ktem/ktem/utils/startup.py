@@ -0,0 +1,165 @@
+"""Opt-in profiling of the app startup
+
+Set `KH_PROFILE_STARTUP=true` to print, once the app is built, how long each module
+took to import and how long each initialization phase of the app took. The
+profiler starts when this module is imported, so `app.py` imports it before
+anything else.
+"""
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+
+from decouple import config
+
+
+class _ImportTimer(MetaPathFinder):
+    """Time the execution of the modules found by the other finders"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+        self._finding = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._finding, "active", False):
+            return None
+
+        self._finding.active = True
+        try:
+            spec = None
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._finding.active = False
+
+        if spec is not None and spec.loader is not None:
+            self._wrap(spec.loader, fullname)
+        return spec
+
+    def _wrap(self, loader, fullname: str):
+        # the builtin and frozen importers are classes shared by all their
+        # modules, and are fast anyway
+        if isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return
+        if "exec_module" in getattr(loader, "__dict__", {}):
+            # already wrapped, when the spec is looked up before being imported
+            return
+
+        exec_module = loader.exec_module
+        profiler = self._profiler
+
+        def timed_exec_module(module):
+            loader.__dict__.pop("exec_module", None)
+            with profiler.time_import(fullname):
+                exec_module(module)
+
+        try:
+            loader.exec_module = timed_exec_module
+        except (AttributeError, TypeError):
+            pass
+
+
+class StartupProfiler:
+    """Record the import time of each module and the time of named phases"""
+
+    def __init__(self):
+        self.enabled = False
+        self.imports: dict[str, tuple[float, float]] = {}
+        self.phases: list[tuple[str, int, float]] = []
+        self._finder = _ImportTimer(self)
+        self._local = threading.local()
+        self._started_at = 0.0
+
+    def start(self):
+        """Start timing the imports and the phases"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started_at = time.perf_counter()
+        sys.meta_path.insert(0, self._finder)
+
+    def stop(self):
+        """Stop timing the imports, the recorded times are kept"""
+        self.enabled = False
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    @contextmanager
+    def time_import(self, name: str):
+        # the time of the nested imports is removed from the self time of a module
+        stack = self._local.__dict__.setdefault("imports", [])
+        frame = [0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            self.imports[name] = (elapsed - frame[0], elapsed)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase of the startup, phases can be nested
+
+        Args:
+            name: the name of the phase in the report
+        """
+        if not self.enabled:
+            yield
+            return
+
+        depth = self._local.__dict__.get("depth", 0)
+        index = len(self.phases)
+        self.phases.append((name, depth, 0.0))
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            self.phases[index] = (name, depth, time.perf_counter() - start)
+
+    def report(self, top: int = 20) -> str:
+        """Return the phases, and the slowest packages and modules to import
+
+        Args:
+            top: the number of packages and modules to show
+        """
+        lines = [f"Startup: {time.perf_counter() - self._started_at:.2f}s"]
+        for name, depth, elapsed in self.phases:
+            lines.append(f"  {'  ' * depth}{name}: {elapsed:.3f}s")
+
+        packages: dict[str, float] = defaultdict(float)
+        for name, (self_time, _) in self.imports.items():
+            packages[name.split(".")[0]] += self_time
+        lines.append(f"Import time by package (top {top}):")
+        for name, self_time in sorted(packages.items(), key=lambda x: -x[1])[:top]:
+            lines.append(f"  {self_time:8.3f}s  {name}")
+
+        lines.append(f"Slowest modules to import, with their imports (top {top}):")
+        lines.append(f"  {'total':>8}  {'self':>8}")
+        modules = sorted(self.imports.items(), key=lambda x: -x[1][1])[:top]
+        for name, (self_time, total) in modules:
+            lines.append(f"  {total:8.3f}s {self_time:8.3f}s  {name}")
+        return "\n".join(lines)
+
+    def print_report(self, top: int = 20):
+        """Stop the profiler and print its report, if it was started"""
+        if not self.enabled:
+            return
+        self.stop()
+        print(self.report(top))
+
+
+startup_profiler = StartupProfiler()
+if config("KH_PROFILE_STARTUP", default=False, cast=bool):
+    startup_profiler.start()
@@ -0,0 +1,82 @@
+"""Coalesce the updates streamed to the UI while an answer is generated
+
+The answer is generated token by token, but sending the UI an update per token
+re-processes the whole chat history and info panel each time. `DeltaStream` lets
+the caller send an update at most every `interval` seconds, tells which outputs
+changed since the last update so the others can be skipped, and estimates the
+bytes sent for the answer.
+"""
+import json
+import time
+from typing import Any
+
+_NOT_SENT = object()
+
+
+def _size(value: Any) -> int:
+    """Estimate the size of a value once serialized for the UI"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(value).encode("utf-8"))
+
+
+class DeltaStream:
+    """Track the outputs sent to the UI during the streaming of an answer
+
+    Args:
+        interval: the minimum number of seconds between 2 updates, 0 to send every
+            update
+        base: the outputs that do not change during the answer, like the chat
+            history, re-sent by each update without delta
+    """
+
+    def __init__(self, interval: float = 0.0, base: Any = None):
+        self.interval = interval
+        self.base_size = _size(base)
+        self.n_updates = 0
+        self.bytes_sent = 0
+        self.bytes_full = 0
+        self._sent: dict[str, Any] = {}
+        self._last_update = float("-inf")
+
+    def due(self) -> bool:
+        """Whether enough time passed since the last update to send a new one"""
+        return time.monotonic() - self._last_update >= self.interval
+
+    def changes(self, **outputs: Any) -> dict[str, bool]:
+        """Record an update sending `outputs`, return which of them changed
+
+        The unchanged outputs need not be sent. A text output extended since the
+        last update is counted as its appended text only.
+        """
+        changed = {}
+        full = self.base_size
+        for name, value in outputs.items():
+            size = _size(value)
+            full += size
+
+            sent = self._sent.get(name, _NOT_SENT)
+            changed[name] = sent is _NOT_SENT or not (sent is value or sent == value)
+            if not changed[name]:
+                continue
+            if isinstance(sent, str) and isinstance(value, str):
+                if value.startswith(sent):
+                    size -= _size(sent)
+            self.bytes_sent += size
+            self._sent[name] = value
+
+        self.bytes_full += full
+        self.n_updates += 1
+        self._last_update = time.monotonic()
+        return changed
+
+    def summary(self) -> str:
+        return (
+            f"{self.n_updates} updates, {self.bytes_sent / 1024:.1f} KB sent "
+            f"({self.bytes_full / 1024:.1f} KB without delta)"
+        )
@@ -6,16 +6,20 @@ Refs:
 1. [RAGxplorer](https://github.com/gabrielchua/RAGxplorer)
 2. [RAGVizExpander](https://github.com/KKenny0/RAGVizExpander)
 """
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Any, List, Tuple
 
 import numpy as np
-import pandas as pd
-import plotly.graph_objs as go
-import umap
 
 from kotaemon.base import BaseComponent
 from kotaemon.embeddings import BaseEmbeddings
 
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objs as go
+
+# umap, plotly and pandas are slow to import and only needed when a plot is made,
+# so they are imported in the methods rather than on app startup
+
 VISUALIZATION_SETTINGS = {
     "Original Query": {"color": "red", "opacity": 1, "symbol": "cross", "size": 15},
     "Retrieved": {"color": "green", "opacity": 1, "symbol": "circle", "size": 10},
@@ -28,9 +32,11 @@ class CreateCitationVizPipeline(BaseComponent):
     """Creating PlotData for visualizing query results"""
 
     embedding: BaseEmbeddings
-    projector: umap.UMAP = None
+    projector: Any = None  # umap.UMAP, fitted in `run`
 
     def _set_up_umap(self, embeddings: np.ndarray):
+        import umap
+
         umap_transform = umap.UMAP().fit(embeddings)
         return umap_transform
 
@@ -51,7 +57,7 @@ class CreateCitationVizPipeline(BaseComponent):
         document_projections: Tuple[np.ndarray, np.ndarray],
         document_text: List[str],
         plot_size: int = 3,
-    ) -> pd.DataFrame:
+    ) -> "pd.DataFrame":
         """Prepares a DataFrame for visualization from projections and texts.
 
         Args:
@@ -59,6 +65,8 @@ class CreateCitationVizPipeline(BaseComponent):
                 Tuple of X and Y coordinates of document projections.
             document_text (List[str]): List of document texts.
         """
+        import pandas as pd
+
         df = pd.DataFrame({"x": document_projections[0], "y": document_projections[1]})
         df["document"] = document_text
         df["document_cleaned"] = df.document.str.wrap(50).apply(
@@ -68,7 +76,7 @@ class CreateCitationVizPipeline(BaseComponent):
         df["category"] = "Retrieved"
         return df
 
-    def _plot_embeddings(self, df: pd.DataFrame) -> go.Figure:
+    def _plot_embeddings(self, df: "pd.DataFrame") -> "go.Figure":
         """
         Creates a Plotly figure to visualize the embeddings.
 
@@ -78,6 +86,8 @@ class CreateCitationVizPipeline(BaseComponent):
         Returns:
             go.Figure: A Plotly figure object for visualization.
         """
+        import plotly.graph_objs as go
+
         fig = go.Figure()
 
         for category in df["category"].unique():
@@ -111,6 +121,8 @@ class CreateCitationVizPipeline(BaseComponent):
         return fig
 
     def run(self, context: List[str], question: str):
+        import pandas as pd
+
         embed_contexts = self.embedding(context)
         context_embeddings = np.array([d.embedding for d in embed_contexts])
 
@@ -0,0 +1,72 @@
+import pytest
+from ktem.db.conversation import append_turns, load_turns, migrate_conversations
+from ktem.db.models import Conversation, ConversationMessage
+from sqlmodel import Session, SQLModel, create_engine, select
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_append_and_load_turns(engine):
+    with Session(engine) as session:
+        conv = Conversation(user="1", data_source={"selected": {"1": "all"}})
+        session.add(conv)
+
+        append_turns(session, conv, [["hi", "hello"]], ["<p>1</p>"], [None], start=0)
+        messages = [["hi", "hello"], ["why", "because"]]
+        append_turns(session, conv, messages, ["<p>1</p>", "<p>2</p>"], [None, {}], 1)
+        # a regenerated answer is appended as a new version of the last turn
+        messages[-1] = ["why", "because, really"]
+        append_turns(session, conv, messages, ["<p>1</p>", "<p>3</p>"], [None, {}], 1)
+        session.commit()
+
+        assert conv.data_source == {"selected": {"1": "all"}, "n_messages": 2}
+        rows = session.exec(select(ConversationMessage)).all()
+        assert [row.turn for row in rows] == [0, 1, 1]
+
+        assert load_turns(session, conv) == (
+            [["hi", "hello"], ["why", "because, really"]],
+            ["<p>1</p>", "<p>3</p>"],
+            [None, {}],
+        )
+
+        # the turns after the number of messages are not loaded
+        append_turns(session, conv, messages[:1], ["<p>1</p>"], [None], start=1)
+        assert load_turns(session, conv)[0] == [["hi", "hello"]]
+
+
+def test_migrate_conversations(engine):
+    with Session(engine) as session:
+        legacy = Conversation(
+            user="1",
+            data_source={
+                "selected": {},
+                "messages": [["hi", "hello"], ["why", "because"]],
+                "retrieval_messages": ["<p>1</p>"],
+                "plot_history": [None, None],
+                "chat_suggestions": [["what?"]],
+            },
+        )
+        session.add_all([legacy, Conversation(user="1")])
+        session.commit()
+        legacy_id = legacy.id
+
+    assert migrate_conversations(engine) == 1
+    assert migrate_conversations(engine) == 0
+
+    with Session(engine) as session:
+        conv = session.get(Conversation, legacy_id)
+        assert conv.data_source == {
+            "selected": {},
+            "chat_suggestions": [["what?"]],
+            "n_messages": 2,
+        }
+        assert load_turns(session, conv) == (
+            [["hi", "hello"], ["why", "because"]],
+            ["<p>1</p>", ""],
+            [None, None],
+        )
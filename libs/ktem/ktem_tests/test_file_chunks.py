@@ -0,0 +1,108 @@
+import base64
+
+import pytest
+from ktem.index.file.chunks import (
+    backfill_chunks,
+    count_chunks,
+    get_chunks,
+    image_reference,
+    record_chunks,
+)
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from kotaemon.base import Document
+from kotaemon.storages import InMemoryDocumentStore
+
+Base = declarative_base()
+
+
+class Index(Base):
+    __tablename__ = "index__1__index"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_id = Column(String)
+    target_id = Column(String)
+    relation_type = Column(String)
+
+
+class Chunk(Base):
+    __tablename__ = "index__1__chunk"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_id = Column(String)
+    page = Column(Integer, nullable=True)
+    position = Column(Integer)
+    doc_id = Column(String)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def make_docs():
+    return [
+        Document(text="page 2", metadata={"page_label": 2}),
+        Document(text="no page"),
+        Document(text="page 1", metadata={"page_label": "1"}),
+        Document(text="an image", metadata={"type": "image", "page_label": 1}),
+        Document(text="a thumbnail", metadata={"type": "thumbnail", "page_label": 1}),
+    ]
+
+
+def test_browse_chunks_by_page(session):
+    docstore = InMemoryDocumentStore()
+    docs = make_docs()
+    docstore.add(docs)
+
+    # recorded in 2 batches, as the indexing pipeline does
+    record_chunks(session, Chunk, "file", docs[:2], start=0)
+    record_chunks(session, Chunk, "file", docs[2:], start=2)
+    record_chunks(session, Chunk, "other", [Document(text="other")], start=0)
+    session.commit()
+
+    # the thumbnails are not browsed
+    assert count_chunks(session, Chunk, "file") == 4
+    texts = [
+        doc.text for doc in get_chunks(session, Chunk, docstore, "file", 0, limit=10)
+    ]
+    assert texts == ["page 1", "an image", "page 2", "no page"]
+
+    page = get_chunks(session, Chunk, docstore, "file", offset=1, limit=2)
+    assert [doc.text for doc in page] == ["an image", "page 2"]
+
+
+def test_backfill_chunks(session):
+    docstore = InMemoryDocumentStore()
+    docs = make_docs()
+    docstore.add(docs)
+    session.add_all(
+        [
+            Index(source_id="file", target_id=doc.doc_id, relation_type="document")
+            for doc in docs
+        ]
+    )
+    session.commit()
+
+    assert count_chunks(session, Chunk, "file") == 0
+    assert backfill_chunks(session, Chunk, Index, docstore, "file") == 4
+    # recorded once
+    assert backfill_chunks(session, Chunk, Index, docstore, "file") == 4
+    texts = [
+        doc.text for doc in get_chunks(session, Chunk, docstore, "file", 0, limit=10)
+    ]
+    assert texts == ["page 1", "an image", "page 2", "no page"]
+
+
+def test_image_reference(tmp_path):
+    data = b"\x89PNG fake image"
+    url = "data:image/png;base64," + base64.b64encode(data).decode()
+
+    path = image_reference("doc-1", url, tmp_path)
+    assert path is not None and path.suffix == ".png"
+    assert path.read_bytes() == data
+    assert image_reference("doc-1", url, tmp_path) == path
+
+    assert image_reference("doc-2", "https://example.com/image.png", tmp_path) is None
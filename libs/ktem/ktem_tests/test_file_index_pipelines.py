@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from ktem.index.file.pipelines import IndexPipeline
+
+from kotaemon.base import Document
+
+
+def yield_all(generator):
+    """Consume the generator and return its return value"""
+    try:
+        while True:
+            next(generator)
+    except StopIteration as e:
+        return e.value
+
+
+@patch.object(IndexPipeline, "handle_chunks_vectorstore")
+@patch.object(IndexPipeline, "handle_chunks_docstore")
+def test_thumbnails_are_not_embedded(mock_docstore, mock_vectorstore):
+    docs = [
+        Document(text="page 1", metadata={"page_label": "1"}),
+        Document(text="page 2", metadata={"page_label": "2"}),
+        Document(text="a table", metadata={"type": "table", "page_label": "2"}),
+    ] + [
+        Document(
+            text="Page thumbnail",
+            metadata={"type": "thumbnail", "page_label": label},
+        )
+        for label in ["1", "2"]
+    ]
+    thumbnail_ids = {doc.doc_id for doc in docs[3:]}
+
+    pipeline = IndexPipeline(splitter=None, VS=True)
+    n_chunks = yield_all(pipeline.handle_docs(docs, "file_id", "file.pdf"))
+    assert n_chunks == 3
+
+    # the thumbnails are in the docstore, and their ids linked from the chunks
+    docstore_ids = {
+        chunk.doc_id for call in mock_docstore.call_args_list for chunk in call.args[0]
+    }
+    assert thumbnail_ids <= docstore_ids
+    assert {doc.metadata.get("thumbnail_doc_id") for doc in docs[:2]} == thumbnail_ids
+
+    # but never embedded nor added to the vector store
+    vectorstore_ids = {
+        chunk.doc_id
+        for call in mock_vectorstore.call_args_list
+        for chunk in call.args[0]
+    }
+    assert vectorstore_ids == {doc.doc_id for doc in docs[:3]}
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+import pytest
+from ktem.index.file.listing import (
+    count_sources,
+    get_file_choices,
+    get_source_names,
+    iter_source_ids,
+    list_sources,
+    setup_name_search,
+)
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+Base = declarative_base()
+
+
+class Source(Base):
+    __tablename__ = "index__1__source"
+    id = Column(String, primary_key=True)
+    name = Column(String)
+    size = Column(Integer, default=0)
+    user = Column(Integer, default=1)
+    date_created = Column(DateTime)
+
+
+NAMES = ["report 2023.pdf", "Annual REPORT.pdf", "notes.txt", "slides.pptx", "a.md"]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        start = datetime(2024, 1, 1)
+        session.add_all(
+            [
+                Source(
+                    id=f"file-{idx}",
+                    name=name,
+                    size=idx * 10,
+                    user=idx % 2,
+                    # two files created at the same time, told apart by their id
+                    date_created=start + timedelta(days=min(idx, 3)),
+                )
+                for idx, name in enumerate(NAMES)
+            ]
+        )
+        session.commit()
+    return engine
+
+
+def list_all(session, **kwargs):
+    ids, cursor = [], None
+    while True:
+        sources, cursor = list_sources(session, Source, cursor=cursor, **kwargs)
+        ids.extend(source.id for source in sources)
+        if cursor is None:
+            return ids
+
+
+def test_list_sources_pages(engine):
+    with Session(engine) as session:
+        sources, cursor = list_sources(session, Source, limit=2)
+        assert [source.id for source in sources] == ["file-4", "file-3"]
+        assert cursor is not None
+
+        assert list_all(session, limit=2) == [
+            "file-4",
+            "file-3",
+            "file-2",
+            "file-1",
+            "file-0",
+        ]
+        assert list_all(session, limit=3, sort="name", descending=False) == [
+            "file-1",
+            "file-4",
+            "file-2",
+            "file-0",
+            "file-3",
+        ]
+        assert list_all(session, limit=1, sort="size", user_id=1) == [
+            "file-3",
+            "file-1",
+        ]
+
+        with pytest.raises(ValueError):
+            list_sources(session, Source, sort="user")
+
+
+@pytest.mark.parametrize("name_search", [False, True])
+def test_search_sources_by_name(engine, name_search):
+    if name_search:
+        assert setup_name_search(engine, Source)
+
+    with Session(engine) as session:
+        assert sorted(
+            list_all(session, name_pattern="report", name_search=name_search)
+        ) == [
+            "file-0",
+            "file-1",
+        ]
+        # shorter than a trigram
+        assert list_all(session, name_pattern="a.", name_search=name_search) == [
+            "file-4"
+        ]
+        assert (
+            count_sources(session, Source, name_pattern="PDF", name_search=name_search)
+            == 2
+        )
+        assert count_sources(session, Source, user_id=0) == 3
+
+        # the full-text index follows the changes of the files
+        session.add(Source(id="file-5", name="report.md", date_created=datetime.now()))
+        session.get(Source, "file-2").name = "report notes.txt"
+        session.delete(session.get(Source, "file-0"))
+        session.commit()
+        assert sorted(
+            list_all(session, name_pattern="report", name_search=name_search)
+        ) == [
+            "file-1",
+            "file-2",
+            "file-5",
+        ]
+
+
+def test_iter_source_ids_and_choices(engine):
+    with Session(engine) as session:
+        batches = list(iter_source_ids(session, Source, batch_size=2))
+        assert batches == [["file-0", "file-1"], ["file-2", "file-3"], ["file-4"]]
+
+        assert get_source_names(session, Source, ["file-2", "missing"]) == {
+            "file-2": "notes.txt"
+        }
+        # the selected files come first, then the most recent ones
+        assert get_file_choices(session, Source, selected=["file-0"], limit=2) == [
+            ("report 2023.pdf", "file-0"),
+            ("a.md", "file-4"),
+            ("slides.pptx", "file-3"),
+        ]
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+from ktem.index.file.graph import async_utils
+from ktem.index.file.graph.async_utils import IndexCheckpoint, TokenRateLimiter, aembed
+
+from kotaemon.base import DocumentWithEmbedding
+from kotaemon.embeddings import BaseEmbeddings
+
+
+class SyncEmbeddings(BaseEmbeddings):
+    calls: list = []
+
+    def invoke(self, text, *args, **kwargs):
+        self.calls.append((threading.current_thread().name, list(text)))
+        return [
+            DocumentWithEmbedding(text=each, embedding=[float(len(each))])
+            for each in text
+        ]
+
+
+class AsyncEmbeddings(SyncEmbeddings):
+    async def ainvoke(self, text, *args, **kwargs):
+        return self.invoke(text)
+
+
+def test_token_rate_limiter_waits():
+    # 1000 tokens per second, the bucket is full
+    limiter = TokenRateLimiter(60000)
+    limiter.consume(60000)
+    limiter.consume(500)
+
+    start = time.monotonic()
+    asyncio.run(limiter.acquire(0))
+    assert 0.4 <= time.monotonic() - start < 2
+
+
+def test_unlimited_token_rate():
+    limiter = TokenRateLimiter(0)
+    start = time.monotonic()
+    asyncio.run(limiter.acquire(10**9))
+    assert time.monotonic() - start < 0.1
+
+
+def test_index_checkpoint(tmp_path):
+    checkpoint = IndexCheckpoint(tmp_path)
+    assert "batch 1" not in checkpoint
+    checkpoint.add(["batch 1", "batch 2"])
+
+    resumed = IndexCheckpoint(tmp_path)
+    assert "batch 1" in resumed and "batch 2" in resumed
+    assert "batch 3" not in resumed
+
+
+def test_aembed_offloads_sync_models(monkeypatch):
+    monkeypatch.setattr(async_utils, "EMBEDDING_BATCH_SIZE", 2)
+    model = SyncEmbeddings(calls=[])
+
+    embeddings = asyncio.run(aembed(model, ["a", "bb", "a", "ccc", "bb"]))
+
+    assert embeddings.tolist() == [[1.0], [2.0], [1.0], [3.0], [2.0]]
+    # the duplicates are embedded once, in batches, outside the event loop
+    assert sorted(texts for _, texts in model.calls) == [["a", "bb"], ["ccc"]]
+    assert all(name.startswith("graph-embedding") for name, _ in model.calls)
+
+
+def test_aembed_uses_async_models():
+    model = AsyncEmbeddings(calls=[])
+
+    embeddings = asyncio.run(aembed(model, ["a", "bb", "a"]))
+
+    assert embeddings.tolist() == [[1.0], [2.0], [1.0]]
+    assert model.calls == [(threading.main_thread().name, ["a", "bb"])]
@@ -0,0 +1,52 @@
+from ktem.index.file.graph.engine_cache import (
+    GraphEngineCache,
+    bump_graph_version,
+    get_embedding_dim,
+)
+
+from kotaemon.base import DocumentWithEmbedding
+
+
+class CountingEmbedding:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        return [DocumentWithEmbedding(text=text, embedding=[0.0] * 3) for text in texts]
+
+
+def test_embedding_dim_is_probed_once():
+    model = CountingEmbedding()
+    assert get_embedding_dim(model) == 3
+    assert get_embedding_dim(model) == 3
+    assert model.calls == 1
+
+
+def test_graph_engine_cache(tmp_path):
+    cache = GraphEngineCache(max_size=2)
+    llm, embedding = object(), object()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return object()
+
+    engine = cache.get("a", tmp_path, models=(llm, embedding), build=build)
+    assert cache.get("a", tmp_path, models=(llm, embedding), build=build) is engine
+    assert len(builds) == 1
+
+    # indexing the graph again reloads it
+    bump_graph_version(tmp_path)
+    reloaded = cache.get("a", tmp_path, models=(llm, embedding), build=build)
+    assert reloaded is not engine
+    assert len(builds) == 2
+
+    # so does changing the default model
+    cache.get("a", tmp_path, models=(object(), embedding), build=build)
+    assert len(builds) == 3
+
+    # the least recently used graph is dropped
+    cache.get("b", tmp_path, models=(llm, embedding), build=build)
+    cache.get("c", tmp_path, models=(llm, embedding), build=build)
+    assert list(cache._engines) == ["b", "c"]
@@ -0,0 +1,47 @@
+import json
+
+import pandas as pd
+import pytest
+
+nx = pytest.importorskip("networkx")
+pytest.importorskip("plotly")
+
+from ktem.index.file.graph.visualize import (  # noqa: E402
+    create_knowledge_graph,
+    layout_graph,
+    visualize_graph,
+)
+
+
+@pytest.fixture
+def relationships():
+    # a star around "hub", and a separate pair
+    return pd.DataFrame(
+        [
+            {"source": "hub", "target": f"leaf{i}", "description": f"rel {i}"}
+            for i in range(6)
+        ]
+        + [{"source": "left", "target": "right", "description": "pair"}]
+    )
+
+
+def test_create_knowledge_graph(relationships):
+    G = create_knowledge_graph(relationships)
+    assert G.number_of_nodes() == 9
+    assert G.edges["hub", "leaf3"]["description"] == "rel 3"
+
+    # the nodes of lowest rank are dropped with their relations
+    G = create_knowledge_graph(relationships, max_nodes=3)
+    assert set(G.nodes()) == {"hub", "leaf0", "leaf1"}
+    assert G.number_of_edges() == 2
+
+
+def test_visualize_graph(relationships):
+    G = create_knowledge_graph(relationships)
+    assert layout_graph(G) is layout_graph(create_knowledge_graph(relationships))
+
+    plot = json.loads(visualize_graph(G))
+    edge_trace, node_trace = plot["data"]
+    assert len(edge_trace["x"]) == 3 * G.number_of_edges()
+    assert node_trace["text"] == list(G.nodes())
+    assert node_trace["marker"]["color"][0] == 6
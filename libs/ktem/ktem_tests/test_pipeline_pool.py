@@ -0,0 +1,110 @@
+import threading
+
+from ktem.utils.pipeline_pool import PipelinePool
+
+
+class Builder:
+    def __init__(self):
+        self.n_calls = 0
+
+    def __call__(self):
+        self.n_calls += 1
+        return object()
+
+
+def test_pipeline_pool_reuse():
+    pool = PipelinePool(max_keys=2)
+    build = Builder()
+    key = PipelinePool.make_key("simple", {"reasoning.lang": "en"}, ["file-1"])
+
+    pipeline, _ = pool.acquire(key, build)
+    pool.release(key, pipeline)
+    reused, _ = pool.acquire(key, build)
+    assert reused is pipeline
+    assert build.n_calls == 1
+    assert (pool.n_reused, pool.n_built) == (1, 1)
+
+    # another selection builds another pipeline
+    other_key = PipelinePool.make_key("simple", {"reasoning.lang": "en"}, ["file-2"])
+    assert other_key != key
+    other, _ = pool.acquire(other_key, build)
+    assert other is not pipeline
+    assert build.n_calls == 2
+
+
+def test_pipeline_pool_lends_once():
+    pool = PipelinePool()
+    build = Builder()
+
+    # a pipeline is not lent to 2 turns at the same time
+    first, _ = pool.acquire("key", build)
+    second, _ = pool.acquire("key", build)
+    assert first is not second
+
+    pool.release("key", first)
+    pool.release("key", second)
+    lent = {id(pool.acquire("key", build)[0]) for _ in range(2)}
+    assert lent == {id(first), id(second)}
+    assert build.n_calls == 2
+
+
+def test_pipeline_pool_models_change():
+    pool = PipelinePool()
+    build = Builder()
+    old_models, new_models = ({"gpt": {}},), ({"gpt": {}},)
+
+    pipeline, _ = pool.acquire("key", build, models=old_models)
+    pool.release("key", pipeline, models=old_models)
+    rebuilt, _ = pool.acquire("key", build, models=new_models)
+    assert rebuilt is not pipeline
+
+    # a pipeline lent before the change is not reused after it
+    pool.release("key", pipeline, models=old_models)
+    assert pool.acquire("key", build, models=new_models)[0] is not pipeline
+
+
+def test_pipeline_pool_evicts_keys():
+    pool = PipelinePool(max_keys=1)
+    build = Builder()
+
+    for key in ("a", "b"):
+        pool.release(key, pool.acquire(key, build)[0])
+    pool.acquire("a", build)
+    assert build.n_calls == 3
+
+
+def test_pipeline_pool_disabled():
+    pool = PipelinePool(max_keys=0)
+    build = Builder()
+
+    pool.release("key", pool.acquire("key", build)[0])
+    pool.acquire("key", build)
+    assert build.n_calls == 2
+
+
+def test_pipeline_pool_threads():
+    pool = PipelinePool()
+    build = Builder()
+    in_use: set[int] = set()
+    shared = []
+    lock = threading.Lock()
+
+    def turn():
+        for _ in range(50):
+            pipeline, _ = pool.acquire("key", build)
+            with lock:
+                if id(pipeline) in in_use:
+                    shared.append(pipeline)
+                in_use.add(id(pipeline))
+            with lock:
+                in_use.discard(id(pipeline))
+            pool.release("key", pipeline)
+
+    threads = [threading.Thread(target=turn) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not shared
+    assert pool.n_reused + pool.n_built == 400
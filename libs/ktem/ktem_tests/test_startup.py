@@ -0,0 +1,61 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from ktem.utils.startup import StartupProfiler
+
+HEAVY_MODULES = ["umap", "plotly", "networkx", "graphrag", "nano_graphrag", "lightrag"]
+
+
+def test_heavy_imports_are_deferred():
+    """The visualization and graph libraries are imported when they are used"""
+    code = (
+        "import sys\n"
+        "import ktem.utils.visualize_cited, ktem.index.file.graph\n"
+        "import ktem.index.file.graph.pipelines\n"
+        "import ktem.index.file.graph.nano_pipelines\n"
+        "import ktem.index.file.graph.lightrag_pipelines\n"
+        f"heavy = {HEAVY_MODULES!r}\n"
+        "print([m for m in sys.modules if m.split('.')[0] in heavy])\n"
+    )
+    root = Path(__file__).parents[3]
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=root,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
+
+
+def test_startup_profiler(tmp_path, monkeypatch):
+    (tmp_path / "kh_startup_child.py").write_text("import time\ntime.sleep(0.05)\n")
+    (tmp_path / "kh_startup_parent.py").write_text("import kh_startup_child\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    profiler = StartupProfiler()
+    profiler.start()
+    try:
+        with profiler.phase("outer"):
+            with profiler.phase("inner"):
+                import kh_startup_parent  # noqa: F401
+    finally:
+        profiler.stop()
+        sys.modules.pop("kh_startup_parent", None)
+        sys.modules.pop("kh_startup_child", None)
+
+    assert profiler._finder not in sys.meta_path
+    child_self, child_total = profiler.imports["kh_startup_child"]
+    parent_self, parent_total = profiler.imports["kh_startup_parent"]
+    assert child_self >= 0.05
+    assert parent_total >= child_total
+    assert parent_self < 0.05
+
+    assert [(name, depth) for name, depth, _ in profiler.phases] == [
+        ("outer", 0),
+        ("inner", 1),
+    ]
+    report = profiler.report()
+    assert "  outer: " in report and "    inner: " in report
+    assert "kh_startup_parent" in report
@@ -0,0 +1,33 @@
+import time
+
+from ktem.utils.streaming import DeltaStream
+
+
+def test_delta_stream_changes():
+    stream = DeltaStream(base=[("hi", "hello")])
+
+    assert stream.changes(answer="Thinking ...", refs="", plot=None) == {
+        "answer": True,
+        "refs": True,
+        "plot": True,
+    }
+    assert stream.changes(answer="The", refs="", plot=None) == {
+        "answer": True,
+        "refs": False,
+        "plot": False,
+    }
+    sent = stream.bytes_sent
+    assert stream.changes(answer="The answer", refs="<b>1</b>", plot=None)["refs"]
+    # the extended answer counts as its appended text
+    assert stream.bytes_sent - sent == len(" answer") + len("<b>1</b>")
+    assert stream.n_updates == 3
+    assert stream.bytes_full > stream.bytes_sent
+
+
+def test_delta_stream_interval():
+    stream = DeltaStream(interval=0.2)
+    assert stream.due()
+    stream.changes(answer="a")
+    assert not stream.due()
+    time.sleep(0.2)
+    assert stream.due()
@@ -0,0 +1,70 @@
+"""Time to first request of the app
+
+`app.py` is started several times, and the time until its page is served is
+measured. Run it before and after a change touching the imports or the
+initialization of the app to catch startup regressions. With `--profile`, the
+startup profile of the last run is printed (see `ktem.utils.startup`).
+
+Usage:
+    python scripts/benchmark_startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).parents[1]
+
+
+def time_to_first_request(port: int, timeout: float, profile: bool) -> float:
+    env = {
+        **os.environ,
+        "GRADIO_SERVER_PORT": str(port),
+        "KH_PROFILE_STARTUP": "true" if profile else "false",
+    }
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "app.py"],
+        cwd=ROOT,
+        env=env,
+        stdout=None if profile else subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"app.py exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.1)
+        raise TimeoutError(f"app.py did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--profile", action="store_true")
+    args = parser.parse_args()
+
+    times = []
+    for run in range(args.runs):
+        profile = args.profile and run == args.runs - 1
+        times.append(time_to_first_request(args.port, args.timeout, profile))
+        print(f"run {run + 1}: {times[-1]:.2f}s")
+    print(f"median: {statistics.median(times):.2f}s, min: {min(times):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Remove the "Page thumbnail" placeholder vectors from the file indices.
+
+Page thumbnails used to be embedded and stored in the vector store alongside the
+text chunks. They are now kept in the docstore only and linked to the chunks
+through `thumbnail_doc_id`. This script deletes the placeholder vectors (and
+their `vector` relations) that were created before that change. The thumbnail
+documents themselves are left untouched in the docstore.
+
+Run it from the root of the app so that `flowsettings.py` is picked up:
+
+    python scripts/migrate/remove_thumbnail_vectors.py
+"""
+from ktem.components import get_docstore, get_vectorstore
+from ktem.db.engine import engine
+from ktem.index.models import Index
+from sqlalchemy import Column, Integer, String, delete, select
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
+
+BATCH_SIZE = 500
+
+
+def _init_index_table(id: int = 1):
+    """Init the Index relation table of the file index. Hard-code"""
+    Base = declarative_base()
+    return type(
+        "IndexTable",
+        (Base,),
+        {
+            "__tablename__": f"index__{id}__index",
+            "id": Column(Integer, primary_key=True, autoincrement=True),
+            "source_id": Column(String),
+            "target_id": Column(String),
+            "relation_type": Column(String),
+            "user": Column(String, default=""),
+        },
+    )
+
+
+def remove_thumbnail_vectors(int_index: int = 1) -> int:
+    """Delete the thumbnail vectors of a file index
+
+    Returns:
+        the number of removed vectors
+    """
+    IndexTable = _init_index_table(id=int_index)
+    vs = get_vectorstore(f"index_{int_index}")
+    ds = get_docstore(f"index_{int_index}")
+
+    with Session(engine) as session:
+        stmt = select(IndexTable.target_id).where(IndexTable.relation_type == "vector")
+        vs_ids = [r[0] for r in session.execute(stmt).all()]
+    print(f"Got {len(vs_ids)} vector ids")
+
+    thumbnail_ids: list[str] = []
+    for start_idx in range(0, len(vs_ids), BATCH_SIZE):
+        docs = ds.get(vs_ids[start_idx : start_idx + BATCH_SIZE])
+        thumbnail_ids.extend(
+            doc.doc_id for doc in docs if doc.metadata.get("type") == "thumbnail"
+        )
+    print(f"Got {len(thumbnail_ids)} thumbnail vectors")
+
+    for start_idx in range(0, len(thumbnail_ids), BATCH_SIZE):
+        batch = thumbnail_ids[start_idx : start_idx + BATCH_SIZE]
+        vs.delete(batch)
+        with Session(engine) as session:
+            session.execute(
+                delete(IndexTable).where(
+                    IndexTable.relation_type == "vector",
+                    IndexTable.target_id.in_(batch),
+                )
+            )
+            session.commit()
+
+    return len(thumbnail_ids)
+
+
+def main():
+    with Session(engine) as session:
+        stmt = select(Index)
+        file_indices = [r[0] for r in session.execute(stmt).all()]
+
+    for file_index in file_indices:
+        print(f"Migrating for Index id: {file_index.id} ({file_index.name})")
+        n_removed = remove_thumbnail_vectors(int_index=file_index.id)
+        print(f"Index {file_index.id}: removed {n_removed} thumbnail vectors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Move the messages of the conversations from `data_source` to their own table.
+
+The messages, retrieval panels and plots of a conversation used to be kept in the
+`data_source` JSON of the conversation, rewritten at every message. They are now
+stored as rows of the `ConversationMessage` table. The conversations are migrated
+when they are opened, this script migrates all of them at once.
+
+Run it from the root of the app so that `flowsettings.py` is picked up:
+
+    python scripts/migrate/split_conversation_messages.py
+"""
+from ktem.db.conversation import migrate_conversations
+from ktem.db.engine import engine
+
+
+def main():
+    n_migrated = migrate_conversations(engine)
+    print(f"Migrated {n_migrated} conversations")
+
+
+if __name__ == "__main__":
+    main()